@@ -0,0 +1,90 @@
+'''
+benchmark_bulk_file_writer.py, Geoffrey Weal, 18/10/26
+
+This script will compare how long it takes to write many small job files one at a time, compared to using the BulkFileWriter (with a pool of threads, or into one tar archive).
+
+Usage: python benchmark_bulk_file_writer.py [folder_to_write_to] [number_of_molecules] [write_workers]
+
+Give a folder on the filesystem you want to test (such as a folder on a Lustre filesystem), as the benefit of the BulkFileWriter depends on the filesystem.
+'''
+import os, sys, time, shutil
+
+from ReJig.Utilities.bulk_file_writer import BulkFileWriter
+
+# -----------------------------------------------------------------
+
+# These are the contents of a typical small job file.
+file_contents = ('%chk=molecule.chk\n%mem=8GB\n#p opt wB97XD/6-31G(d)\n\nmolecule\n\n0 1\n' + 'C  -1  0.00000000  0.00000000  0.00000000\n'*40 + '\n')
+
+def write_directly(dirpath, number_of_molecules):
+    """
+    This method will write the files for each molecule one at a time, making each folder as it is needed.
+
+    Parameters
+    ----------
+    dirpath : str
+        This is the folder to write files to.
+    number_of_molecules : int
+        This is the number of molecules to write files for.
+    """
+    for index in range(number_of_molecules):
+        molecule_dirpath = dirpath+'/crystal/rejig_molecules/'+str(index)
+        os.makedirs(molecule_dirpath, exist_ok=True)
+        for filename in ['molecule.gjf', 'submit.sl']:
+            with open(molecule_dirpath+'/'+filename, 'w') as FILE:
+                FILE.write(file_contents)
+
+def write_with_bulk_file_writer(dirpath, number_of_molecules, file_writer):
+    """
+    This method will write the files for each molecule using a BulkFileWriter.
+
+    Parameters
+    ----------
+    dirpath : str
+        This is the folder to write files to.
+    number_of_molecules : int
+        This is the number of molecules to write files for.
+    file_writer : ReJig.Utilities.bulk_file_writer.BulkFileWriter
+        This is the BulkFileWriter to use.
+    """
+    for index in range(number_of_molecules):
+        molecule_dirpath = dirpath+'/crystal/rejig_molecules/'+str(index)
+        file_writer.make_folder(molecule_dirpath)
+        for filename in ['molecule.gjf', 'submit.sl']:
+            file_writer.add_file(molecule_dirpath+'/'+filename, file_contents)
+    file_writer.flush()
+
+def time_method(dirpath, method, *arguments):
+    """
+    This method will time how long a method takes to run, starting from an empty folder.
+
+    Returns
+    -------
+    time_taken : float
+        This is the time the method took in seconds.
+    """
+    if os.path.exists(dirpath):
+        shutil.rmtree(dirpath)
+    os.makedirs(dirpath)
+    start_time = time.perf_counter()
+    method(dirpath, *arguments)
+    time_taken = time.perf_counter() - start_time
+    shutil.rmtree(dirpath)
+    return time_taken
+
+# -----------------------------------------------------------------
+
+if __name__ == '__main__':
+    folder_to_write_to  = sys.argv[1] if (len(sys.argv) > 1) else 'benchmark_bulk_file_writer_files'
+    number_of_molecules = int(sys.argv[2]) if (len(sys.argv) > 2) else 2000
+    write_workers       = int(sys.argv[3]) if (len(sys.argv) > 3) else 8
+
+    print('Number of molecules: '+str(number_of_molecules)+'; Number of files: '+str(2*number_of_molecules)+'; write_workers = '+str(write_workers))
+
+    direct_time   = time_method(folder_to_write_to, write_directly, number_of_molecules)
+    threaded_time = time_method(folder_to_write_to, lambda dirpath, number: write_with_bulk_file_writer(dirpath, number, BulkFileWriter(workers=write_workers)), number_of_molecules)
+    archive_time  = time_method(folder_to_write_to, lambda dirpath, number: write_with_bulk_file_writer(dirpath, number, BulkFileWriter(archive_filepath=dirpath+'/crystal.tar', archive_dirpath=dirpath)), number_of_molecules)
+
+    print('    one at a time = '+str(round(direct_time, 4))+' s')
+    print('    BulkFileWriter (threads) = '+str(round(threaded_time, 4))+' s; speed up = '+str(round(direct_time/threaded_time, 1))+'x')
+    print('    BulkFileWriter (tar archive) = '+str(round(archive_time, 4))+' s; speed up = '+str(round(direct_time/archive_time, 1))+'x')
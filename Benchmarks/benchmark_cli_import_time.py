@@ -0,0 +1,90 @@
+'''
+benchmark_cli_import_time.py, Geoffrey Weal, 18/10/26
+
+This script will measure how long the ReJig command line program takes to start up for each sub-command, using "python -X importtime".
+
+Only the module for the sub-command being run is imported. This is compared to importing the modules for every sub-command, which is what
+the ReJig command line program used to do.
+
+Usage: python benchmark_cli_import_time.py [number_of_repeats]
+'''
+import sys, time, subprocess
+
+from ReJig.cli.main import commands
+
+# -----------------------------------------------------------------
+
+# This script imports the modules for every sub-command, in the same way as the ReJig command line program used to.
+import_every_command_script = 'from importlib import import_module; from ReJig.cli.main import commands; [import_module(module_name).CLICommand for command, module_name, short in commands]'
+
+def get_import_time(script):
+    """
+    This method will run a python script with "-X importtime", and obtain the total time taken to import modules.
+
+    Parameters
+    ----------
+    script : str
+        This is the python script to run.
+
+    Returns
+    -------
+    total_import_time : float
+        This is the total time taken to import modules, in seconds.
+    wall_time : float
+        This is the total time taken to run the script, in seconds.
+    imported_modules : set of str
+        These are the names of all the modules that were imported.
+    """
+    start_time = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_time = time.perf_counter() - start_time
+
+    # Each line from -X importtime is given as "import time: self [us] | cumulative | imported package".
+    # Modules imported at the top level are not indented, so the total is the sum of the cumulative times of these modules.
+    total_import_time = 0.0
+    imported_modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, cumulative_time, module_name = line[len('import time:'):].split('|')
+        if not cumulative_time.strip().isdigit():
+            continue
+        imported_modules.add(module_name.strip())
+        if not module_name[1:].startswith(' '):
+            total_import_time += int(cumulative_time) / 1000000.0
+    return total_import_time, wall_time, imported_modules
+
+def time_script(script, number_of_repeats):
+    """
+    This method will give the fastest time taken to run a script over a number of repeats.
+
+    Parameters
+    ----------
+    script : str
+        This is the python script to run.
+    number_of_repeats : int
+        This is the number of times to run the script.
+
+    Returns
+    -------
+    The fastest import time and wall time, and the modules that were imported.
+    """
+    results = [get_import_time(script) for repeat in range(number_of_repeats)]
+    return min(result[0] for result in results), min(result[1] for result in results), results[0][2]
+
+# -----------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    # First, obtain the number of repeats to perform.
+    number_of_repeats = int(sys.argv[1]) if (len(sys.argv) > 1) else 5
+
+    # Second, time how long it takes to start up each sub-command (shown by asking for the help of each sub-command).
+    print('Sub-command'.ljust(40)+'Import time (s)'.rjust(16)+'Wall time (s)'.rjust(16)+'   Imports ASE')
+    print('-'*90)
+    scripts = [('ReJig --help', 'from ReJig.cli.main import main; main(args=["--help"])')]
+    scripts += [('ReJig '+command+' --help', 'from ReJig.cli.main import main; main(args=["'+command+'", "--help"])') for command, module_name, short in commands]
+    scripts += [('(every sub-command imported)', import_every_command_script)]
+    for name, script in scripts:
+        total_import_time, wall_time, imported_modules = time_script(script, number_of_repeats)
+        print(name.ljust(40)+str(round(total_import_time, 3)).rjust(16)+str(round(wall_time, 3)).rjust(16)+'   '+str('ase' in imported_modules))
@@ -0,0 +1,86 @@
+'''
+benchmark_graph_copies.py, Geoffrey Weal, 18/10/26
+
+This script will compare how long it takes to hand the graphs of molecules to other methods using deepcopy compared to using read-only views of the graphs.
+
+Usage: python benchmark_graph_copies.py [number_of_molecules] [number_of_atoms_per_molecule]
+
+The graphs are made to look like the graphs of molecules made by SUMELF, where each atom (node) and bond (edge) holds some information.
+'''
+import sys, time
+from copy import deepcopy
+
+import numpy as np
+import networkx as nx
+
+from ReJig.Utilities.utilities import get__added_or_modified__values, read_only_graph
+
+# -----------------------------------------------------------------
+
+def make_molecule_graph(number_of_atoms):
+    """
+    This method will make a graph that looks like the graph of a molecule.
+
+    Parameters
+    ----------
+    number_of_atoms : int
+        This is the number of atoms in the molecule.
+
+    Returns
+    -------
+    molecule_graph : networkx.Graph
+        This is the graph of the molecule.
+    """
+    molecule_graph = nx.Graph()
+    for index in range(number_of_atoms):
+        molecule_graph.add_node(index, E=('C' if (index % 3) else 'H'), position=np.random.random(3), charge=0.0, is_spare=False, added_or_modified=bool(index % 7 == 0), hybridisation='sp2')
+    for index in range(1, number_of_atoms):
+        molecule_graph.add_edge(index-1, index, bond_type='Single')
+        if index % 6 == 0:
+            molecule_graph.add_edge(index-6, index, bond_type='Aromatic')
+    return molecule_graph
+
+def hand_out_graphs(molecule_graphs, get_graph):
+    """
+    This method will hand the graph of each molecule to other methods in the same way as ReJig_Atoms does: once to check which atoms
+    are added or modified, once to write the input files, and once to write the original molecules.
+
+    Parameters
+    ----------
+    molecule_graphs : dict.
+        These are the graphs of each molecule.
+    get_graph : method
+        This is the method used to obtain the graph to hand to other methods.
+    """
+    for molecule_graph in molecule_graphs.values():
+        get__added_or_modified__values(get_graph(molecule_graph))
+    for molecule_graph in molecule_graphs.values():
+        len(get_graph(molecule_graph).edges)
+    for molecule_graph in molecule_graphs.values():
+        len(get_graph(get_graph(molecule_graph)).nodes)
+
+def time_method(method, *arguments):
+    """
+    This method will time how long a method takes to run.
+
+    Returns
+    -------
+    time_taken : float
+        This is the time the method took in seconds.
+    """
+    start_time = time.perf_counter()
+    method(*arguments)
+    return time.perf_counter() - start_time
+
+# -----------------------------------------------------------------
+
+if __name__ == '__main__':
+    number_of_molecules          = int(sys.argv[1]) if (len(sys.argv) > 1) else 64
+    number_of_atoms_per_molecule = int(sys.argv[2]) if (len(sys.argv) > 2) else 200
+
+    molecule_graphs = {molecule_name: make_molecule_graph(number_of_atoms_per_molecule) for molecule_name in range(number_of_molecules)}
+    print('Number of molecules: '+str(number_of_molecules)+'; Number of atoms per molecule: '+str(number_of_atoms_per_molecule))
+
+    deepcopy_time  = time_method(hand_out_graphs, molecule_graphs, deepcopy)
+    read_only_time = time_method(hand_out_graphs, molecule_graphs, read_only_graph)
+    print('    deepcopy = '+str(round(deepcopy_time, 4))+' s; read-only view = '+str(round(read_only_time, 4))+' s; speed up = '+str(round(deepcopy_time/read_only_time, 1))+'x')
@@ -0,0 +1,111 @@
+'''
+benchmark_last_geometry.py, Geoffrey Weal, 18/10/26
+
+This script will compare how long read_last_input_orientation takes to obtain the last structure in large log files compared to ase.io.read(log_filepath, index=-1),
+which is what ReJig reset used to do.
+
+Usage: python benchmark_last_geometry.py [path/to/log_file ...]
+
+If no log files are given, a large Gaussian-like log file is made in a temporary folder and used.
+'''
+import os, sys, time, tempfile
+import numpy as np
+from ase.io import read
+
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import read_last_input_orientation
+
+# -----------------------------------------------------------------
+
+def write_orientation_block(logFILE, orientation_line, numbers, positions):
+    """
+    This method will write an orientation block in the same way as Gaussian.
+
+    Parameters
+    ----------
+    logFILE : file
+        This is the log file to write to.
+    orientation_line : str.
+        This is the orientation line, such as "Input orientation:".
+    numbers : list of int
+        These are the atomic numbers of the atoms.
+    positions : numpy.array
+        These are the positions of the atoms.
+    """
+    dashes = ' '+'-'*69+'\n'
+    logFILE.write(' '*26+orientation_line+'\n'+dashes)
+    logFILE.write(' Center     Atomic      Atomic             Coordinates (Angstroms)\n')
+    logFILE.write(' Number     Number       Type             X           Y           Z\n'+dashes)
+    for index, (number, position) in enumerate(zip(numbers, positions), 1):
+        logFILE.write(' {:6d} {:10d} {:11d}    {:12.6f}{:12.6f}{:12.6f}\n'.format(index, number, 0, *position))
+    logFILE.write(dashes)
+
+def make_large_gaussian_log(filepath, number_of_images=2000, number_of_atoms=60):
+    """
+    This method will make a large log file that looks like a Gaussian optimisation that did not complete.
+
+    Parameters
+    ----------
+    filepath : str.
+        This is the path to write the log file to.
+    number_of_images : int
+        This is the number of geometric steps to write.
+    number_of_atoms : int
+        This is the number of atoms in the molecule.
+    """
+    random_generator = np.random.default_rng(0)
+    numbers = list(random_generator.choice([1, 6, 7, 8, 16], number_of_atoms))
+    positions = random_generator.uniform(-5.0, 5.0, (number_of_atoms, 3))
+    with open(filepath, 'w') as logFILE:
+        for image_index in range(number_of_images):
+            positions += random_generator.uniform(-0.01, 0.01, positions.shape)
+            write_orientation_block(logFILE, 'Input orientation:', numbers, positions)
+            write_orientation_block(logFILE, 'Standard orientation:', numbers, positions - positions.mean(axis=0))
+            logFILE.write('\n'.join([' '+'Some information about this step '*2]*200)+'\n\n')
+            logFILE.write(' SCF Done:  E(RwB97XD) =  -1234.56789012     A.U. after   12 cycles\n')
+            logFILE.write('         Item               Value     Threshold  Converged?\n')
+            logFILE.write(' Maximum Force            0.001230     0.000450     NO \n')
+            logFILE.write(' RMS     Force            0.000450     0.000300     NO \n')
+
+def time_method(method, *arguments):
+    """
+    This method will time how long a method takes to run.
+
+    Returns
+    -------
+    result : object
+        This is the result of the method.
+    time_taken : float
+        This is the time the method took in seconds.
+    """
+    start_time = time.perf_counter()
+    result = method(*arguments)
+    return result, time.perf_counter() - start_time
+
+def benchmark(log_filepath):
+    """
+    This method will compare ase.io.read(log_filepath, index=-1) and read_last_input_orientation on a log file.
+
+    Parameters
+    ----------
+    log_filepath : str.
+        This is the path to the log file.
+    """
+    print('File: '+str(log_filepath)+' ('+str(round(os.path.getsize(log_filepath)/(1024**2), 1))+' MB)')
+    ase_structure, ase_time = time_method(lambda path: read(path, index=-1, format='gaussian-out'), log_filepath)
+    new_structure, new_time = time_method(read_last_input_orientation, log_filepath)
+    print('    Obtain last structure: ase.io.read = '+str(round(ase_time, 4))+' s; tail only = '+str(round(new_time*1000, 3))+' ms; speed up = '+str(round(ase_time/new_time, 1))+'x')
+    if (new_structure is None) or (len(ase_structure) != len(new_structure)) or (not (ase_structure.numbers == new_structure.numbers).all()) or (not np.allclose(ase_structure.positions, new_structure.positions)):
+        print('    Warning: The structures given by ase.io.read and read_last_input_orientation are not the same.')
+
+# -----------------------------------------------------------------
+
+if __name__ == '__main__':
+    log_filepaths = sys.argv[1:]
+    if len(log_filepaths) == 0:
+        with tempfile.TemporaryDirectory() as temporary_dirpath:
+            log_filepath = temporary_dirpath+'/rejig_opt.log'
+            make_large_gaussian_log(log_filepath)
+            benchmark(log_filepath)
+    else:
+        for log_filepath in log_filepaths:
+            benchmark(log_filepath)
@@ -0,0 +1,143 @@
+'''
+benchmark_reverse_readline.py, Geoffrey Weal, 18/10/26
+
+This script will compare how long the memory-mapped reverse_readline takes to read through large log files compared to the original text-mode reverse_readline.
+
+Usage: python benchmark_reverse_readline.py [path/to/log_file ...]
+
+If no log files are given, a large Gaussian-like log file is made in a temporary folder and used.
+'''
+import os, sys, time, tempfile
+
+from ReJig.ReJig_Programs.shared_general_methods.shared_general_methods import reverse_readline, is_keyword_in_last_lines
+
+# -----------------------------------------------------------------
+
+def legacy_reverse_readline(filename, buf_size=8192):
+    """
+    The original text-mode generator that returns the lines of a file in reverse order. This is kept here for comparison.
+
+    Parameters
+    ----------
+    filename : str
+        This is the path to the file you want to read.
+    buf_size : int
+        This is the buffer size to read in.
+
+    Returns
+    -------
+    Returns each line in the file in reverse order.
+    """
+    with open(filename) as fh:
+        segment = None
+        offset = 0
+        fh.seek(0, os.SEEK_END)
+        file_size = remaining_size = fh.tell()
+        while remaining_size > 0:
+            offset = min(file_size, offset + buf_size)
+            fh.seek(file_size - offset)
+            buffer = fh.read(min(remaining_size, buf_size))
+            remaining_size -= buf_size
+            lines = buffer.split('\n')
+            if segment is not None:
+                if buffer[-1] != '\n':
+                    lines[-1] += segment
+                else:
+                    yield segment
+            segment = lines[0]
+            for index in range(len(lines) - 1, 0, -1):
+                if lines[index]:
+                    yield lines[index]
+        if segment is not None:
+            yield segment
+
+def legacy_did_gaussian_job_complete(log_filepath):
+    """
+    The original method for checking if a Gaussian job terminated normally. This is kept here for comparison.
+    """
+    counter = 0
+    for line in legacy_reverse_readline(log_filepath):
+        if 'Normal termination of Gaussian' in line:
+            return True
+        if counter >= 20:
+            return False
+        counter += 1
+    return False
+
+# -----------------------------------------------------------------
+
+def make_large_gaussian_log(filepath, number_of_images=20000):
+    """
+    This method will make a large log file that looks like a Gaussian optimisation.
+
+    Parameters
+    ----------
+    filepath : str.
+        This is the path to write the log file to.
+    number_of_images : int
+        This is the number of geometric steps to write.
+    """
+    with open(filepath, 'w') as logFILE:
+        for image_index in range(number_of_images):
+            logFILE.write(' SCF Done:  E(RwB97XD) =  -1234.56789012     A.U. after   12 cycles\n')
+            logFILE.write('\n'.join([' '+'Some information about this step '*2]*60)+'\n\n')
+            logFILE.write('         Item               Value     Threshold  Converged?\n')
+            logFILE.write(' Maximum Force            0.000123     0.000450     YES\n')
+            logFILE.write(' RMS     Force            0.000045     0.000300     YES\n')
+            logFILE.write(' Maximum Displacement     0.001234     0.001800     YES\n')
+            logFILE.write(' RMS     Displacement     0.000456     0.001200     YES\n')
+        logFILE.write(' Normal termination of Gaussian 16 at Sat Oct 18 12:00:00 2026.\n')
+
+def time_method(method, *arguments):
+    """
+    This method will time how long a method takes to run.
+
+    Returns
+    -------
+    result : object
+        This is the result of the method.
+    time_taken : float
+        This is the time the method took in seconds.
+    """
+    start_time = time.perf_counter()
+    result = method(*arguments)
+    return result, time.perf_counter() - start_time
+
+def benchmark(log_filepath):
+    """
+    This method will compare the legacy and memory-mapped reverse readers on a log file.
+
+    Parameters
+    ----------
+    log_filepath : str.
+        This is the path to the log file.
+    """
+    print('File: '+str(log_filepath)+' ('+str(round(os.path.getsize(log_filepath)/(1024**2), 1))+' MB)')
+
+    # First, read through the whole file backwards.
+    legacy_lines, legacy_time = time_method(lambda path: list(legacy_reverse_readline(path)), log_filepath)
+    new_lines,    new_time    = time_method(lambda path: list(reverse_readline(path)), log_filepath)
+    legacy_lines = [line for line in legacy_lines if line]
+    print('    Read all lines backwards:   legacy = '+str(round(legacy_time, 4))+' s; mmap = '+str(round(new_time, 4))+' s; speed up = '+str(round(legacy_time/new_time, 1))+'x')
+    if legacy_lines != new_lines:
+        print('    Warning: The lines given by the legacy and mmap readers are not the same.')
+
+    # Second, check for normal termination.
+    legacy_result, legacy_time = time_method(legacy_did_gaussian_job_complete, log_filepath)
+    new_result,    new_time    = time_method(is_keyword_in_last_lines, log_filepath, 'Normal termination of Gaussian', 21)
+    print('    Check for normal termination: legacy = '+str(round(legacy_time*1000, 3))+' ms; mmap = '+str(round(new_time*1000, 3))+' ms')
+    if legacy_result != new_result:
+        print('    Warning: The legacy and mmap methods do not agree on whether the job terminated normally.')
+
+# -----------------------------------------------------------------
+
+if __name__ == '__main__':
+    log_filepaths = sys.argv[1:]
+    if len(log_filepaths) == 0:
+        with tempfile.TemporaryDirectory() as temporary_dirpath:
+            log_filepath = temporary_dirpath+'/rejig_opt.log'
+            make_large_gaussian_log(log_filepath)
+            benchmark(log_filepath)
+    else:
+        for log_filepath in log_filepaths:
+            benchmark(log_filepath)
@@ -7,30 +7,34 @@ This method is designed to create Gaussian or ORCA files to allow added or modif
 import os, shutil
 import traceback
 import numpy as np
-from copy import deepcopy
 
 #from tqdm import tqdm
 
+from ReJig import check_ase_version
+check_ase_version()
+
 #from ase import Atoms
 from ase.io import write #, read
 from ase.visualize import view
 from ase.constraints import FixAtoms
 
 #from SUMELF import get_distance
-from SUMELF import read_crystal
-from SUMELF import obtain_graph, process_crystal
 from SUMELF import make_crystal
-from SUMELF import make_folder #, remove_folder
 from SUMELF import add_graph_to_ASE_Atoms_object
 
-from ReJig.Utilities.make_SolventsList                                                   import make_SolventsList
+from ReJig.Utilities.crystal_cache                                                       import read_and_process_crystal
 from ReJig.Utilities.check_molecules                                                     import check_molecules
-from ReJig.Utilities.utilities                                                           import get__added_or_modified__values
+from ReJig.Utilities.scan_added_or_modified                                              import scan_crystal_for_added_or_modified_atoms
+from ReJig.Utilities.bulk_file_writer                                                    import BulkFileWriter
+from ReJig.Utilities.utilities                                                           import get__added_or_modified__masks, read_only_graph
 from ReJig.ReJig_Atoms.get_neighbouring_hydrogens_to_modify                              import get_neighbouring_hydrogens_to_modify
 from ReJig.ReJig_Atoms.write_molecules_to_disk_methods.write_gaussian_optimisation_files import write_gaussian_optimisation_files
 #from ReJig.ReJig_Atoms.write_molecules_to_disk_methods.write_orca_optimisation_files     import write_orca_optimisation_files
 
-def ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens=False, place_files_in='rejigged_crystals'):
+# This is the file that the 2nd neighbour hydrogens that will also be rejigged are listed in.
+second_neighbour_filename = 'Rejig_rejigging_2nd_neighbour.txt'
+
+def ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens=False, place_files_in='rejigged_crystals', use_cache=True, prefilter=True, write_workers=1, archive_files=False, second_neighbour_records=None):
 	"""
 	This method is designed to create Gaussian or ORCA files to allow added or modified atoms in molecules to geometrically relax. 
 
@@ -46,11 +50,24 @@ def ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbo
 		This boolean indicates if you want any hydrogens that are attached to atoms that have the added_or_modified tag set to True to also allow to be rejigged.
 	place_files_in : str.
 		This is the folder you want to save ReJig files to.
+	use_cache : bool.
+		This boolean indicates if you want to save the molecules and graphs of this crystal to the place_files_in+'_cache' folder, and reuse them if this crystal is processed again. Default: True
+	prefilter : bool.
+		This boolean indicates if you want to quickly check the "added_or_modified" column of the crystal file first, and return straight away if no atoms have been added or modified. This saves obtaining the molecules and graphs of crystals that do not need to be rejigged. Default: True
+	write_workers : int.
+		This is the number of threads to use to write the files for this crystal to disk. All the files for this crystal are made in memory first, and then written to disk together. Default: 1
+	archive_files : bool.
+		This boolean indicates if you want to write all the files for this crystal into one place_files_in/"crystal_identifier".tar file, rather than as separate files. This tar file needs to be unpacked in the place_files_in folder (for example, on the computer that will run the jobs) before the jobs can be submitted. Default: False
+	second_neighbour_records : list or None
+		If a list is given, the (crystal_identifier, atom_indices) of any 2nd neighbour hydrogens that will also be rejigged are added to this list, rather than written to the Rejig_rejigging_2nd_neighbour.txt file. This allows the file to be written once when many crystals are processed at the same time. If None, these are written to the Rejig_rejigging_2nd_neighbour.txt file. Default: None
 	"""
 
-	Rejig_rejigging_2nd_neighbour_filepath = 'Rejig_rejigging_2nd_neighbour.txt'
-	if os.path.exists(Rejig_rejigging_2nd_neighbour_filepath):
-		os.remove(Rejig_rejigging_2nd_neighbour_filepath)
+	# Before beginning, if the 2nd neighbours are not being given back to the caller, they are written to the Rejig_rejigging_2nd_neighbour.txt file.
+	write_second_neighbour_file = (second_neighbour_records is None)
+	if write_second_neighbour_file:
+		second_neighbour_records = []
+		if os.path.exists(second_neighbour_filename):
+			os.remove(second_neighbour_filename)
 
 	# First, check that the crystla file exists.
 	if not os.path.exists(filepath):
@@ -73,136 +90,125 @@ def ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbo
 	filepath_without_ext = '.'.join(filepath.split('.')[:-1])
 	filename = os.path.basename(filepath)
 
-	# Fifth, load the ase.Atoms object of the crystal. 
-	crystal = read_crystal(filepath)
-	'''
-	if filepath.endswith('.cif'):
-		crystal = read(filepath) #,disorder_groups='remove_disorder')
-	else:
-		crystal = read(filepath)
-	'''
-
-	# Sixth, make sure that the periodic boundary condition setting for this crystal object is True. 
-	crystal.set_pbc(True)
-
-	# Seventh, get the graph of the crystal.
-	crystal, crystal_graph = obtain_graph(crystal,name='crystal')
-
-	# Eighth, get the molecules and the graphs associated with each molecule in the crystal.
-	molecules, molecule_graphs, SolventsList, symmetry_operations, cell = process_crystal(crystal,crystal_graph=crystal_graph,take_shortest_distance=True,return_list=False,logger=None)
+	# Fifth, check if any atoms in this crystal have been added or modified, only reading the "added_or_modified" column of the crystal file.
+	#        * If none have, there is nothing to rejig, so return False without obtaining the molecules and graphs of this crystal.
+	if prefilter and (scan_crystal_for_added_or_modified_atoms(filepath) == False):
+		print(f'There are no atoms in crystal {crystal_identifier} that need to be rejigged.')
+		return False
 
-	# Ninth, determine the solvents in the crystal
-	solvent_components = list(make_SolventsList(crystal.info['SolventsList'])) if ('SolventsList' in crystal.info) else []
+	# Sixth, obtain the molecules and the graphs associated with each molecule in the crystal, as well as the solvents in the crystal.
+	#        * If use_cache is True, these are reused from previous runs if this crystal file has not changed.
+	cache_dirpath = (place_files_in+'_cache') if use_cache else None
+	molecules, molecule_graphs, SolventsList, symmetry_operations, cell, solvent_components = read_and_process_crystal(filepath, cache_dirpath=cache_dirpath)
 
-	# Tenth, check to make sure the molecules are all good.
+	# Seventh, check to make sure the molecules are all good.
 	molecules, molecule_graphs, solvent_components = check_molecules(molecules, molecule_graphs, solvent_components)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
 
-	# Eleventh, initalise this dictionary to hold which molecules you would like to rejig.
+	# Eighth, initalise this dictionary to hold which molecules you would like to rejig.
 	molecules_to_rejig = {}
 
-	# Twelfth, remove the aliphatic sidegroup from molecules that are not solvents. Also get the list of molecules that are solvents. 
-	for molecule_name in sorted(molecules.keys()):
-
-		# 12.1: Obtain the molecule and its associated graph.
-		molecule       = molecules[molecule_name].copy()
-		molecule_graph = deepcopy(molecule_graphs[molecule_name])
-
-		# 12.2: Obtain the "added_or_modified" tags from molecule_graph
-		added_or_modified_values = get__added_or_modified__values(molecule_graph)
+	# Ninth, obtain the "added_or_modified" tags of the atoms in each molecule as boolean arrays, and which molecules have atoms that have been added or modified.
+	#         * This will raise an error if any "added_or_modified" tags are missing or are not booleans.
+	added_or_modified_masks, molecules_need_rejigging = get__added_or_modified__masks(molecule_graphs)
 
-		# 12.3: If any of the values in "added_or_modified_values" are None objects, this means they are missing, so not this.
-		if any([(value is None) for value in added_or_modified_values]):
-			raise Exception('Error: There is a missing "added_or_modified" value in the crystal.')
+	# Tenth, remove the aliphatic sidegroup from molecules that are not solvents. Also get the list of molecules that are solvents. 
+	for molecule_name in sorted(molecules.keys()):
 
-		# 12.4: If there are no added or modified atoms in this molecule, pass here. 
-		if not any(added_or_modified_values):
+		# 10.1: If there are no added or modified atoms in this molecule, pass here. 
+		if not molecules_need_rejigging[molecule_name]:
 			continue
 
-		# 12.5: If the user has set rejig_neighbouring_hydrogens to True, then we would like any hydrogens that are
+		# 10.2: Obtain the molecule and its associated graph, and the "added_or_modified" tags of its atoms.
+		#      * The graph is only read here, so a read-only view of the graph is used rather than a copy.
+		molecule                 = molecules[molecule_name].copy()
+		molecule_graph           = read_only_graph(molecule_graphs[molecule_name])
+		added_or_modified_values = added_or_modified_masks[molecule_name].copy()
+
+		# 10.3: If the user has set rejig_neighbouring_hydrogens to True, then we would like any hydrogens that are
 		#       attached to the same atoms as those with the "added_or_modified" tag set to True to also be allowed
 		#       to be rejigged using DFT with our quantum chemistry program.
 		if rejig_neighbouring_hydrogens:
 
-			# 12.5.1: Obtain all the 2nd neighbours we also want to rejig
+			# 10.3.1: Obtain all the 2nd neighbours we also want to rejig
 			neighbours_of_neighbouring_atom_indices = get_neighbouring_hydrogens_to_modify(molecule, molecule_graph, added_or_modified_values)
 
-			# 12.5.2: Obtain any 2nd neighbours that will be changed from False to True after running the previous step. 
-			n_of_n_atom_indices_to_rejig = [index for index in neighbours_of_neighbouring_atom_indices_to_rejig if not added_or_modified_values[index]]
+			# 10.3.2: Obtain any 2nd neighbours that will be changed from False to True after running the previous step. 
+			n_of_n_atom_indices_to_rejig = [index for index in sorted(neighbours_of_neighbouring_atom_indices) if not added_or_modified_values[index]]
 
-			# 12.5.3: Update all the 2nd neighbour we want to rejig, so that the "add_or_modified"
+			# 10.3.3: Update all the 2nd neighbour we want to rejig, so that the "add_or_modified"
 			#         values of these atoms is set to True. 
 			if len(n_of_n_atom_indices_to_rejig) > 0:
 
-				# 12.5.3.1: Print if any second neighbour hydrogens will have their added_or_modified_values tags changed.
-				with open(Rejig_rejigging_2nd_neighbour_filepath, 'a+') as Rejig_rejigging_2nd_neighbourTXT:
-					Rejig_rejigging_2nd_neighbourTXT.write(f'{crystal_identifier}\n')
-					Rejig_rejigging_2nd_neighbourTXT.write(f'{n_of_n_atom_indices_to_rejig}\n')
-					Rejig_rejigging_2nd_neighbourTXT.write('============================================================\n')
+				# 10.3.3.1: Record if any second neighbour hydrogens will have their added_or_modified_values tags changed.
+				second_neighbour_records.append((crystal_identifier, n_of_n_atom_indices_to_rejig))
+				if write_second_neighbour_file:
+					write_second_neighbour_records(second_neighbour_records[-1:], mode='a+')
 
-				# 12.5.3.2: Update added_or_modified_values. 
-				for index in n_of_n_atom_indices_to_rejig:
-					added_or_modified_values[index] = True
+				# 10.3.3.2: Update added_or_modified_values. 
+				added_or_modified_values[n_of_n_atom_indices_to_rejig] = True
 
-		# 12.6: Fix the atoms that you want to remain, only allowing the added or modified atoms to relax.
-		molecule.set_constraint(FixAtoms(indices=[index for index in range(len(molecule)) if not added_or_modified_values[index]]))
+		# 10.4: Fix the atoms that you want to remain, only allowing the added or modified atoms to relax.
+		molecule.set_constraint(FixAtoms(mask=~added_or_modified_values))
 
-		# 12.7: Record which molecules you are allowing to rejig. 
+		# 10.5: Record which molecules you are allowing to rejig. 
 		molecules_to_rejig[molecule_name] = molecule
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
 
-	# Thirteenth, determine if this crystal needs rejigging.
+	# Eleventh, determine if this crystal needs rejigging.
 	if len(molecules_to_rejig) == 0:
 
-		# 13.1: No rejigging is need, so return False
+		# 11.1: No rejigging is need, so return False
 		print(f'There are no atoms in crystal {crystal_identifier} that need to be rejigged.')
 		return False
 
-	# Fourteenth, indicate that this molecule will have file created for rejigging.
+	# Twelfth, indicate that this molecule will have file created for rejigging.
 	print(f'There are atoms in crystal {crystal_identifier} to be rejigged.'.upper())
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
 
-	# Fifteenth, make the folder to place the editted crystal in if it doesnt currently exist.
-	make_folder(place_files_in)
+	# Thirteenth, make the object that will hold all the files for this crystal in memory, so that they can be written to disk together at the end.
+	#            * This also records the folders to make, so that they can all be made at the same time.
+	file_writer = BulkFileWriter(workers=write_workers, archive_filepath=(place_files_in+'/'+crystal_identifier+'.tar' if archive_files else None), archive_dirpath=place_files_in)
+	file_writer.make_folder(place_files_in)
 
-	# Sixteenth, get the directory for holding the crystal files. 
+	# Fourteenth, get the directory for holding the crystal files. 
 	crystal_foldername = place_files_in+'/'+crystal_identifier
 
-	# Seventeenth, create the folder for storing the crystals we want to rejig.
-	make_folder(crystal_foldername)
+	# Fifteenth, create the folder for storing the crystals we want to rejig.
+	file_writer.make_folder(crystal_foldername)
 
-	# Eighteenth, create the directory for saving molecules to rejig into.
+	# Sixteenth, create the directory for saving molecules to rejig into.
 	rejig_molecules_directory = place_files_in+'/'+crystal_identifier+'/rejig_molecules'
 
-	# Ninteenth, create the folder to store molecule files to be rejigged by Gaussian/ORCA. 
-	make_folder(rejig_molecules_directory)
+	# Seventeenth, create the folder to store molecule files to be rejigged by Gaussian/ORCA. 
+	file_writer.make_folder(rejig_molecules_directory)
 
-	# Twentieth, create the directory for saving the original molecule files into.
+	# Eighteenth, create the directory for saving the original molecule files into.
 	original_molecules_directory = place_files_in+'/'+crystal_identifier+'/original_molecules'
 
-	# Twenty-first, create the folder to store molecule xyz data to.
-	make_folder(original_molecules_directory)
+	# Ninteenth, create the folder to store molecule xyz data to.
+	file_writer.make_folder(original_molecules_directory)
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
 	
-	# Twenty-second, obtain the software you want to use to relax the added or modified atoms in the molecules in the crystal. 
+	# Twentieth, obtain the software you want to use to relax the added or modified atoms in the molecules in the crystal. 
 	calculation_software =  calc_parameters['calc_software']
 
-	# Twenty-third, save the molecules you want to rejig to file.
+	# Twenty-first, save the molecules you want to rejig to file.
 	for molecule_name, molecule in sorted(molecules_to_rejig.items()):
 
-		# 23.1: Obtain the graph for this molecule.
-		molecule_graph = deepcopy(molecule_graphs[molecule_name])
+		# 21.1: Obtain a read-only view of the graph for this molecule.
+		molecule_graph = read_only_graph(molecule_graphs[molecule_name])
 
-		# 23.2: Determine if this molecule is a solvent, and if so record it in the molecule name.
+		# 21.2: Determine if this molecule is a solvent, and if so record it in the molecule name.
 		molecule_name_for_file = str(molecule_name) + str('S' if (molecule_name in solvent_components) else '')
 
-		# 23.3: Create the files for running the program in Gaussian or ORCA. 
+		# 21.3: Create the files for running the program in Gaussian or ORCA. 
 		if   calculation_software.lower() == 'gaussian':
-			write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name_for_file, rejig_molecules_directory, calc_parameters, submission_information)
+			write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name_for_file, rejig_molecules_directory, calc_parameters, submission_information, file_writer=file_writer)
 		elif calculation_software.lower() == 'orca':
 			write_orca_optimisation_files    (molecule, molecule_graph, molecule_name_for_file, rejig_molecules_directory, calc_parameters, submission_information)
 		else:
@@ -210,35 +216,59 @@ def ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbo
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
 
-	# Twenty-fourth, create the original xyz file for the molecules in this crystal. 
+	# Twenty-second, create the original xyz file for the molecules in this crystal. 
 	for molecule_name in sorted(molecules.keys()):
 
-		# 24.1: Obtain the molecule and its associated graph.
+		# 22.1: Obtain the molecule and a read-only view of its associated graph.
 		molecule       = molecules[molecule_name].copy()
-		molecule_graph = deepcopy(molecule_graphs[molecule_name])
+		molecule_graph = read_only_graph(molecule_graphs[molecule_name])
 
-		# 24.2: Add the node and edge information from the molecules graph back to the molecule
-		add_graph_to_ASE_Atoms_object(molecule, deepcopy(molecule_graph))
+		# 22.2: Add the node and edge information from the molecules graph back to the molecule
+		add_graph_to_ASE_Atoms_object(molecule, molecule_graph)
 
-		# 24.3: Save molecule to disk
+		# 22.3: Save molecule to file_writer
 		solvent_tag = 'S' if molecule_name in solvent_components else ''
-		write(original_molecules_directory+'/'+str(molecule_name)+str(solvent_tag)+'.xyz', molecule)
+		with file_writer.open_file(original_molecules_directory+'/'+str(molecule_name)+str(solvent_tag)+'.xyz') as moleculeXYZ:
+			write(moleculeXYZ, molecule, format='extxyz')
 
 	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
 
-	# Twenty-fifth, copy the original crystal file for this molecule
+	# Twenty-third, copy the original crystal file for this molecule
 	#shutil.copyfile(filepath, place_files_in+'/'+crystal_identifier+'/'+crystal_identifier+'.xyz')
 
-	# Twenty-fifth, create the updated crystal.
+	# Twenty-third, create the updated crystal.
 	crystal, crystal_graph = make_crystal(molecules, symmetry_operations, cell, wrap=False, solvent_components=SolventsList, remove_solvent=False, molecule_graphs=molecule_graphs, return_all_molecules=False)
 
-	# Twenty-sixth, add the node and edge information from the molecules graph back to the molecule
+	# Twenty-fourth, add the node and edge information from the molecules graph back to the molecule
 	add_graph_to_ASE_Atoms_object(crystal, crystal_graph)
 
-	# Twenty-seventh, have the updated crystal as a xyz file to the repaired_crystal_database folder. 
-	write(place_files_in+'/'+crystal_identifier+'/'+crystal_identifier+'.xyz', crystal)
+	# Twenty-fifth, have the updated crystal as a xyz file to the repaired_crystal_database folder. 
+	with file_writer.open_file(place_files_in+'/'+crystal_identifier+'/'+crystal_identifier+'.xyz') as crystalXYZ:
+		write(crystalXYZ, crystal, format='extxyz')
+
+	# Twenty-sixth, write all the folders and files for this crystal to disk.
+	file_writer.flush()
 
-	# Twenty-eighth, return True as we have made the file for this crystal to be rejigged.
+	# Twenty-seventh, return True as we have made the file for this crystal to be rejigged.
 	return True
 
 # -----------------------------------------------------------------------------------------------------------------------------
+
+def write_second_neighbour_records(second_neighbour_records, mode='w'):
+	"""
+	This method will write the 2nd neighbour hydrogens that will also be rejigged to the Rejig_rejigging_2nd_neighbour.txt file.
+
+	Parameters
+	----------
+	second_neighbour_records : list of (str., list of int)
+		These are the (crystal_identifier, atom_indices) of the 2nd neighbour hydrogens that will also be rejigged.
+	mode : str.
+		This is the mode to open the Rejig_rejigging_2nd_neighbour.txt file with. Default: 'w'
+	"""
+	with open(second_neighbour_filename, mode) as Rejig_rejigging_2nd_neighbourTXT:
+		for crystal_identifier, n_of_n_atom_indices_to_rejig in second_neighbour_records:
+			Rejig_rejigging_2nd_neighbourTXT.write(f'{crystal_identifier}\n')
+			Rejig_rejigging_2nd_neighbourTXT.write(f'{n_of_n_atom_indices_to_rejig}\n')
+			Rejig_rejigging_2nd_neighbourTXT.write('============================================================\n')
+
+# -----------------------------------------------------------------------------------------------------------------------------
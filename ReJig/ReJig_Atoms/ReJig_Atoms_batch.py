@@ -0,0 +1,242 @@
+"""
+ReJig_Atoms_batch.py, Geoffrey Weal, 18/10/26
+
+This method is designed to run the ReJig_Atoms method across many crystals, fanning the crystals out over a pool of processes.
+
+"""
+import os, io
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+from ReJig.ReJig_Atoms.ReJig_Atoms              import ReJig_Atoms, second_neighbour_filename, write_second_neighbour_records
+from ReJig.Utilities.scan_added_or_modified      import scan_crystal_for_added_or_modified_atoms
+
+# This is the file that the crystals that were skipped because they have no added or modified atoms are listed in.
+skipped_crystals_filename = 'ReJig_skipped_crystals.txt'
+
+def ReJig_Atoms_batch(filepaths, calc_parameters, submission_information, rejig_neighbouring_hydrogens=False, place_files_in='rejigged_crystals', workers=1, prefilter=True, write_workers=1, archive_files=False):
+	"""
+	This method is designed to run the ReJig_Atoms method across many crystals, fanning the crystals out over a pool of processes.
+
+	Each crystal is independent of every other crystal, so each crystal is given to its own process. The printed output
+	from each crystal is collected and printed in the same order as filepaths, so the output is the same no matter how many
+	workers are used. The 2nd neighbour hydrogens that will also be rejigged are given back by each crystal, and are written to
+	the Rejig_rejigging_2nd_neighbour.txt file once all crystals have been processed, in the same order as filepaths.
+
+	Parameters
+	----------
+	filepaths : list of str. or str.
+		These are the paths to the crystal files that you want to process. If this is a str, this is the path to the folder containing the crystal database.
+	calc_parameters : dict.
+		This dictionary describes the parameters needs to perform the geometry optimisation job in Gaussian/ORCA.
+	submission_information : dict.
+		This dictionary describes all the parameters you want to add to the submit.sl script for submitting this Gaussian/ORCA job to slurm.
+	rejig_neighbouring_hydrogens : bool.
+		This boolean indicates if you want any hydrogens that are attached to atoms that have the added_or_modified tag set to True to also allow to be rejigged.
+	place_files_in : str.
+		This is the folder you want to save ReJig files to.
+	workers : int.
+		This is the number of processes to use. If 1, each crystal will be processed one after the other in this process. Default: 1
+	prefilter : bool.
+		This boolean indicates if you want to quickly check the "added_or_modified" column of each crystal file first, and skip any crystals that have no added or modified atoms. The skipped crystals are listed in the ReJig_skipped_crystals.txt file. Default: True
+	write_workers : int.
+		This is the number of threads each process uses to write the files of a crystal to disk. Default: 1
+	archive_files : bool.
+		This boolean indicates if you want to write all the files for each crystal into one place_files_in/"crystal_identifier".tar file, rather than as separate files. Default: False
+
+	Returns
+	-------
+	rejig_results : list of (str., bool., str.)
+		This list contains the (filepath, did_make_rejig_files, error_message) for each crystal, in the same order as filepaths. error_message is None if no error occurred.
+	"""
+
+	# First, if a folder has been given, obtain the paths to all the crystals in this folder.
+	if isinstance(filepaths, str):
+		filepaths = get_crystal_filepaths(filepaths)
+
+	# Second, check that workers is a positive integer.
+	if not (isinstance(workers, int) and (workers >= 1)):
+		raise Exception(f'Error: workers must be an integer greater than or equal to 1. workers = {workers}')
+
+	# Third, obtain the inputs to give to each ReJig_Atoms run.
+	tasks = [(filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens, place_files_in, workers > 1, prefilter, write_workers, archive_files) for filepath in filepaths]
+
+	# Fourth, obtain the total number of crystal you want to process.
+	total_no_of_crystals = len(tasks)
+
+	# Fifth, initialise the lists to hold the results for each crystal, the crystals that were skipped, and the 2nd neighbour hydrogens that will also be rejigged.
+	rejig_results = []
+	skipped_filepaths = []
+	second_neighbour_records = []
+
+	# Sixth, run ReJig_Atoms on each crystal.
+	if workers == 1:
+
+		# 6.1: Run each crystal one after the other in this process.
+		for counter, task in enumerate(tasks, start=1):
+			print(f'Running crystal: {counter} out of {total_no_of_crystals}')
+			filepath, did_make_rejig_files, error_message, _, was_skipped, crystal_second_neighbour_records = run_ReJig_Atoms_task(task)
+			rejig_results.append((filepath, did_make_rejig_files, error_message))
+			second_neighbour_records += crystal_second_neighbour_records
+			if was_skipped:
+				skipped_filepaths.append(filepath)
+
+	else:
+
+		# 6.2: Run the crystals in a pool of processes. executor.map returns results in the order of tasks.
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			for counter, (filepath, did_make_rejig_files, error_message, printed_output, was_skipped, crystal_second_neighbour_records) in enumerate(executor.map(run_ReJig_Atoms_task, tasks), start=1):
+				print(f'Running crystal: {counter} out of {total_no_of_crystals}')
+				print(printed_output, end='')
+				rejig_results.append((filepath, did_make_rejig_files, error_message))
+				second_neighbour_records += crystal_second_neighbour_records
+				if was_skipped:
+					skipped_filepaths.append(filepath)
+
+	# Seventh, write the crystals that were skipped to file.
+	if prefilter:
+		write_skipped_crystals(skipped_filepaths)
+
+	# 7.1: Write the 2nd neighbour hydrogens that will also be rejigged to file. This is only done here, so that processes do not write to this file at the same time.
+	if os.path.exists(second_neighbour_filename):
+		os.remove(second_neighbour_filename)
+	if len(second_neighbour_records) > 0:
+		write_second_neighbour_records(second_neighbour_records)
+
+	# Eighth, report any errors that occurred.
+	print_ReJig_Atoms_batch_summary(rejig_results, skipped_filepaths if prefilter else None)
+
+	# Ninth, return rejig_results
+	return rejig_results
+
+# -----------------------------------------------------------------------------------------------------------------------------
+
+def get_crystal_filepaths(crystal_database_dirpath):
+	"""
+	This method will obtain the paths to all the .xyz crystal files in the crystal database folder, in alphabetical order.
+
+	Parameters
+	----------
+	crystal_database_dirpath : str.
+		This is the path to the folder containing the crystal database.
+
+	Returns
+	-------
+	filepaths : list of str.
+		These are the paths to all the crystal files in crystal_database_dirpath.
+	"""
+
+	# First, check that the crystal database exists.
+	if not os.path.exists(crystal_database_dirpath):
+		raise Exception(f'Error: {crystal_database_dirpath} does not exist in {os.getcwd()}')
+
+	# Second, obtain the paths to all the crystals in this folder that end with ".xyz".
+	return [crystal_database_dirpath+'/'+filename for filename in sorted(os.listdir(crystal_database_dirpath)) if filename.endswith('.xyz')]
+
+def run_ReJig_Atoms_task(task):
+	"""
+	This method will run the ReJig_Atoms method for one crystal, recording any error rather than raising it.
+
+	Parameters
+	----------
+	task : tuple
+		This contains the (filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens, place_files_in, capture_output, prefilter, write_workers, archive_files) inputs for this crystal.
+
+	Returns
+	-------
+	filepath : str.
+		This is the path to the crystal that was processed.
+	did_make_rejig_files : bool. or None
+		This indicates if files were made to rejig this crystal. None if an error occurred.
+	error_message : str. or None
+		This is the traceback of the error if one occurred, otherwise None.
+	printed_output : str. or None
+		This is the output printed while processing this crystal if capture_output is True, otherwise None.
+	was_skipped : bool.
+		This indicates if this crystal was skipped because it has no added or modified atoms.
+	second_neighbour_records : list of (str., list of int)
+		These are the (crystal_identifier, atom_indices) of the 2nd neighbour hydrogens in this crystal that will also be rejigged.
+	"""
+
+	# First, obtain the inputs for this crystal.
+	filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens, place_files_in, capture_output, prefilter, write_workers, archive_files = task
+
+	# Second, set up where the printed output is sent to.
+	printed_output = io.StringIO() if capture_output else None
+
+	# Third, if prefilter is True, check if any atoms in this crystal have been added or modified, only reading the "added_or_modified" column of the crystal file.
+	#        * If none have, skip this crystal.
+	try:
+		if prefilter and (scan_crystal_for_added_or_modified_atoms(filepath) == False):
+			return filepath, False, None, ('' if capture_output else None), True, []
+	except Exception:
+		# The crystal file could not be read here, so ReJig_Atoms will report the problem below.
+		pass
+
+	# Fourth, run the ReJig_Atoms method on this crystal.
+	#         * The crystal file has already been checked above, so ReJig_Atoms does not need to check it again.
+	did_make_rejig_files = None
+	error_message = None
+	second_neighbour_records = []
+	try:
+		if capture_output:
+			with redirect_stdout(printed_output):
+				did_make_rejig_files = ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens=rejig_neighbouring_hydrogens, place_files_in=place_files_in, prefilter=False, write_workers=write_workers, archive_files=archive_files, second_neighbour_records=second_neighbour_records)
+		else:
+			did_make_rejig_files = ReJig_Atoms(filepath, calc_parameters, submission_information, rejig_neighbouring_hydrogens=rejig_neighbouring_hydrogens, place_files_in=place_files_in, prefilter=False, write_workers=write_workers, archive_files=archive_files, second_neighbour_records=second_neighbour_records)
+	except Exception:
+		error_message = traceback.format_exc()
+
+	# Fifth, return the results of this crystal.
+	return filepath, did_make_rejig_files, error_message, (printed_output.getvalue() if capture_output else None), False, second_neighbour_records
+
+def write_skipped_crystals(skipped_filepaths):
+	"""
+	This method will write the crystals that were skipped because they have no added or modified atoms to the ReJig_skipped_crystals.txt file.
+
+	Parameters
+	----------
+	skipped_filepaths : list of str.
+		These are the paths to the crystals that were skipped.
+	"""
+	with open(skipped_crystals_filename, 'w') as skipped_crystalsTXT:
+		skipped_crystalsTXT.write('# These crystals were skipped as they do not have any atoms with the added_or_modified tag set to True.\n')
+		for filepath in skipped_filepaths:
+			skipped_crystalsTXT.write(filepath+'\n')
+
+def print_ReJig_Atoms_batch_summary(rejig_results, skipped_filepaths=None):
+	"""
+	This method will print how many crystals will be rejigged, and any crystals that could not be processed.
+
+	Parameters
+	----------
+	rejig_results : list of (str., bool., str.)
+		This list contains the (filepath, did_make_rejig_files, error_message) for each crystal.
+	skipped_filepaths : list of str. or None
+		These are the paths to the crystals that were skipped because they have no added or modified atoms. None if crystals were not checked for this. Default: None
+	"""
+
+	# First, print the number of crystals that will be rejigged, and the number that were skipped.
+	rejig_counter = sum([int(did_make_rejig_files == True) for _, did_make_rejig_files, _ in rejig_results])
+	print(f'Number of crystals to rejig: {rejig_counter}')
+	if skipped_filepaths is not None:
+		print(f'Number of crystals skipped as they have no added or modified atoms: {len(skipped_filepaths)} (see {skipped_crystals_filename})')
+
+	# Second, obtain the crystals that could not be processed.
+	crystals_with_errors = [(filepath, error_message) for filepath, _, error_message in rejig_results if (error_message is not None)]
+
+	# Third, if there were no errors, return.
+	if len(crystals_with_errors) == 0:
+		return
+
+	# Fourth, print the errors for each crystal.
+	print('----------------------------------------------------------------------')
+	print(f'The following {len(crystals_with_errors)} crystals could not be processed:')
+	for filepath, error_message in crystals_with_errors:
+		print('----------------------------------------------------------------------')
+		print(filepath)
+		print(error_message.rstrip())
+	print('----------------------------------------------------------------------')
+
+# -----------------------------------------------------------------------------------------------------------------------------
@@ -3,15 +3,18 @@ write_gaussian_optimisation_files.py, Geoffrey Weal, 29/4/24
 
 This script is designed to write the gaussian files and submit.sl files required for performing Gaussian jobs for relaxing added or modified atoms in a molecule in your crystal. 
 """
-from copy                                                                              import deepcopy
 from SUMELF                                                                            import make_folder
 from SUMELF                                                                            import check_molecule_against_file
 from SUMELF                                                                            import add_graph_to_ASE_Atoms_object
-from ReJig.ReJig_Atoms.write_molecules_to_disk_methods.write_methods.gaussian_modified import write_gaussian_in
+from ReJig.ReJig_Atoms.write_molecules_to_disk_methods.write_methods.gaussian_modified import GaussianInputTemplate
 from ReJig.ReJig_Atoms.write_molecules_to_disk_methods.write_methods.shared_methods    import change_folder_name_components
 from ReJig.ReJig_Atoms.write_molecules_to_disk_methods.write_methods.shared_methods    import slurmSL_header, load_gaussian_programs, make_gaussian_temp_folder, remove_gaussian_temp_files
+from ReJig.Utilities.bulk_file_writer                                                  import open_file
 
-def write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name, gaussian_jobs_path, calc_parameters, submission_information):
+# These are the Gaussian input templates that have been compiled, so that they only need to be compiled once for all the molecules that use the same parameters.
+gaussian_input_templates = {}
+
+def write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name, gaussian_jobs_path, calc_parameters, submission_information, file_writer=None):
 	"""
 	This method will write information the Gaussian files to disk.
 
@@ -29,11 +32,14 @@ def write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name, g
 		This dictionary contain all the information required for the Gaussian input RE file.
 	submission_information : list
 		This dictionary contain all the information required for the submit.sl script. 
+	file_writer : ReJig.Utilities.bulk_file_writer.BulkFileWriter or None
+		If given, the folders and files are given to this BulkFileWriter to be written to disk later, rather than being written straight away. Default: None
 	"""
 
 	# First, make a copy of the gaussian_parameters and submission_information dictionaries.
-	gaussian_parameters    = deepcopy(calc_parameters)
-	submission_information = deepcopy(submission_information)
+	#        * Only the entries in these dictionaries are added, changed, or removed, so a shallow copy is enough.
+	gaussian_parameters    = dict(calc_parameters)
+	submission_information = dict(submission_information)
 	del gaussian_parameters['calc_software']
 
 	# Second, determine if some critical tags that are needed are in the submission_information dictionary. 
@@ -62,7 +68,10 @@ def write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name, g
 	gaussian_folder = str(gaussian_jobs_path)+'/'+str(molecule_name)+'/'+str(funct_and_basis_name)
 
 	# Fifth, make the folder to save the gif and slurm submit files.
-	make_folder(gaussian_folder)
+	if file_writer is not None:
+		file_writer.make_folder(gaussian_folder)
+	else:
+		make_folder(gaussian_folder)
 
 	# =============================================================================
 	# Sixth, for those temporary files that I have control over where they get saved to, 
@@ -103,15 +112,37 @@ def write_gaussian_optimisation_files(molecule, molecule_graph, molecule_name, g
 	# =============================================================================
 
 	# Tenth, create the gaussian .gjf file for optimising the ground and excited structures.
-	with open(full_path_to_gjf_file, 'w') as fd:	
-		write_gaussian_in(fd, molecule.copy(), perform_opt=True, perform_CalcAll=False, perform_TD=False, perform_freq=False, perform_raman=False, perform_density=False, perform_pop=False, read_chk_file=False, molecule_name=molecule_name, **gaussian_parameters)
+	#        * The scratch files are the only parameters that change between molecules, so these are given to the template for each molecule.
+	per_molecule_link0_parameters = {suffix: gaussian_parameters[suffix] for suffix in ['rwf','int','d2e','skr']} if scratch_dir_given else {}
+	gaussian_input_template = get_gaussian_input_template({key: value for key, value in gaussian_parameters.items() if key not in per_molecule_link0_parameters})
+	with open_file(full_path_to_gjf_file, file_writer) as fd:	
+		fd.write(gaussian_input_template.render(molecule, molecule_name=molecule_name, link0_params=per_molecule_link0_parameters))
 
 	# Eleventh, create the submit script for submitting jobs to slurm.
-	make_gaussian_submitSL(ground_structure_GS_DFT_main_opt, gaussian_folder, functional, basis_set, gaussian_parameters, **submission_information)
+	make_gaussian_submitSL(ground_structure_GS_DFT_main_opt, gaussian_folder, functional, basis_set, gaussian_parameters, file_writer=file_writer, **submission_information)
+
+def get_gaussian_input_template(gaussian_parameters):
+	"""
+	This method will obtain the Gaussian input template for these parameters, compiling it if it has not been compiled yet.
+
+	Parameters
+	----------
+	gaussian_parameters : dict.
+		These are the parameters for the Gaussian input file.
+
+	Returns
+	-------
+	gaussian_input_template : GaussianInputTemplate
+		This is the compiled Gaussian input template.
+	"""
+	template_key = repr(sorted(gaussian_parameters.items()))
+	if template_key not in gaussian_input_templates:
+		gaussian_input_templates[template_key] = GaussianInputTemplate(perform_opt=True, perform_CalcAll=False, perform_TD=False, perform_freq=False, perform_raman=False, perform_density=False, perform_pop=False, read_chk_file=False, **gaussian_parameters)
+	return gaussian_input_templates[template_key]
 
 # ------------------------------------------------------------------------------------------------------------------------------
 
-def make_gaussian_submitSL(optimisation_filename_DFT_main_opt, local_path, functional, basis_set, gaussian_parameters, cpus_per_task, mem, time, partition='parallel', constraint=None, nodelist=None, exclude=None, email='', gaussian_version='gaussian/g16', temp_folder_path=None):
+def make_gaussian_submitSL(optimisation_filename_DFT_main_opt, local_path, functional, basis_set, gaussian_parameters, cpus_per_task, mem, time, partition='parallel', constraint=None, nodelist=None, exclude=None, email='', gaussian_version='gaussian/g16', temp_folder_path=None, file_writer=None):
 	"""
 	This method will write the submit.sl file in parallel
 
@@ -149,13 +180,15 @@ def make_gaussian_submitSL(optimisation_filename_DFT_main_opt, local_path, funct
 		This is the version of Gaussian you want to load/use in slurm. Default: 'gaussian/g16'
 	temp_folder_path : str. or None
 		This is the path to the scratch directory to save Gaussian temp files to. If you dont give this, Gaussian temp files will be saves to the default scratch directory. Default: None
+	file_writer : ReJig.Utilities.bulk_file_writer.BulkFileWriter or None
+		If given, the submit.sl file is given to this BulkFileWriter to be written to disk later, rather than being written straight away. Default: None
 	"""
 
 	# Get version of Gaussian to use
 	gaussian_version_suffix = str(gaussian_version.split('/')[-1])
 
 	# Make changes to gaussian_parameters to change gaussian filenames to include "main_opt" in their name.
-	gaussian_parameters_main_opt = deepcopy(gaussian_parameters)
+	gaussian_parameters_main_opt = dict(gaussian_parameters)
 	for gaussian_file in ['chk', 'd2e', 'int', 'rwf', 'skr']:
 		if gaussian_file in gaussian_parameters_main_opt:
 			gaussian_filename = gaussian_parameters_main_opt[gaussian_file]
@@ -168,7 +201,7 @@ def make_gaussian_submitSL(optimisation_filename_DFT_main_opt, local_path, funct
 	name = 'ReJig' + '-' + '-'.join(local_path.split('/')[-4:-1])
 
 	# Writing the submit.sl script
-	with open(local_path+'/submit.sl', "w") as submitSL:
+	with open_file(local_path+'/submit.sl', file_writer) as submitSL:
 		slurmSL_header(submitSL, name, mem, partition, constraint, nodelist, time, email, cpus_per_task=cpus_per_task, exclude=exclude)
 		make_gaussian_temp_folder(submitSL, temp_folder_path)
 		load_gaussian_programs(submitSL, gaussian_version)
@@ -6,7 +6,7 @@ gaussian_modified is designed to save the gaussian .gjf to file.
 This file has been modified from https://gitlab.com/ase/ase/-/blob/master/ase/io/gaussian.py to allow the user to include fragements in the .gjf file.
 
 Methods that have been modifed are:
-    * write_gaussian_in
+    * write_gaussian_in (now compiles a GaussianInputTemplate and renders it)
 
 Cerated methods:
 * _format_nosymm_Gaussian_calc
@@ -14,6 +14,8 @@ Cerated methods:
 * _format_TD_Gaussian_calc
 * _read_chk_file_method
 * _add_read_checkpoint
+* GaussianInputTemplate
+* _format_molecule_spec
 
 """
 import re
@@ -424,120 +426,223 @@ def write_gaussian_in(fd, atoms, perform_opt, perform_CalcAll, perform_TD,
         route section.
     '''
 
-    params = deepcopy(params)
+    template = GaussianInputTemplate(perform_opt, perform_CalcAll, perform_TD, perform_freq, perform_raman, perform_density, perform_pop,
+                                     properties=properties, method=method, basis=basis, fitting_basis=fitting_basis, output_type=output_type,
+                                     basisfile=basisfile, basis_set=basis_set, xc=xc, charge=charge, mult=mult, extra=extra, read_chk_file=read_chk_file,
+                                     ioplist=ioplist, addsec=addsec, spinlist=spinlist, zefflist=zefflist, qmomlist=qmomlist, nmagmlist=nmagmlist,
+                                     znuclist=znuclist, radnuclearlist=radnuclearlist, td_settings=td_settings, **params)
+    fd.write(template.render(atoms, molecule_name=molecule_name))
 
-    if properties is None:
-        properties = ['energy']
 
-    output_type = _format_output_type(output_type)
+class GaussianInputTemplate:
+    '''
+    A Gaussian input file that has been compiled from the calculation
+    parameters, so that it can be written for many molecules.
 
-    # basis can be omitted if basisfile is provided
-    if basis is None:
-        if basisfile is not None or basis_set is not None:
-            basis = 'gen'
+    The link0 and route sections, the basis set and the additional sections
+    are made once when the template is made. Only the parts of the file that
+    change between molecules are made by the render method: the title, the
+    charge and multiplicity, the atom positions (with freeze flags), and any
+    link0 keywords that change between molecules (such as scratch files).
 
-    # determine method from xc if it is provided
-    if method is None:
-        if xc is not None:
-            method = _xc_to_method.get(xc.lower(), xc)
+    The parameters are the same as for write_gaussian_in.
+    '''
 
-    # If the user requests a problematic method, rather than raising an error
-    # or proceeding blindly, give the user a warning that the results parsed
-    # by ASE may not be meaningful.
-    if method is not None:
-        _check_problem_methods(method)
+    def __init__(self, perform_opt, perform_CalcAll, perform_TD,
+                 perform_freq, perform_raman, perform_density,
+                 perform_pop, properties=['energy'],
+                 method=None, basis=None, fitting_basis=None,
+                 output_type=None, basisfile=None, basis_set=None,
+                 xc=None, charge=None, mult=None, extra=None, read_chk_file=False,
+                 ioplist=None, addsec=None, spinlist=None,
+                 zefflist=None, qmomlist=None, nmagmlist=None,
+                 znuclist=None, radnuclearlist=None,
+                 td_settings=None, **params):
+
+        params = deepcopy(params)
+
+        if properties is None:
+            properties = ['energy']
+
+        output_type = _format_output_type(output_type)
+
+        # basis can be omitted if basisfile is provided
+        if basis is None:
+            if basisfile is not None or basis_set is not None:
+                basis = 'gen'
+
+        # determine method from xc if it is provided
+        if method is None:
+            if xc is not None:
+                method = _xc_to_method.get(xc.lower(), xc)
+
+        # If the user requests a problematic method, rather than raising an error
+        # or proceeding blindly, give the user a warning that the results parsed
+        # by ASE may not be meaningful.
+        if method is not None:
+            _check_problem_methods(method)
+
+        # The charge and multiplicity are determined from each molecule if they are not given.
+        self.charge = charge
+        self.mult = mult
+
+        #######################################################
+        # set up link0 arguments
+        # The link0 parameters are kept so that any that change between
+        # molecules can be swapped in by the render method.
+        self.link0_params = {key: params[key] for key in _link0_keys + _link0_special if key in params}
+        params, self.link0_lines = _pop_link0_params(params)
+
+        # begin route line
+        # note: unlike in old calculator, each route keyword is put on its own
+        # line.
+        route_lines = [_format_method_basis(output_type, method, basis, fitting_basis)]
+
+        #######################################################
+        # ADDED BY GRW
+        if perform_opt:
+            route_lines.append(_format_opt_Gaussian_calc(output_type, perform_CalcAll=perform_CalcAll))
+        if perform_TD:
+            route_lines.append(_format_TD_Gaussian_calc(output_type, td_settings))
+        if perform_freq:
+            route_lines.append(_format_freq_Gaussian_calc(output_type, perform_raman))
+        if perform_density:
+            route_lines.append(_format_density_Gaussian_calc(output_type))
+        if perform_pop:
+            route_lines.append(_format_population_analysis_Gaussian_calc(output_type))
+        route_lines.append(_format_nosymm_Gaussian_calc(output_type))
+        route_lines.append(_format_Int_grid(output_type))
+        if read_chk_file:
+            route_lines.append(_read_chk_file_method(output_type))
+        #######################################################
+
+        # If the calculator's parameter dictionary contains an isolist, we ignore
+        # this - it is up to the user to attach this info as the atoms' masses
+        # if they wish for it to be used:
+        params.pop('isolist', None)
+
+        # Any params left will belong in the route section of the file:
+        route_lines.extend(_format_route_params(params))
+
+        if ioplist is not None:
+            route_lines.append('IOP(' + ', '.join(ioplist) + ')')
+
+        # raw list of explicit keywords for backwards compatibility
+        if extra not in [None, '']:
+            route_lines.append(extra)
+
+        # Add 'force' iff the user requested forces, since Gaussian crashes when
+        # 'force' is combined with certain other keywords such as opt and irc.
+        if 'forces' in properties and 'force' not in params:
+            route_lines.append('force')
+
+        self.route_lines = route_lines
+
+        # make dict of nuclear properties:
+        nuclear_props = {'spin': spinlist, 'zeff': zefflist, 'qmom': qmomlist,
+                         'nmagm': nmagmlist, 'znuc': znuclist,
+                         'radnuclear': radnuclearlist}
+        self.nuclear_props = {k: v for k, v in nuclear_props.items() if v is not None}
+
+        self.read_chk_file = read_chk_file
+
+        # The basis set file is only read once here, rather than for every molecule.
+        self.tail_lines = _format_basis_set(basis, basisfile, basis_set) + _format_addsec(addsec) + ['', '']
+
+    def render(self, atoms, molecule_name=None, link0_params=None):
+        '''
+        Generates the Gaussian input file for a molecule as a string.
 
-    # determine charge from initial charges if not passed explicitly
-    if charge is None:
-        charge = atoms.get_initial_charges().sum()
+        Parameters
+        -----------
+        atoms: Atoms
+            Structure to write to the input file
+        molecule_name : str
+            This is the name of the molecule (monomer). Default: None
+        link0_params: dict
+            Any link0 keywords whose values are different for this molecule
+            (such as the scratch files ``rwf``, ``int``, ``d2e`` and ``skr``).
+            Default: None
+        '''
 
-    #######################################################
-    # determine multiplicity from initial magnetic moments
-    # if not passed explicitly
-    # GRW Modification: only allow lowest multiplicity possible
-    if mult is None:
-        mult = (atoms.get_initial_magnetic_moments().sum() % 2.0) + 1
+        # Obtain the link0 lines, with any link0 keywords for this molecule.
+        if link0_params:
+            all_link0_params = dict(self.link0_params)
+            all_link0_params.update(link0_params)
+            _, link0_lines = _pop_link0_params(all_link0_params)
+        else:
+            link0_lines = self.link0_lines
+
+        # determine charge from initial charges if not passed explicitly
+        charge = self.charge
+        if charge is None:
+            charge = atoms.get_initial_charges().sum()
+
+        #######################################################
+        # determine multiplicity from initial magnetic moments
+        # if not passed explicitly
+        # GRW Modification: only allow lowest multiplicity possible
+        mult = self.mult
+        if mult is None:
+            mult = (atoms.get_initial_magnetic_moments().sum() % 2.0) + 1
+
+        # Get the header for this Gaussian Job
+        header_of_file = 'ReJig Geometric Optimsation for molecule '+str(molecule_name)
+
+        # header, charge, and mult
+        out = link0_lines + self.route_lines + ['', header_of_file, '', '{:.0f} {:.0f}'.format(charge, mult)]
+
+        #######################################################
+        # Extra components added by GRW
+        # atomic positions and nuclear properties:
+        if not self.read_chk_file:
+            out.extend(_format_molecule_spec(atoms, self.nuclear_props))
+        else:
+            out += ['']
+        #######################################################
+
+        out.extend(self.tail_lines)
+        return '\n'.join(out)
 
-    #######################################################
-    # set up link0 arguments
-    out = []
-    params, link0_list = _pop_link0_params(params)
-    out.extend(link0_list)
-
-    # begin route line
-    # note: unlike in old calculator, each route keyword is put on its own
-    # line.
-    out.append(_format_method_basis(output_type, method, basis, fitting_basis))
-
-    #######################################################
-    # ADDED BY GRW
-    if perform_opt:
-        out.append(_format_opt_Gaussian_calc(output_type, perform_CalcAll=perform_CalcAll))
-    if perform_TD:
-        out.append(_format_TD_Gaussian_calc(output_type, td_settings))
-    if perform_freq:
-        out.append(_format_freq_Gaussian_calc(output_type, perform_raman))
-    if perform_density:
-        out.append(_format_density_Gaussian_calc(output_type))
-    if perform_pop:
-        out.append(_format_population_analysis_Gaussian_calc(output_type))
-    out.append(_format_nosymm_Gaussian_calc(output_type))
-    out.append(_format_Int_grid(output_type))
-    if read_chk_file:
-        out.append(_read_chk_file_method(output_type))
-    #######################################################
-
-    # If the calculator's parameter dictionary contains an isolist, we ignore
-    # this - it is up to the user to attach this info as the atoms' masses
-    # if they wish for it to be used:
-    params.pop('isolist', None)
-
-    # Any params left will belong in the route section of the file:
-    format_route_params = _format_route_params(params)
-    if not format_route_params == []:
-        out.extend(format_route_params)
-
-    if ioplist is not None:
-        out.append('IOP(' + ', '.join(ioplist) + ')')
-
-    # raw list of explicit keywords for backwards compatibility
-    if extra not in [None, '']:
-        out.append(extra)
-
-    # Add 'force' iff the user requested forces, since Gaussian crashes when
-    # 'force' is combined with certain other keywords such as opt and irc.
-    if 'forces' in properties and 'force' not in params:
-        out.append('force')
-
-    # Get the header for this Gaussian Job
-    header_of_file = 'ReJig Geometric Optimsation for molecule '+str(molecule_name)
-
-    # header, charge, and mult
-    out += ['', header_of_file, '', '{:.0f} {:.0f}'.format(charge, mult)]
-
-    # make dict of nuclear properties:
-    nuclear_props = {'spin': spinlist, 'zeff': zefflist, 'qmom': qmomlist,
-                     'nmagm': nmagmlist, 'znuc': znuclist,
-                     'radnuclear': radnuclearlist} 
-    nuclear_props = {k: v for k, v in nuclear_props.items() if v is not None}
-
-    #######################################################
-    # Extra components added by GRW
-    # atomic positions and nuclear properties:
-    if not read_chk_file:
-        molecule_spec = _get_molecule_spec(atoms, nuclear_props)
-        for line in molecule_spec:
-            out.append(line)
-    else:
-        out += ['']
-    #######################################################
 
-    out.extend(_format_basis_set(basis, basisfile, basis_set))
+def _format_molecule_spec(atoms, nuclear_props):
+    ''' Generate the molecule specification section to write to the
+    Gaussian input file. The positions of all the atoms are formatted
+    in one go, rather than one atom at a time. Atoms with nuclear
+    properties or modified masses are written by _get_molecule_spec'''
 
-    out.extend(_format_addsec(addsec))
+    # Atoms with nuclear properties or modified masses need their own
+    # symbol sections, so use _get_molecule_spec for these.
+    numbers = atoms.get_atomic_numbers()
+    if len(nuclear_props) > 0 or np.any(atoms.get_masses() != np.array(atomic_masses_iupac2016)[numbers]):
+        return _get_molecule_spec(atoms, nuclear_props)
 
-    out += ['', '']
-    fd.write('\n'.join(out))
+    # Constrain atoms
+    frozen = np.zeros(len(atoms), dtype=bool)
+    for constraint in atoms.constraints:
+        if isinstance(constraint, ase.constraints.FixAtoms):
+            frozen[constraint.index] = True
+
+    # The symbol (and freeze flag) of each atom is written before its
+    # position, so put these into the format string for each atom.
+    symbols = [chemical_symbols[number] for number in numbers]
+    if frozen.any():
+        prefixes = ['{:<10s}{:<5s}'.format(symbol, '-1' if is_frozen else '') for symbol, is_frozen in zip(symbols, frozen)]
+    else:
+        prefixes = ['{:<10s}'.format(symbol) for symbol in symbols]
+
+    # unit cell vectors, in case of periodic boundary conditions
+    values = atoms.get_positions()
+    for ipbc, tv in zip(atoms.pbc, atoms.cell):
+        if ipbc:
+            prefixes.append('TV ')
+            values = np.vstack([values, tv])
+
+    # Format all the positions with one format string.
+    if len(prefixes) == 0:
+        return ['']
+    line_format = '\n'.join(prefix.replace('%', '%%') + '%20.10f%20.10f%20.10f' for prefix in prefixes)
+    return [line_format % tuple(values.ravel().tolist()), '']
 
 
 # Regexp for reading an input file:
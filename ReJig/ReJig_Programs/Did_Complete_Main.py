@@ -4,13 +4,25 @@ Did_Complete_Main.py, Geoffrey Weal, 08/03/2019
 This program will determine which of your dimers have been successfully calculated in Gaussian.
 '''
 import os, sys
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from ReJig.ReJig_Programs.Did_Complete_Main_methods.analyse_optimised_output import analyse_optimised_output
+from ReJig.ReJig_Programs.Did_Complete_Main_methods.status_index             import StatusIndex
+
+# These are the names of the output files of each geometric optimisation job.
+optimisation_log_filenames = {'Gaussian': 'rejig_opt.log', 'ORCA': 'rejig_opt.out'}
+
+# -------------------------------------------------------------------------------
+
+# These are the names given to each completion stage in the records for each job.
+completion_stage_names = {'C': 'completed', 'NC': 'not_completed', 'NBY': 'not_begun'}
+
+# These are the fields in the record for each job, in the order they are given.
+job_record_fields = ('path', 'software', 'stage', 'has_fully_converged', 'converged_image_index', 'number_of_images', 'last_max_force', 'terminated_normally', 'log_size', 'wall_time')
 
 # -------------------------------------------------------------------------------
 
-def Did_Complete_Main(general_path, print_progress=True):
+def Did_Complete_Main(general_path, print_progress=True, status_index_filepath=None, workers=1):
     """
     This method will go through folders in search of output.log files, and will determine from those output.log files if they had finished successfully or not.
 
@@ -20,81 +32,209 @@ def Did_Complete_Main(general_path, print_progress=True):
         This is the overall directory to search through for output.log files.
     print_progress : bool.
         This boolean indicates if you want to print the details of the how many jobs this script has processed. 
+    status_index_filepath : str. or None
+        This is the path to the status index file, which records the results of jobs so that jobs whose output files have not changed are not analysed again. If None, the status index is not used. Default: None
+    workers : int.
+        This is the number of threads to use to analyse the output files of jobs at the same time. This is useful on network filesystems, where reading files is slow. Default: 1
 
     Returns
     -------
-    atc_jobs_results : str.
-        These are the results of ATC jobs.
-    re_jobs_results : str.
-        These are the results of RE jobs.
-    fc_jobs_results : str.
-        These are the results of FC jobs.
-    eet_jobs_results : str.
-        These are the results of EET jobs.
-    ict_jobs_results : str.
-        These are the results of ICT jobs.
-    unalligned_jobs : str.
-        These are all the unalligned jobs 
+    opt_jobs_finished_successfully : list of str.
+        These are the paths to the jobs that completed.
+    opt_jobs_finished_unsuccessfully : list of str.
+        These are the paths to the jobs that did not complete.
+    opt_jobs_not_begun : list of str.
+        These are the paths to the jobs that have not begun.
     """
 
-    # First, initialise lists to record results to.
-    opt_jobs_finished_successfully = []
-    opt_jobs_finished_unsuccessfully = []
-    opt_jobs_not_begun = []
+    # First, obtain the record for each job.
+    job_records = get_job_records(general_path, print_progress=print_progress, status_index_filepath=status_index_filepath, workers=workers)
+
+    # Second, separate the jobs into those that are complete, not complete, and have not yet begun. The records are already in alphabetical order. 
+    opt_jobs_finished_successfully   = [job_record['path'] for job_record in job_records if (job_record['stage'] == completion_stage_names['C'])]
+    opt_jobs_finished_unsuccessfully = [job_record['path'] for job_record in job_records if (job_record['stage'] == completion_stage_names['NC'])]
+    opt_jobs_not_begun               = [job_record['path'] for job_record in job_records if (job_record['stage'] == completion_stage_names['NBY'])]
+
+    # Third, return results of ECCP Gaussian jobs. 
+    return opt_jobs_finished_successfully, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun
+
+def get_job_records(general_path, print_progress=True, status_index_filepath=None, workers=1):
+    """
+    This method will go through folders in search of Gaussian and ORCA jobs, and will give a record of the details of each job.
+
+    Parameters
+    ----------
+    general_path : str.
+        This is the overall directory to search through for output.log files.
+    print_progress : bool.
+        This boolean indicates if you want to print the details of the how many jobs this script has processed. Default: True
+    status_index_filepath : str. or None
+        This is the path to the status index file, which records the results of jobs so that jobs whose output files have not changed are not analysed again. If None, the status index is not used. Default: None
+    workers : int.
+        This is the number of threads to use to analyse the output files of jobs at the same time. This is useful on network filesystems, where reading files is slow. Default: 1
 
-    # Second, obtain the current working directory. 
+    Returns
+    -------
+    job_records : list of dict.
+        This is the record for each job, in alphabetical order of the path to each job. Each record contains the fields in job_record_fields:
+        * path                  : The path to the job.
+        * software              : The software used by the job (Gaussian or ORCA).
+        * stage                 : Either "completed", "not_completed" or "not_begun".
+        * has_fully_converged   : True if Gaussian indicated that the optimisation had completed.
+        * converged_image_index : The index (from the end of the log file, where -1 is the last image) of the most converged image. None if no image converged.
+        * number_of_images      : The number of images made during the optimisation.
+        * last_max_force        : The maximum force of the last image.
+        * terminated_normally   : True if Gaussian terminated normally.
+        * log_size              : The size of the output file in bytes.
+        * wall_time             : The wall time of the job in seconds.
+        All fields other than path, software and stage are None if the job has not begun, or if they could not be found in the output file.
+    """
+
+    # First, check that workers is a positive integer.
+    if not (isinstance(workers, int) and (workers >= 1)):
+        raise Exception(f'Error: workers must be an integer greater than or equal to 1. workers = {workers}')
+
+    # Second, initialise the list to record results to.
+    job_records = []
+
+    # Third, obtain the current working directory. 
     original_path = os.getcwd()
 
-    # Third, obtain the os.walk object.
-    pbar = os.walk(general_path)
+    # Fourth, determine all the Gaussian/ORCA jobs to check. 
+    jobs_to_check = get_jobs_to_check(general_path)
 
-    # Fourth, if you want to print the progress of this script to a progress bar, do it here.
+    # Fifth, if you want to print the progress of this script to a progress bar, do it here. tqdm is only imported if it is needed, as it takes a while to import.
     if print_progress:
-        pbar = tqdm(pbar, unit='Jobs')
+        from tqdm import tqdm
+    pbar = tqdm(total=len(jobs_to_check), unit='Jobs') if print_progress else None
+
+    # Sixth, open the status index if desired.
+    status_index = StatusIndex(status_index_filepath) if (status_index_filepath is not None) else None
+
+    # Seventh, go through the output.log file of each job to see if the job finished successfully or not.
+    #          * If the output.log file has not changed since it was last analysed, use the result from the status index.
+    if workers == 1:
+        job_results = ((root, software_type, analyse_optimised_output_with_status_index(software_type, root, status_index)) for root, software_type in jobs_to_check)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(analyse_optimised_output_with_status_index, software_type, root, status_index): (root, software_type) for root, software_type in jobs_to_check}
+        job_results = (futures[future]+(future.result(),) for future in as_completed(futures))
+
+    try:
+        for root, software_type, (completion_stage, job_details) in job_results:
+
+            # 7.1: Record the details of this job.
+            job_record = {'path': root, 'software': software_type, 'stage': completion_stage_names[completion_stage]}
+            for field in job_record_fields[3:]:
+                job_record[field] = job_details.get(field, None) if (job_details is not None) else None
+            job_records.append(job_record)
+
+            # 7.2: Print details of where the program is up to:
+            if print_progress:
+                pbar.set_description(root.replace(original_path+'/',''))
+                pbar.update(1)
+
+    finally:
+
+        # 7.3: Wait for all the threads to finish. Jobs that have not started yet (for example, if an error occurred) are cancelled first.
+        if workers > 1:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
 
-    # Fifth, determine all the Gaussian jobs to check. 
-    for root, dirs, files in pbar:
+        # 7.4: Save the results to the status index.
+        if status_index is not None:
+            status_index.close()
 
-        # 5.1: Sort dirs and files so that things come out in alphabetical order.
+        # 7.5: Close the progress bar.
+        if print_progress:
+            pbar.close()
+
+    # Eighth, sort the records alphabetically by the path to each job.
+    job_records.sort(key=lambda job_record: job_record['path'])
+
+    # Ninth, return the record for each job. 
+    return job_records
+
+def get_jobs_to_check(general_path):
+    """
+    This method will go through folders in search of Gaussian and ORCA jobs.
+
+    Parameters
+    ----------
+    general_path : str.
+        This is the overall directory to search through for jobs.
+
+    Returns
+    -------
+    jobs_to_check : list of (str., str.)
+        These are the paths to the jobs, and the software used by each job (either Gaussian or ORCA), in alphabetical order.
+    """
+    jobs_to_check = []
+    for root, dirs, files in os.walk(general_path):
+
+        # First, sort dirs and files so that things come out in alphabetical order.
         dirs.sort()
         files.sort()
 
-        # 5.2: Determine if a .gjf or inp. file is found. If so, we have found a Gaussian/ORCA job.
+        # Second, determine if a .gjf or inp. file is found. If so, we have found a Gaussian/ORCA job.
         if 'rejig_opt.gjf' in files:
-            software_type = 'Gaussian'
-            #input_file_name      = 'rejig_opt.gjf'
-            #output_file_name     = 'rejig_opt.log'
+            jobs_to_check.append((root, 'Gaussian'))
         elif 'rejig_opt.inp' in files:
-            software_type = 'ORCA'
-            #input_file_name      = 'rejig_opt.inp'
-            #output_file_name     = 'rejig_opt.out'
+            jobs_to_check.append((root, 'ORCA'))
         else:
             continue
 
-        # 5.3: Print details of where the program is up to:
-        if print_progress:
-            pbar.set_description(root.replace(original_path+'/',''))
+        # Third, this will prevent the program looking further down the directories.
+        dirs[:] = []
+        files[:] = []
 
-        # 5.4: Go through the output.log file to see if the job finished successfully or not.
-        completion_stage, re_details = analyse_optimised_output(software_type, root)
+    return jobs_to_check
 
-        # 5.5: Record if this job is complete, not complete, or has not yet begun.
-        if completion_stage == 'C':
-            opt_jobs_finished_successfully.append(root)
-        elif completion_stage == 'NC':
-            opt_jobs_finished_unsuccessfully.append(root)
-        elif completion_stage == 'NBY':
-            opt_jobs_not_begun.append(root)
+def analyse_optimised_output_with_status_index(software_type, root, status_index):
+    """
+    This method will determine if a job finished successfully or not, using the result from the status index if the output file of the job has not changed since it was last analysed.
 
-        # 5.6: This will prevent the program looking further down the directories.
-        dirs[:] = []
-        files[:] = []
+    Parameters
+    ----------
+    software_type : str.
+        This is the software used for this job. This can be either Gaussian or ORCA. 
+    root : str.
+        This is the path to the job folder.
+    status_index : StatusIndex or None
+        This is the status index. If None, the output file is always analysed. This can be shared between threads.
+
+    Returns
+    -------
+    completion_stage : str.
+        * 'NBY': Not begun yet.
+        * 'NC' : Not complete.
+        * 'C'  : Complete.
+    job_details : dict. or None
+        These are the details about the optimisation. None if the job has not begun.
+    """
+
+    # First, if the status index is not being used, analyse the output file.
+    if status_index is None:
+        return analyse_optimised_output(software_type, root)
+
+    # Second, obtain the details of the output file. If the output file does not exist, the job has not begun.
+    try:
+        log_stat = os.stat(root+'/'+optimisation_log_filenames[software_type])
+    except FileNotFoundError:
+        return analyse_optimised_output(software_type, root)
+
+    # Third, if the output file has not changed since it was last analysed, use the recorded result.
+    record = status_index.get(root, log_stat)
+    if record is not None:
+        return record['completion_stage'], record['job_details']
 
-    # Sixth, sort each list alphabetically and combine together for easy management of data.
-    opt_jobs_results = (sorted(opt_jobs_finished_successfully), sorted(opt_jobs_finished_unsuccessfully), sorted(opt_jobs_not_begun))
+    # Fourth, analyse the output file and record the result in the status index.
+    completion_stage, job_details = analyse_optimised_output(software_type, root)
+    status_index.set(root, log_stat, {'completion_stage': completion_stage, 'job_details': job_details})
 
-    # Seventh, return results of ECCP Gaussian jobs. 
-    return opt_jobs_results
+    # Fifth, return the result.
+    return completion_stage, job_details
 
 def add_to_list(root_and_stuff, completion_stage, jobs_finished_successfully, jobs_finished_unsuccessfully, jobs_not_begun):
     if completion_stage == 'NBY':
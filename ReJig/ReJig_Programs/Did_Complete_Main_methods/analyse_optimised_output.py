@@ -4,7 +4,7 @@ analyse_RE_output.py, Geoffrey Weal, 29/12/22
 This method is designed to check if a RE Gaussian job has completed or not.
 '''
 import os
-from ReJig.ReJig_Programs.shared_general_methods.shared_gaussian_methods import did_gaussian_opt_job_complete
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import analyse_gaussian_opt_log
 from ReJig.ReJig_Programs.shared_general_methods.shared_orca_methods     import did_orca_opt_job_complete
 
 def analyse_optimised_output(software_type, path):
@@ -24,6 +24,8 @@ def analyse_optimised_output(software_type, path):
         * 'NBY': Not begun yet.
         * 'NC' : Not complete.
         * 'C'  : Complete.
+    job_details : dict. or None
+        These are the details about the optimisation, as given by GaussianOptimisationSummary.to_record. None if the job has not begun.
     """
 
     if software_type == 'Gaussian':
@@ -49,6 +51,8 @@ def analyse_output_Gaussian(path):
         * 'NBY': Not begun yet.
         * 'NC' : Not complete.
         * 'C'  : Complete.
+    job_details : dict. or None
+        These are the details about the optimisation, as given by GaussianOptimisationSummary.to_record. None if the job has not begun.
     """
 
     # ========================================================================
@@ -70,16 +74,14 @@ def analyse_output_Gaussian(path):
     # ========================================================================
 
     # Second, check if the optimisation finished successfully or not. 
-    did_main_opt_finish, has_main_opt_fully_converged, main_opt_converged_image_index, total_no_of_images_made_during_main_opt = did_gaussian_opt_job_complete(path_to_opt, get_most_converged_image=True, get_total_no_of_images=True)
+    summary = analyse_gaussian_opt_log(path_to_opt)
+    job_details = summary.to_record()
 
-    # Third, determine if the optimisation has completed based on did_main_opt_finish
-    has_completed = 'C' if did_main_opt_finish else 'NC'
+    # Third, determine if the optimisation has completed based on did_finish_successfully
+    has_completed = 'C' if job_details['did_finish_successfully'] else 'NC'
 
-    # Fourth, return results of calculations. 
-    optimisation_details = (did_main_opt_finish, has_main_opt_fully_converged, main_opt_converged_image_index, total_no_of_images_made_during_main_opt) if not did_main_opt_finish else None
-
-    # Fifth, return if the ReJig program completed and reorganisation energy information. 
-    return has_completed, optimisation_details
+    # Fourth, return if the ReJig program completed and the details about the optimisation. 
+    return has_completed, job_details
 
 # ----------------------------------------------------------------------------------------
 # ----------------------------------------------------------------------------------------
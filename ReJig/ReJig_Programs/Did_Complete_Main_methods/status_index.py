@@ -0,0 +1,164 @@
+'''
+status_index.py, Geoffrey Weal, 18/10/26
+
+This class is designed to record the results of analysing each geometric optimisation job, so that jobs whose output files have not changed do not need to be analysed again.
+'''
+import os, json, sqlite3, threading
+
+# This is the name of the status index file that is placed in the folder containing your ReJig jobs.
+status_index_filename = '.rejig_status.sqlite'
+
+# This is the number of records that are held in memory before they are saved to the status index together.
+number_of_records_to_save_at_once = 500
+
+# This is the version of the records in the status index. Increase this if the contents of the records change, so that old records are not used.
+status_index_schema_version = 2
+
+class StatusIndex:
+    """
+    This class is designed to record the results of analysing each geometric optimisation job, so that jobs whose output files have not changed do not need to be analysed again.
+
+    For each job, the size, modification time and inode of the output file are recorded along with the results of analysing that output file.
+    The results are only reused if the size, modification time and inode of the output file have not changed.
+
+    The status index can be used by several threads, and by several processes, at the same time. New records are held in memory and saved
+    to the status index together in one short transaction, so the status index is never locked while output files are being analysed.
+
+    Parameters
+    ----------
+    index_filepath : str.
+        This is the path to the status index file. Jobs are recorded by their path relative to the folder containing this file.
+    """
+    def __init__(self, index_filepath):
+
+        # First, record the path to the status index and the folder that job paths are given relative to.
+        self.index_filepath = index_filepath
+        self.root_dirpath = os.path.dirname(os.path.abspath(index_filepath))
+
+        # Second, open the status index.
+        #         * The lock allows the status index to be shared between threads.
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(index_filepath, timeout=60, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS jobs (job_path TEXT PRIMARY KEY, log_size INTEGER, log_mtime_ns INTEGER, log_inode INTEGER, record TEXT)')
+
+        # Third, if the status index was made by a different version of this class, remove the old records.
+        row = self.connection.execute("SELECT value FROM metadata WHERE name = 'schema_version'").fetchone()
+        if (row is None) or (int(row[0]) != status_index_schema_version):
+            self.connection.execute('DELETE FROM jobs')
+            self.connection.execute("INSERT OR REPLACE INTO metadata (name, value) VALUES ('schema_version', ?)", (str(status_index_schema_version),))
+        self.connection.commit()
+
+        # Fourth, record the number of records that have been reused and updated, and the records that have not been saved to the status index yet.
+        self.number_of_records_reused = 0
+        self.number_of_records_updated = 0
+        self.records_to_save = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_job_path(self, job_dirpath):
+        """
+        This method will obtain the path of the job relative to the folder containing the status index.
+
+        Parameters
+        ----------
+        job_dirpath : str.
+            This is the path to the job folder.
+
+        Returns
+        -------
+        The path of the job relative to the folder containing the status index.
+        """
+        return os.path.relpath(os.path.abspath(job_dirpath), self.root_dirpath)
+
+    def get(self, job_dirpath, log_stat):
+        """
+        This method will obtain the recorded results for a job, if the output file of the job has not changed.
+
+        Parameters
+        ----------
+        job_dirpath : str.
+            This is the path to the job folder.
+        log_stat : os.stat_result
+            This is the current os.stat of the output file of this job.
+
+        Returns
+        -------
+        record : dict. or None
+            These are the results that were recorded for this job. None if there is no record, or if the output file has changed since the results were recorded.
+        """
+        job_path = self.get_job_path(job_dirpath)
+        with self.lock:
+            row = self.records_to_save.get(job_path, None)
+            if row is None:
+                row = self.connection.execute('SELECT log_size, log_mtime_ns, log_inode, record FROM jobs WHERE job_path = ?', (job_path,)).fetchone()
+            if row is None:
+                return None
+            log_size, log_mtime_ns, log_inode, record = row
+            if (log_size, log_mtime_ns, log_inode) != (log_stat.st_size, log_stat.st_mtime_ns, log_stat.st_ino):
+                return None
+            self.number_of_records_reused += 1
+        return json.loads(record)
+
+    def set(self, job_dirpath, log_stat, record):
+        """
+        This method will record the results for a job.
+
+        Parameters
+        ----------
+        job_dirpath : str.
+            This is the path to the job folder.
+        log_stat : os.stat_result
+            This is the os.stat of the output file of this job, taken before the output file was analysed.
+        record : dict.
+            These are the results of analysing the output file of this job. This must be able to be saved as json.
+        """
+        with self.lock:
+            self.records_to_save[self.get_job_path(job_dirpath)] = (log_stat.st_size, log_stat.st_mtime_ns, log_stat.st_ino, json.dumps(record))
+            self.number_of_records_updated += 1
+            if len(self.records_to_save) >= number_of_records_to_save_at_once:
+                self.save_records()
+
+    def remove(self, job_dirpath):
+        """
+        This method will remove the record for a job, such as when the job has been reset.
+
+        Parameters
+        ----------
+        job_dirpath : str.
+            This is the path to the job folder.
+        """
+        job_path = self.get_job_path(job_dirpath)
+        with self.lock:
+            self.records_to_save.pop(job_path, None)
+            with self.connection:
+                self.connection.execute('DELETE FROM jobs WHERE job_path = ?', (job_path,))
+
+    def save_records(self):
+        """
+        This method will save the records held in memory to the status index in one transaction, so the status index is only locked for a short time.
+
+        This method must be called while self.lock is held.
+        """
+        if len(self.records_to_save) == 0:
+            return
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO jobs (job_path, log_size, log_mtime_ns, log_inode, record) VALUES (?, ?, ?, ?, ?)', [(job_path,)+row for job_path, row in self.records_to_save.items()])
+        self.records_to_save = {}
+
+    def close(self):
+        """
+        This method will save all the records to the status index and close it.
+        """
+        with self.lock:
+            if self.connection is None:
+                return
+            self.save_records()
+            self.connection.close()
+            self.connection = None
+
+# ----------------------------------------------------------------------------------------
@@ -3,9 +3,10 @@ Did_Complete.py, Geoffrey Weal, 11/04/2022
 
 This program will determine which of your dimers have been successfully calculated in Gaussian.
 '''
-import os
+import os, sys, csv, json, math
 
-from ReJig.ReJig_Programs.Did_Complete_Main import Did_Complete_Main
+from ReJig.ReJig_Programs.Did_Complete_Main                     import Did_Complete_Main, get_job_records, job_record_fields
+from ReJig.ReJig_Programs.Did_Complete_Main_methods.status_index import status_index_filename
 
 class CLICommand:
     """Will determine which geometric optimisation jobs have completed and which ones have not.
@@ -13,28 +14,97 @@ class CLICommand:
 
     @staticmethod
     def add_arguments(parser):
-        pass
+        parser.add_argument('--use_status_index', nargs=1, help='This indicates if you want to reuse the results of jobs whose output files have not changed since did_complete was last run. These results are saved in the '+status_index_filename+' file.', default=['True'])
+        parser.add_argument('--workers',          nargs=1, help='This is the number of threads to use to check jobs at the same time. Using 16 to 32 threads can make checking jobs much faster on network filesystems.', default=['1'])
+        parser.add_argument('--format',           nargs=1, help='This is the format to give the results in. This can be "text", "json" or "csv". If "json" or "csv", the details of every job are printed in this format, and nothing else is printed.', default=['text'])
 
     @staticmethod
     def run(args):
-        Run_method()
 
-def Run_method():
+        # First, obtain the tag that indicates if you want to use the status index.
+        use_status_index = str(args.use_status_index[0]).lower()
+        if   use_status_index in ['t', 'true']:
+            use_status_index = True
+        elif use_status_index in ['f', 'false']:
+            use_status_index = False
+        else:
+            raise Exception('Error: The value for "--use_status_index" must be either "True" or "False".')
+
+        # Second, obtain the number of threads to use.
+        try:
+            workers = int(args.workers[0])
+        except ValueError:
+            raise Exception(f'Error: The value for "--workers" must be an integer. --workers = {args.workers[0]}')
+
+        # Third, obtain the format to give the results in.
+        output_format = str(args.format[0]).lower()
+        if output_format not in output_formats:
+            raise Exception('Error: The value for "--format" must be either "text", "json" or "csv". --format = '+str(args.format[0]))
+
+        # Fourth, run this program.
+        Run_method(use_status_index=use_status_index, workers=workers, output_format=output_format)
+
+# These are the formats that the results can be given in.
+output_formats = ['text', 'json', 'csv']
+
+def get_did_complete_records(path=None, use_status_index=True, workers=1):
+    """
+    This method will give the details of every geometric optimisation job in path, without printing anything.
+
+    Parameters
+    ----------
+    path : str. or None
+        This is the folder containing your ReJig jobs. If None, the current directory is used. Default: None
+    use_status_index : bool.
+        This indicates if you want to reuse the results of jobs whose output files have not changed since did_complete was last run. Default: True
+    workers : int.
+        This is the number of threads to use to check jobs at the same time. Default: 1
+
+    Returns
+    -------
+    job_records : list of dict.
+        This is the record for each job, in alphabetical order of the path to each job. See ReJig.ReJig_Programs.Did_Complete_Main.get_job_records for the fields in each record.
+    """
+    general_path = os.path.abspath(os.getcwd() if (path is None) else path)
+    status_index_filepath = (general_path+'/'+status_index_filename) if use_status_index else None
+    return get_job_records(general_path, print_progress=False, status_index_filepath=status_index_filepath, workers=workers)
+
+def Run_method(use_status_index=True, workers=1, output_format='text'):
     """
     This method will determine which of your dimers have been successfully calculated in Gaussian.
+
+    Parameters
+    ----------
+    use_status_index : bool.
+        This indicates if you want to reuse the results of jobs whose output files have not changed since did_complete was last run. Default: True
+    workers : int.
+        This is the number of threads to use to check jobs at the same time. Default: 1
+    output_format : str.
+        This is the format to give the results in. If "text", the jobs that have completed, not completed and not begun are printed and written to text files. 
+        If "json" or "csv", the details of every job are printed in this format, and nothing else is printed. Default: 'text'
     """
+
+    # First, if desired, print the details of every job as json or csv.
+    if output_format in ['json', 'csv']:
+        job_records = get_did_complete_records(use_status_index=use_status_index, workers=workers)
+        write_job_records(job_records, output_format, sys.stdout)
+        return
+    elif not (output_format == 'text'):
+        raise Exception('Error: output_format must be either "text", "json" or "csv". output_format = '+str(output_format))
+
     print('########################################################################')
     print('########################################################################')
     print('Checking if OPV_Dimer_Pairer job have completed in Gaussian')
     print('-----------------------------------------------------------')
 
-    # First, obtain the current directory path.
+    # Second, obtain the current directory path.
     general_path = os.getcwd()
 
-    # Second, determine which ECCP Gaussian jobs have completed or not.
-    opt_jobs_finished_successfully, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun = Did_Complete_Main(general_path)
+    # Third, determine which ECCP Gaussian jobs have completed or not.
+    status_index_filepath = (general_path+'/'+status_index_filename) if use_status_index else None
+    opt_jobs_finished_successfully, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun = Did_Complete_Main(general_path, status_index_filepath=status_index_filepath, workers=workers)
 
-    # Third, print the results from the optimisation that completed. 
+    # Fourth, print the results from the optimisation that completed. 
     if not (len(opt_jobs_finished_successfully) == 0):
         print('########################################################################')
         print('########################################################################')
@@ -46,7 +116,7 @@ def Run_method():
                 print(dirpath)
                 completed_OPT_jobsTXT.write(dirpath+'\n')
 
-    # Fourth, print the results from the optimisation that did not complete.
+    # Fifth, print the results from the optimisation that did not complete.
     if not (len(opt_jobs_finished_unsuccessfully) == 0):
         print('########################################################################')
         print('########################################################################')
@@ -58,7 +128,7 @@ def Run_method():
                 print(dirpath)
                 incompleted_OPT_jobsTXT.write(dirpath+'\n')
 
-    # Fifth, print the results from the optimisation that have not begun.
+    # Sixth, print the results from the optimisation that have not begun.
     if not (len(opt_jobs_not_begun) == 0):
         print('########################################################################')
         print('########################################################################')
@@ -72,6 +142,31 @@ def Run_method():
     print('########################################################################')
     print('########################################################################')
 
+def write_job_records(job_records, output_format, outputFILE):
+    """
+    This method will write the record for each job as json or csv.
+
+    Parameters
+    ----------
+    job_records : list of dict.
+        This is the record for each job, as given by get_did_complete_records.
+    output_format : str.
+        This is the format to write the records in. This can be either "json" or "csv".
+    outputFILE : file
+        This is the file to write the records to.
+    """
+    if output_format == 'json':
+        # Gaussian prints "********" for forces that are too large to print, which are read as infinity. json does not allow infinity or NaN, so these are given as null.
+        json_job_records = [{field: (None if (isinstance(value, float) and not math.isfinite(value)) else value) for field, value in job_record.items()} for job_record in job_records]
+        json.dump(json_job_records, outputFILE, indent=1, allow_nan=False)
+        outputFILE.write('\n')
+    elif output_format == 'csv':
+        writer = csv.DictWriter(outputFILE, fieldnames=job_record_fields, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(job_records)
+    else:
+        raise Exception('Error: output_format must be either "json" or "csv". output_format = '+str(output_format))
+
 # ========================================================================================================
 
 def get_re_details_string(dirpath, re_details):
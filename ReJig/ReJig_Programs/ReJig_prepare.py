@@ -0,0 +1,126 @@
+'''
+Geoffrey Weal, ReJig_prepare.py, 18/10/26
+
+This program is designed to create the Gaussian/ORCA files for all the crystals in a crystal database, using a pool of processes.
+'''
+import os, json
+
+from ReJig.ReJig_Atoms.ReJig_Atoms_batch import ReJig_Atoms_batch
+
+class CLICommand:
+    """Create the Gaussian/ORCA geometric optimisation files for all the crystals in a crystal database.
+
+    The calc_parameters and submission_information dictionaries (as given in Run_ReJig.py) are given in a json file, for example: {"calc_parameters": {"calc_software": "Gaussian", ...}, "submission_information": {"cpus_per_task": 16, ...}}
+    """
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('crystal_database_dirpath',       nargs=1, help='This is the folder containing the crystal database you want to rejig.')
+        parser.add_argument('--parameters',                   nargs=1, help='This is the json file that contains the calc_parameters and submission_information dictionaries.', default=['ReJig_parameters.json'])
+        parser.add_argument('--workers',                      nargs=1, help='This is the number of processes to use to process crystals.', default=['1'])
+        parser.add_argument('--place_files_in',               nargs=1, help='This is the folder you want to save ReJig files to.', default=['rejigged_crystals'])
+        parser.add_argument('--rejig_neighbouring_hydrogens', nargs=1, help='This indicates if you want any hydrogens attached to atoms with added_or_modified tags set to True to also be rejigged.', default=['False'])
+        parser.add_argument('--prefilter',                    nargs=1, help='This indicates if you want to skip crystals that have no added or modified atoms by only reading the added_or_modified column of each crystal file. Skipped crystals are listed in ReJig_skipped_crystals.txt.', default=['True'])
+        parser.add_argument('--write_workers',                nargs=1, help='This is the number of threads each process uses to write the files of a crystal to disk.', default=['1'])
+        parser.add_argument('--archive_files',                nargs=1, help='This indicates if you want to write all the files for each crystal into one tar file in the place_files_in folder, rather than as separate files. Unpack each tar file in the place_files_in folder before submitting jobs.', default=['False'])
+
+    @staticmethod
+    def run(arguments):
+
+        # First, obtain the folder containing the crystal database.
+        crystal_database_dirpath = arguments.crystal_database_dirpath[0]
+
+        # Second, obtain the calc_parameters and submission_information dictionaries from the parameters file.
+        parameters_filepath = arguments.parameters[0]
+        if not os.path.exists(parameters_filepath):
+            raise Exception(f'Error: Could not find {parameters_filepath}')
+        with open(parameters_filepath, 'r') as parametersJSON:
+            parameters = json.load(parametersJSON)
+        for parameter_name in ['calc_parameters', 'submission_information']:
+            if parameter_name not in parameters:
+                raise Exception(f'Error: {parameters_filepath} needs to contain the "{parameter_name}" dictionary.')
+
+        # Third, obtain the number of processes to use.
+        try:
+            workers = int(arguments.workers[0])
+        except ValueError:
+            raise Exception(f'Error: The value for "--workers" must be an integer. --workers = {arguments.workers[0]}')
+
+        # Fourth, obtain the tag that indicates if you want to rejig neighbouring hydrogens.
+        rejig_neighbouring_hydrogens = str(arguments.rejig_neighbouring_hydrogens[0]).lower()
+        if   rejig_neighbouring_hydrogens in ['t', 'true']:
+            rejig_neighbouring_hydrogens = True
+        elif rejig_neighbouring_hydrogens in ['f', 'false']:
+            rejig_neighbouring_hydrogens = False
+        else:
+            raise Exception('Error: The value for "--rejig_neighbouring_hydrogens" must be either "True" or "False".')
+
+        # Fifth, obtain the tag that indicates if you want to skip crystals that have no added or modified atoms.
+        prefilter = str(arguments.prefilter[0]).lower()
+        if   prefilter in ['t', 'true']:
+            prefilter = True
+        elif prefilter in ['f', 'false']:
+            prefilter = False
+        else:
+            raise Exception('Error: The value for "--prefilter" must be either "True" or "False".')
+
+        # Sixth, obtain the number of threads to use to write files.
+        try:
+            write_workers = int(arguments.write_workers[0])
+        except ValueError:
+            raise Exception(f'Error: The value for "--write_workers" must be an integer. --write_workers = {arguments.write_workers[0]}')
+
+        # Seventh, obtain the tag that indicates if you want to write the files of each crystal into one tar file.
+        archive_files = str(arguments.archive_files[0]).lower()
+        if   archive_files in ['t', 'true']:
+            archive_files = True
+        elif archive_files in ['f', 'false']:
+            archive_files = False
+        else:
+            raise Exception('Error: The value for "--archive_files" must be either "True" or "False".')
+
+        # Eighth, run this program.
+        Run_method(crystal_database_dirpath, parameters['calc_parameters'], parameters['submission_information'], rejig_neighbouring_hydrogens=rejig_neighbouring_hydrogens, place_files_in=arguments.place_files_in[0], workers=workers, prefilter=prefilter, write_workers=write_workers, archive_files=archive_files)
+
+# =========================================================================================================================================
+
+def Run_method(crystal_database_dirpath, calc_parameters, submission_information, rejig_neighbouring_hydrogens=False, place_files_in='rejigged_crystals', workers=1, prefilter=True, write_workers=1, archive_files=False):
+    '''
+    This program is designed to create the Gaussian/ORCA files for all the crystals in a crystal database, using a pool of processes.
+
+    Parameters
+    ----------
+    crystal_database_dirpath : str.
+        This is the folder containing the crystal database you want to rejig.
+    calc_parameters : dict.
+        This dictionary describes the parameters needs to perform the geometry optimisation job in Gaussian/ORCA.
+    submission_information : dict.
+        This dictionary describes all the parameters you want to add to the submit.sl script for submitting this Gaussian/ORCA job to slurm.
+    rejig_neighbouring_hydrogens : bool.
+        This boolean indicates if you want any hydrogens that are attached to atoms that have the added_or_modified tag set to True to also allow to be rejigged.
+    place_files_in : str.
+        This is the folder you want to save ReJig files to.
+    workers : int.
+        This is the number of processes to use to process crystals.
+    prefilter : bool.
+        This boolean indicates if you want to skip crystals that have no added or modified atoms, by only reading the added_or_modified column of each crystal file. Default: True
+    write_workers : int.
+        This is the number of threads each process uses to write the files of a crystal to disk. Default: 1
+    archive_files : bool.
+        This boolean indicates if you want to write all the files for each crystal into one tar file in the place_files_in folder, rather than as separate files. Default: False
+    '''
+
+    print('##################################################')
+    print(f'Will create ReJig files for crystals in: {crystal_database_dirpath}')
+    print(f'Number of processes: {workers}')
+    print('##################################################')
+
+    # First, create the ReJig files for every crystal in the crystal database.
+    rejig_results = ReJig_Atoms_batch(crystal_database_dirpath, calc_parameters, submission_information, rejig_neighbouring_hydrogens=rejig_neighbouring_hydrogens, place_files_in=place_files_in, workers=workers, prefilter=prefilter, write_workers=write_workers, archive_files=archive_files)
+
+    # Second, raise an error if any crystals could not be processed.
+    no_of_crystals_with_errors = sum([int(error_message is not None) for _, _, error_message in rejig_results])
+    if no_of_crystals_with_errors > 0:
+        raise Exception(f'Error: {no_of_crystals_with_errors} crystals could not be processed. See above for details.')
+
+# =========================================================================================================================================
@@ -0,0 +1,163 @@
+'''
+reset_plan.py, Geoffrey Weal, 18/10/26
+
+These methods are designed to make a plan of what will be done to each job folder to reset the jobs that did not complete, without changing any files.
+
+The plan is a list of folder plans, where each folder plan is a dictionary that can be saved as json:
+
+* path    : The path to the job folder.
+* stage   : Either "completed" or "not_completed", as given by ReJig did_complete.
+* actions : The actions to perform in this folder, in the order they are performed. Each action is one of:
+    * {"action": "rename", "source": ..., "destination": ...}                                : Rename the file "source" to "destination".
+    * {"action": "update_gjf", "gjf": ..., "template": ..., "log": ..., "number_of_atoms": ...} : Write the gjf file "gjf", using the settings in the gjf file "template" and the last structure in the log file "log".
+    * {"action": "remove", "files": [...]}                                                      : Remove the files in "files".
+
+Only Gaussian jobs are reset. ORCA jobs are not included in the plan.
+'''
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ReJig.ReJig_Programs.Did_Complete_Main                                import get_job_records, completion_stage_names, optimisation_log_filenames
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import read_last_input_orientation
+from ReJig.ReJig_Programs.shared_general_methods.shared_gaussian_methods   import get_gaussian_temp_files_to_remove, get_slurm_output_files
+
+# These are the names of the input and output files of each Gaussian geometric optimisation job.
+gjf_filename = 'rejig_opt.gjf'
+log_filename = optimisation_log_filenames['Gaussian']
+
+# This is the suffix given to previous input and output files, followed by a number (i.e. rejig_opt.log.old1, rejig_opt.log.old2, ...).
+old_suffix = 'old'
+
+# -----------------------------------------------------------------
+
+def get_reset_plan(general_path, status_index_filepath=None, workers=1, print_progress=True):
+    """
+    This method will make a plan of what will be done to each job folder to reset the jobs that did not complete.
+
+    No files are changed by this method.
+
+    Parameters
+    ----------
+    general_path : str.
+        This is the overall directory to search through for jobs.
+    status_index_filepath : str. or None
+        This is the path to the status index file, so that jobs whose log files have not changed since they were last checked are not read again. If None, the status index is not used. Default: None
+    workers : int.
+        This is the number of threads to use to read log files at the same time. Default: 1
+    print_progress : bool.
+        This indicates if you want to show a progress bar while the log files are being checked. Default: True
+
+    Returns
+    -------
+    reset_plan : list of dict.
+        This is the plan for each job folder that has something to do, in alphabetical order of the path to each job folder.
+    """
+
+    # First, determine which jobs have completed and which have not.
+    job_records = get_job_records(general_path, print_progress=print_progress, status_index_filepath=status_index_filepath, workers=workers)
+
+    # Second, only Gaussian jobs that have begun need to be looked at.
+    job_records = [job_record for job_record in job_records if (job_record['software'] == 'Gaussian') and (job_record['stage'] != completion_stage_names['NBY'])]
+
+    # Third, obtain the plan for each job folder.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        folder_plans = list(executor.map(get_folder_plan, job_records))
+
+    # Fourth, return the plans for the job folders that have something to do.
+    return [folder_plan for folder_plan in folder_plans if (len(folder_plan['actions']) > 0)]
+
+def get_folder_plan(job_record):
+    """
+    This method will make a plan of what will be done to a job folder.
+
+    * If the job did not complete, the gjf file is updated with the last structure in the log file, and the previous gjf and log files are renamed
+      as old files. If the log file does not contain a structure, the gjf file is not changed and the log file is removed. Slurm output files are removed.
+    * For every job, Gaussian temporary files are removed.
+
+    The files in the job folder are only listed once.
+
+    Parameters
+    ----------
+    job_record : dict.
+        This is the record of the job, as given by get_job_records.
+
+    Returns
+    -------
+    folder_plan : dict.
+        This is the plan for the job folder.
+    """
+
+    # First, obtain the files in the job folder.
+    root = job_record['path']
+    files = sorted(os.listdir(root))
+    actions = []
+
+    # Second, if the job did not complete, obtain the actions needed to reset the job.
+    if job_record['stage'] == completion_stage_names['NC']:
+
+        # 2.1: Obtain the last structure in the log file.
+        last_structure = read_last_input_orientation(root+'/'+log_filename)
+
+        # 2.2: If the log file contains a structure, update the gjf file and keep the previous gjf and log files as old files.
+        if last_structure is not None:
+            old_gjf_filename = get_next_old_filename(gjf_filename, files, ignore_original=True)
+            actions.append({'action': 'rename', 'source': gjf_filename, 'destination': old_gjf_filename})
+            actions.append({'action': 'update_gjf', 'gjf': gjf_filename, 'template': old_gjf_filename, 'log': log_filename, 'number_of_atoms': len(last_structure)})
+            actions.append({'action': 'rename', 'source': log_filename, 'destination': get_next_old_filename(log_filename, files)})
+
+        # 2.3: If the log file does not contain a structure, Gaussian had only just begun before being stopped, so the gjf file does not need to be updated.
+        else:
+            actions.append({'action': 'remove', 'files': [log_filename]})
+
+        # 2.4: Remove the slurm output files.
+        slurm_output_files = get_slurm_output_files(files)
+        if len(slurm_output_files) > 0:
+            actions.append({'action': 'remove', 'files': slurm_output_files})
+
+    # Third, remove the Gaussian temporary files from every job that has begun.
+    temp_files_to_remove = get_gaussian_temp_files_to_remove(files, remove_chk_file=True, remove_fort7_file=True)
+    if len(temp_files_to_remove) > 0:
+        actions.append({'action': 'remove', 'files': temp_files_to_remove})
+
+    # Fourth, return the plan for this job folder.
+    return {'path': root, 'stage': job_record['stage'], 'actions': actions}
+
+def get_next_old_filename(filename, files, ignore_original=False):
+    """
+    This method will obtain the name to rename a file to, so that it is kept as an old file (i.e. rejig_opt.log --> rejig_opt.log.old3).
+
+    Parameters
+    ----------
+    filename : str.
+        This is the name of the file to rename.
+    files : list of str.
+        These are the names of all the files in the folder.
+    ignore_original : bool.
+        If True, files that contain "original" in their name are not counted as old files. Default: False
+
+    Returns
+    -------
+    The name to rename the file to.
+    """
+
+    # First, obtain the numbers of the previous old files.
+    old_numbers = []
+    for file in files:
+        if (not file.startswith(filename)) or (file == filename):
+            continue
+        if ignore_original and ('original' in file):
+            continue
+        try:
+            old_numbers.append(int(file.replace(filename+'.'+old_suffix, '')))
+        except ValueError:
+            raise Exception('Error: Could not obtain the old number of '+str(file)+'. Old files should be named as '+str(filename)+'.'+old_suffix+'1, '+str(filename)+'.'+old_suffix+'2, ...')
+
+    # Second, check that there is a consecutive order of numbering in old_numbers.
+    old_numbers.sort()
+    if not (old_numbers == list(range(1, len(old_numbers)+1))):
+        raise Exception('Error: The old '+str(filename)+' files are not numbered consecutively from 1. Old numbers = '+str(old_numbers))
+
+    # Third, return the name of the next old file.
+    return filename+'.'+old_suffix+str(len(old_numbers)+1)
+
+# -----------------------------------------------------------------
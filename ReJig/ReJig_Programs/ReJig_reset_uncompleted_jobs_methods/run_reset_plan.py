@@ -0,0 +1,187 @@
+'''
+run_reset_plan.py, Geoffrey Weal, 18/10/26
+
+These methods are designed to perform the actions in a reset plan, as made by get_reset_plan.
+'''
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ReJig.ReJig_Programs.Did_Complete_Main_methods.status_index             import StatusIndex
+from ReJig.ReJig_Programs.ReJig_reset_uncompleted_jobs_methods.reset_plan     import log_filename
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import read_last_input_orientation
+
+# -----------------------------------------------------------------
+
+def run_reset_plan(reset_plan, workers=1, print_progress=True, status_index_filepath=None):
+    """
+    This method will perform the actions in a reset plan, where the job folders are reset at the same time by a number of threads.
+
+    Parameters
+    ----------
+    reset_plan : list of dict.
+        This is the plan for each job folder, as given by get_reset_plan.
+    workers : int.
+        This is the number of threads to use to reset job folders at the same time. Default: 1
+    print_progress : bool.
+        This indicates if you want to show a progress bar. Default: True
+    status_index_filepath : str. or None
+        This is the path to the status index file. If given, the records of the jobs whose log files are renamed or removed are removed from the status index. Default: None
+
+    Returns
+    -------
+    folders_that_could_not_be_reset : list of (str., str.)
+        These are the paths to the job folders where an action could not be performed, along with the reason why.
+    """
+
+    # First, check that workers is a positive integer.
+    if not (isinstance(workers, int) and (workers >= 1)):
+        raise Exception(f'Error: workers must be an integer greater than or equal to 1. workers = {workers}')
+
+    # Second, open the status index if desired.
+    status_index = StatusIndex(status_index_filepath) if (status_index_filepath is not None) else None
+
+    # Third, perform the actions for each job folder.
+    #        * If the log file of a job is renamed or removed, the record of the job in the status index is removed, even if not all the actions could be performed.
+    if print_progress:
+        from tqdm import tqdm
+    pbar = tqdm(total=len(reset_plan), unit='Jobs') if print_progress else None
+    folders_that_could_not_be_reset = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_folder_plan, folder_plan): folder_plan for folder_plan in reset_plan}
+            for future in as_completed(futures):
+                folder_plan = futures[future]
+                try:
+                    future.result()
+                except Exception as exception:
+                    folders_that_could_not_be_reset.append((folder_plan['path'], str(exception)))
+                if (status_index is not None) and does_folder_plan_change_log_file(folder_plan):
+                    status_index.remove(folder_plan['path'])
+                if print_progress:
+                    pbar.update(1)
+    finally:
+        if status_index is not None:
+            status_index.close()
+        if print_progress:
+            pbar.close()
+
+    # Fourth, return the job folders that could not be reset.
+    folders_that_could_not_be_reset.sort()
+    return folders_that_could_not_be_reset
+
+def run_folder_plan(folder_plan):
+    """
+    This method will perform the actions for a job folder, in order.
+
+    Parameters
+    ----------
+    folder_plan : dict.
+        This is the plan for the job folder, as given by get_folder_plan.
+    """
+    root = folder_plan['path']
+    for action in folder_plan['actions']:
+        if action['action'] == 'rename':
+            os.rename(root+'/'+action['source'], root+'/'+action['destination'])
+        elif action['action'] == 'update_gjf':
+            update_gjf_file(root+'/'+action['gjf'], root+'/'+action['template'], root+'/'+action['log'])
+        elif action['action'] == 'remove':
+            for file in action['files']:
+                if os.path.exists(root+'/'+file):
+                    os.remove(root+'/'+file)
+        else:
+            raise Exception('Error: action must be either "rename", "update_gjf" or "remove". action = '+str(action['action']))
+
+def does_folder_plan_change_log_file(folder_plan):
+    """
+    This method will determine if the plan for a job folder renames or removes the log file of the job.
+
+    Parameters
+    ----------
+    folder_plan : dict.
+        This is the plan for the job folder, as given by get_folder_plan.
+
+    Returns
+    -------
+    True if the log file of the job is renamed or removed.
+    """
+    for action in folder_plan['actions']:
+        if (action['action'] == 'rename') and (action['source'] == log_filename):
+            return True
+        if (action['action'] == 'remove') and (log_filename in action['files']):
+            return True
+    return False
+
+# -----------------------------------------------------------------
+
+def update_gjf_file(gjf_filepath, template_gjf_filepath, log_filepath):
+    """
+    This method will write a gjf file using the settings in a previous gjf file and the last structure in a Gaussian log file.
+
+    Parameters
+    ----------
+    gjf_filepath : str.
+        This is the path to the gjf file to write.
+    template_gjf_filepath : str.
+        This is the path to the previous gjf file, which contains the settings for the Gaussian job.
+    log_filepath : str.
+        This is the path to the log file to obtain the last structure from.
+    """
+
+    # First, obtain the last structure in the log file.
+    last_structure = read_last_input_orientation(log_filepath)
+    if last_structure is None:
+        raise Exception('Error: '+str(log_filepath)+' no longer contains a structure. Make the reset plan again.')
+
+    # Second, obtain the lines before and after the atomic positions in the previous gjf file.
+    gjf_input_lines_start, gjf_input_lines_end = get_gjf_lines_around_positions(template_gjf_filepath)
+
+    # Third, create the new gjf file with the updated geometric structure.
+    with open(gjf_filepath, 'w') as currentGJF:
+        currentGJF.write('\n'.join(gjf_input_lines_start)+'\n')
+        for atom in last_structure:
+            currentGJF.write(str(atom.symbol)+'\t'+str(atom.x)+'\t'+str(atom.y)+'\t'+str(atom.z)+'\n')
+        currentGJF.write('\n'+'\n'.join(gjf_input_lines_end)+'\n\n')
+
+def get_gjf_lines_around_positions(gjf_filepath):
+    """
+    This method will obtain the lines of a gjf file before and after the atomic positions.
+
+    The gjf file is also set up to read the geometry and electronic details from the checkpoint file, if it already reads from the checkpoint file.
+
+    Parameters
+    ----------
+    gjf_filepath : str.
+        This is the path to the gjf file.
+
+    Returns
+    -------
+    gjf_input_lines_start : list of str.
+        These are the lines before the atomic positions (link0, route, title and charge/multiplicity lines).
+    gjf_input_lines_end : list of str.
+        These are the lines after the atomic positions.
+    """
+    gjf_input_lines_start = []
+    gjf_input_lines_end   = []
+    with open(gjf_filepath, 'r') as previousGJF:
+        atomic_positions_number_of_blank_lines = 2
+        no_of_blank_lines = 0
+        found_second_blank_line_first_line = True
+        for line in previousGJF:
+            line = line.rstrip()
+            # Read if there is already a line to read input from the checkpoint.
+            if ('# Geom=Check Guess=Read' in line) or ('# Geom=Check Guess=TCheck' in line):
+                line = '# Geom=Check Guess=TCheck ! Will read in the geometry and electronic details from the checkpoint file'
+            # Record lines from gjf about how to run the gaussian job (link0).
+            if   no_of_blank_lines < atomic_positions_number_of_blank_lines:
+                gjf_input_lines_start.append(line)
+            elif no_of_blank_lines > atomic_positions_number_of_blank_lines:
+                gjf_input_lines_end.append(line)
+            elif found_second_blank_line_first_line:
+                gjf_input_lines_start.append(line)
+                found_second_blank_line_first_line = False
+            # Determine where the breaks between the link0, title, and atom positions lines are.
+            if (line == "") or line.isspace():
+                no_of_blank_lines += 1
+    return gjf_input_lines_start, gjf_input_lines_end
+
+# -----------------------------------------------------------------
@@ -4,15 +4,15 @@ Geoffrey Weal, Run_Adsorber_submitSL_slurm.py, 16/06/2021
 This program is designed to submit all sl files called submit.sl to slurm.
 '''
 import os
-from subprocess import Popen, PIPE, TimeoutExpired
 
-from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_settings_methods.settings_methods                     import check_submit_settingsTXT, read_submit_settingsTXT_file
-from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.determine_quantum_computing_software_type     import determine_quantum_computing_software_type
-from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.ReJig_submit_gaussian_jobs_to_slurm           import general_gaussian_submission
-#from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.ReJig_submit_orca_jobs_to_slurm               import general_orca_submission
-from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.check_max_jobs_in_queue_after_next_submission import check_max_jobs_in_queue_after_next_submission
-from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.countdown                                     import countdown
-from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.wait_for_pending_slurm_job_queue_decrease     import wait_for_pending_slurm_job_queue_decrease
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_settings_methods.settings_methods                     import check_submit_settingsTXT, read_submit_settingsTXT_file, read_optional_submit_settingsTXT_file
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.get_folders_to_submit                         import get_folders_to_submit
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.async_submission_engine                       import AsyncSubmissionEngine
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.adaptive_submission_throttle                  import AdaptiveSubmissionThrottle
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.slurm_queue_snapshot                          import SlurmQueueSnapshot
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.slurm_queue_watcher                           import SlurmQueueWatcher
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.submission_journal                            import SubmissionJournal, submission_journal_filename
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.submit_job_arrays_to_slurm                    import submit_job_arrays_to_slurm
 
 # Get the path to the settings script.
 this_scripts_path = os.path.dirname(os.path.abspath(__file__))
@@ -25,7 +25,9 @@ class CLICommand:
 
     @staticmethod
     def add_arguments(parser):
-        pass
+        parser.add_argument('--array',          nargs=1, help='This indicates if you want to submit all your jobs as a few slurm job arrays, rather than submitting each job one at a time.', default=['False'])
+        parser.add_argument('--array_throttle', nargs=1, help='This is the maximum number of tasks in each job array that slurm will run at any one time. If not given, Max_jobs_running_in_queue_from_ReJig_mass_submit from the submit settings is used.', default=[None])
+        parser.add_argument('--resume',         nargs=1, help='This indicates if you want to skip jobs in the '+str(submission_journal_filename)+' file that are still in the slurm queue. If False, these jobs will be submitted again.', default=['True'])
 
     @staticmethod
     def run(args_submit):
@@ -33,14 +35,49 @@ class CLICommand:
         # First, use this method to create a settings.txt file if it doesn't already exist, and check that the current settings.txt file can be read without problems.
         check_submit_settingsTXT(path_to_settings_txt_file)
 
-        # Second, run this program.
-        Run_method()
+        # Second, obtain the tag that indicates if you want to submit jobs as job arrays.
+        use_job_arrays = str(args_submit.array[0]).lower()
+        if   use_job_arrays in ['t', 'true']:
+            use_job_arrays = True
+        elif use_job_arrays in ['f', 'false']:
+            use_job_arrays = False
+        else:
+            raise Exception('Error: The value for "--array" must be either "True" or "False".')
+
+        # Third, obtain the maximum number of array tasks to run at any one time.
+        array_throttle = args_submit.array_throttle[0]
+        if array_throttle is not None:
+            try:
+                array_throttle = int(array_throttle)
+            except ValueError:
+                raise Exception(f'Error: The value for "--array_throttle" must be an integer. --array_throttle = {array_throttle}')
+
+        # Fourth, obtain the tag that indicates if you want to skip jobs that have already been submitted and are still in the slurm queue.
+        resume = str(args_submit.resume[0]).lower()
+        if   resume in ['t', 'true']:
+            resume = True
+        elif resume in ['f', 'false']:
+            resume = False
+        else:
+            raise Exception('Error: The value for "--resume" must be either "True" or "False".')
+
+        # Fifth, run this program.
+        Run_method(use_job_arrays=use_job_arrays, array_throttle=array_throttle, resume=resume)
 
 # =========================================================================================================================================
 
-def Run_method():
+def Run_method(use_job_arrays=False, array_throttle=None, resume=True):
     '''
     This program is designed to submit all sl files called submit.sl to slurm.
+
+    Parameters
+    ----------
+    use_job_arrays : bool.
+        If True, all the jobs will be submitted as a few slurm job arrays, rather than submitting each job one at a time. Default: False
+    array_throttle : int or None
+        This is the maximum number of tasks in each job array that slurm will run at any one time. If None, Max_jobs_running_in_queue_from_ReJig_mass_submit is used. Default: None
+    resume : bool.
+        If True, jobs recorded in the ReJig_submission_journal.jsonl file that are still in the slurm queue will not be submitted again. Default: True
     '''
 
     print('##################################################')
@@ -49,163 +86,85 @@ def Run_method():
 
     # Second, read the settings from the settings file. 
     Max_jobs_in_queue_at_any_one_time, Max_jobs_pending_in_queue_from_ReJig_mass_submit, Max_jobs_running_in_queue_from_ReJig_mass_submit, time_to_wait_before_next_submission, time_to_wait_max_queue, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting, time_to_wait_before_next_submission_due_to_not_waiting_between_submissions = read_submit_settingsTXT_file(path_to_settings_txt_file)
-    wait_between_submissions = False
+    optional_settings = read_optional_submit_settingsTXT_file(path_to_settings_txt_file)
 
-    # Third, indicate if there will be a small wait between jobs.
-    if wait_between_submissions == True:
-        print('This program will wait one minute between submitting jobs.')
-    else:
-        print('This program will not wait between submitting jobs.')
+    # 2.1: Initialise the snapshot of the slurm queue, which is shared by all the checks made on the slurm queue below.
+    slurm_queue_snapshot = SlurmQueueSnapshot(time_to_live=optional_settings['squeue_snapshot_time_to_live'])
+
+    # 2.2: Open the journal that records every job submitted to slurm. If resume is False, the jobs already in the journal are forgotten.
+    path = os.getcwd()
+    submission_journal = SubmissionJournal(path, resume=resume)
+
+    # 2.3: If desired, submit all the jobs as job arrays. Slurm limits the number of running tasks in each job array, 
+    #      so the pending and running queue checks below are not needed.
+    if use_job_arrays:
+        if array_throttle is None:
+            array_throttle = int(Max_jobs_running_in_queue_from_ReJig_mass_submit)
+        with submission_journal:
+            errors_list = submit_job_arrays_to_slurm(path, Max_jobs_in_queue_at_any_one_time, array_throttle, optional_settings['max_array_size'], time_to_wait_before_next_submission, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting, slurm_queue_snapshot, submission_journal=submission_journal)
+        print_journal_summary(submission_journal)
+        print_submission_summary(errors_list, slurm_queue_snapshot)
+        return
+
+    # Third, set up the throttle that controls how quickly jobs are submitted to slurm, and the engine that will submit jobs to slurm. Many sbatch calls can be waiting on slurm at the same time, 
+    #        but jobs are only submitted if they will not go over the limits given in the settings file.
+    #        The queue watcher keeps track of which of the jobs submitted by this program are pending or running, so that jobs can be submitted as soon as there is room in the queue.
+    submission_throttle = AdaptiveSubmissionThrottle(initial_rate=optional_settings['initial_submission_rate'], min_rate=optional_settings['min_submission_rate'], max_rate=optional_settings['max_submission_rate'], target_sbatch_latency=optional_settings['target_sbatch_latency'])
+    queue_watcher = SlurmQueueWatcher(poll_interval=optional_settings['queue_poll_interval'])
+    submission_engine = AsyncSubmissionEngine(Max_jobs_in_queue_at_any_one_time, Max_jobs_pending_in_queue_from_ReJig_mass_submit, Max_jobs_running_in_queue_from_ReJig_mass_submit, time_to_wait_before_next_submission, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting, slurm_queue_snapshot, max_concurrent_submissions=optional_settings['max_concurrent_submissions'], sbatch_timeout=optional_settings['sbatch_timeout'], max_submission_backoff=optional_settings['max_submission_backoff'], max_submission_attempts_per_job=optional_settings['max_submission_attempts_per_job'], submission_journal=submission_journal, submission_throttle=submission_throttle, queue_watcher=queue_watcher)
+    print('This program will run up to '+str(submission_engine.max_concurrent_submissions)+' sbatch calls at the same time.')
+    print('Will begin submitting '+str(round(submission_throttle.rate * 60.0, 1))+' jobs per minute. This will change depending on how quickly slurm submits jobs and starts running them.')
     print('Will begin to search for submit.sl and other .sl files.')
     print('***************************************************************************')
 
-    # Fourth, time to submit all the GA scripts! Lets get this stuff going!
-    if not wait_between_submissions:
-        max_consec_counter = 250
-        consec_counter = 0
-    errors_list = []
-    error_counter = 0
-    path = os.getcwd()
-    for (dirpath, dirnames, filenames) in os.walk(path):
-        dirnames.sort()
-        filenames.sort()
-
-        # 4.1: Determine if the following submit scripts are in this folder
-        is_submitSL_in_filenames = 'submit.sl' in filenames
-
-        # 4.2: If there is a submit file to submit, submit it.        
-        if any([is_submitSL_in_filenames]):
-            
-            # 4.2.1, determine what calculations we are looking at.
-            software_type = determine_quantum_computing_software_type(dirpath, filenames)
-
-            # 4.2.2: Figure out which submit files in the folder should be submitted to slurm.
-            submission_filenames = []
-            if is_submitSL_in_filenames:
-                # Submitting either ATC or EET calculation.
-                if software_type == 'Gaussian':
-                    submission_filenames += general_gaussian_submission(filenames)
-                elif software_type == 'ORCA':
-                    submission_filenames += general_orca_submission(filenames)
-                else:
-                    raise Exception('ERROR: Could not determine what software will be used in this submission file.')
-
-            # 4.2.3: If we do not have jobs to submit to slurm, move on. 
-            if len(submission_filenames) == 0:
-                dirnames[:] = []
-                filenames[:] = []
-                continue
-
-            # ====================================================================================================
-            # 4.4: Submit the jobs to slurm
-            for submission_filename in submission_filenames:
-
-                # ----------------------------------------------------------------
-                # 4.4.1: Determine if it is the right time to submit jobs
-                print('*****************************************************************************')
-                while True:
-                    reached_max_jobs, number_in_queue = check_max_jobs_in_queue_after_next_submission(dirpath, Max_jobs_in_queue_at_any_one_time)
-                    if reached_max_jobs:
-                        print('-----------------------------------------------------------------------------')
-                        print('You can not have any more jobs in the queue before submitting the mass_sub. Will wait a bit of time for some of them to complete')
-                        print('Number of Jobs in the queue = '+str(number_in_queue))
-                        countdown(time_to_wait_before_next_submission)
-                        print('-----------------------------------------------------------------------------')
-                    else:
-                        print('The number of jobs in the queue currently is: '+str(number_in_queue))
-                        break
-                
-                # 4.4.2: Submit the jobs
-                os.chdir(dirpath)
-                name = dirpath.replace(path, '').split('/', -1)[1:]
-                name = "_".join(str(x) for x in name)
-                print("Submitting " + str(name) + " to slurm.")
-                print('Submission .sl file found in: '+str(os.getcwd()))
-                print('Submission filename: '+str(submission_filename))
-                error_counter = 0
-                while True:
-                    if error_counter == number_of_consecutive_error_before_exitting:
-                        break
-                    else:
-                        submitting_command = ['sbatch', str(submission_filename)]
-                        proc = Popen(submitting_command, stdout=PIPE, stderr=PIPE) # shell=True, 
-                        try:
-                            if not (proc.wait(timeout=(2*60)) == 0): # 120 seconds
-                                # A problem occurred during the submission. Report this and wait a bit before trying again.
-                                error_counter += 1
-                                if error_counter == number_of_consecutive_error_before_exitting:
-                                    print('----------------------------------------------')
-                                    print('Error in submitting submit script to slurm.')
-                                    print('I got '+str(number_of_consecutive_error_before_exitting)+" consecutive errors. Something must not be working right somewhere. I'm going to stop here just in case something is not working.")
-                                    print('')
-                                    print('The following submit.sl scripts WERE NOT SUBMITTED TO SLURM')
-                                    print('')
-                                else:
-                                    stdout, stderr = proc.communicate()
-                                    print('----------------------------------------------')
-                                    print('Error in submitting submit script to slurm. This error was:')
-                                    print(stderr)
-                                    print('Number of consecutive errors: '+str(error_counter))
-                                    print('Run_submitSL_slurm.py will retry submitting this job to slurm after '+str(time_to_wait_before_next_submission_due_to_temp_submission_issue)+' seconds of wait time')
-                                    print('----------------------------------------------')
-                                    countdown(time_to_wait_before_next_submission_due_to_temp_submission_issue)
-                            else:
-                                # Submission successful, report this and move on.
-                                stdout, stderr = proc.communicate()
-                                job_number = int(stdout.decode("utf-8").replace('Submitted batch job',''))
-                                print("Submitted " + str(name) + " to slurm: "+str(job_number))
-                                # Wait until the running and pending queue for this program is available to move on.
-                                wait_for_pending_slurm_job_queue_decrease(job_number, Max_jobs_pending_in_queue_from_ReJig_mass_submit, Max_jobs_running_in_queue_from_ReJig_mass_submit)
-                                break
-                        except TimeoutExpired:
-                            # A problem occurred during the submission, sbatch timedout. Report this and wait a bit before trying again.
-                            proc.kill()
-                            error_counter += 1
-                            if error_counter == number_of_consecutive_error_before_exitting:
-                                print('----------------------------------------------')
-                                print('Error in submitting submit script to slurm. Job timed-out after 2 minutes.')
-                                print('I got '+str(number_of_consecutive_error_before_exitting)+" consecutive errors. Something must not be working right somewhere. I'm going to stop here just in case something is not working.")
-                                print('')
-                                print('The following submit.sl scripts WERE NOT SUBMITTED TO SLURM')
-                                print('')
-                            else:
-                                print('----------------------------------------------')
-                                print('Error in submitting submit script to slurm. Job timed-out after 2 minutes.')
-                                print('Number of consecutive errors: '+str(error_counter))
-                                print('Run_submitSL_slurm.py will retry submitting this job to slurm after '+str(time_to_wait_before_next_submission_due_to_temp_submission_issue)+' seconds of wait time')
-                                print('----------------------------------------------')
-                                countdown(time_to_wait_before_next_submission_due_to_temp_submission_issue)
-
-                # 4.4.3: Check that there were any errors, and wait until it is possible to submit another job without going over the maximum limit for this user.
-                if error_counter == number_of_consecutive_error_before_exitting:
-                    print(dirpath)
-                    errors_list.append(dirpath)
-                else:
-                    if wait_between_submissions:
-                        reached_max_jobs, number_in_queue = check_max_jobs_in_queue_after_next_submission(dirpath)
-                        print('The number of jobs in the queue after submitting job is currently is: '+str(number_in_queue))
-                        #print('Will wait for '+str(time_to_wait_max_queue)+' to give time between consecutive submissions')
-                        countdown(time_to_wait_max_queue)
-                        print('*****************************************************************************')
-
-                # 4.4.4: If you are waiting between 
-                dirnames[:] = []
-                filenames[:] = []
-                if not wait_between_submissions:
-                    if consec_counter >= max_consec_counter:
-                        print('----------------------------------------------')
-                        print('As you are not waiting between consecutive submissions, it is good practise to wait for a minute at some stage')
-                        print(str(max_consec_counter) +' have been submitted consecutively. Will not wait for '+str(time_to_wait_before_next_submission_due_to_not_waiting_between_submissions)+' s before continuing')
-                        print('----------------------------------------------')
-                        countdown(time_to_wait_before_next_submission_due_to_not_waiting_between_submissions)
-                        consec_counter = 0
-                    else:
-                        consec_counter += 1
-
-            # ====================================================================================================
-    # ============================================================================================================
-
-    # Fifth, check out if there were any issues that meant that this program has to finish prematurally. 
+    # Fourth, skip any jobs in the journal that are still in the slurm queue, using one snapshot of the slurm queue taken before any jobs are submitted.
+    #        These jobs are given to the queue watcher, so that they count towards the pending and running limits given in the settings file.
+    job_states = slurm_queue_snapshot.get_job_states(force_refresh=True)
+    queue_watcher.add_jobs_in_queue(submission_journal.get_jobs_in_queue(job_states))
+    folders_to_submit = submission_journal.skip_jobs_in_queue(get_folders_to_submit(path), job_states)
+
+    # Fifth, time to submit all the GA scripts! Lets get this stuff going!
+    with submission_journal:
+        errors_list = submission_engine.run(folders_to_submit, path)
+    print('Final submission rate: '+str(round(submission_throttle.rate * 60.0, 1))+' jobs per minute.')
+
+    # Sixth, report the results of submitting jobs to slurm.
+    print_journal_summary(submission_journal)
+    print_submission_summary(errors_list, slurm_queue_snapshot, queue_watcher=queue_watcher)
+
+def print_journal_summary(submission_journal):
+    '''
+    This method will report how many jobs were not submitted again because they were already in the slurm queue.
+
+    Parameters
+    ----------
+    submission_journal : SubmissionJournal
+        This is the journal of jobs submitted to slurm.
+    '''
+    if submission_journal.number_of_skipped_jobs > 0:
+        print(str(submission_journal.number_of_skipped_jobs)+' jobs in '+str(submission_journal_filename)+' were already in the slurm queue, so were not submitted again.')
+
+def print_submission_summary(errors_list, slurm_queue_snapshot, queue_watcher=None):
+    '''
+    This method will report any jobs that were not submitted to slurm successfully.
+
+    Parameters
+    ----------
+    errors_list : list of str.
+        These are the folders of any jobs that were not submitted to slurm.
+    slurm_queue_snapshot : SlurmQueueSnapshot
+        This is the snapshot of the slurm queue.
+    queue_watcher : SlurmQueueWatcher or None
+        This is the watcher that kept track of the jobs submitted by this program. Default: None
+    '''
+
+    # First, report how many times squeue was called to check the slurm queue.
+    number_of_squeue_calls = slurm_queue_snapshot.number_of_squeue_calls
+    if queue_watcher is not None:
+        number_of_squeue_calls += queue_watcher.number_of_squeue_calls
+    print('Number of times squeue was called: '+str(number_of_squeue_calls))
+
+    # Second, check out if there were any issues that meant that this program has to finish prematurally. 
     if len(errors_list) > 0:
         print('----------------------------------------------')
         print()
@@ -0,0 +1,153 @@
+"""
+adaptive_submission_throttle.py, Geoffrey Weal, 18/10/26
+
+This class is designed to control how quickly jobs are submitted to slurm, using how slurm is responding rather than fixed waits.
+
+This is a token bucket, where each sbatch call uses one token and tokens are added at the current submission rate. The submission rate is
+changed using additive increase/multiplicative decrease (AIMD):
+
+* Each time sbatch submits a job quickly, the submission rate is increased by a small fixed amount.
+* Each time sbatch fails, sbatch is slow, or the pending queue is filling up, the submission rate is halved.
+"""
+import time, asyncio
+
+class AdaptiveSubmissionThrottle:
+    """
+    This class is designed to control how quickly jobs are submitted to slurm, using a token bucket whose rate is changed using additive increase/multiplicative decrease.
+
+    Parameters
+    ----------
+    initial_rate : float
+        This is the number of jobs per second to submit to begin with. Default: 1.0
+    min_rate : float
+        This is the slowest that jobs will be submitted, in jobs per second. Default: 0.02
+    max_rate : float
+        This is the fastest that jobs will be submitted, in jobs per second. Default: 5.0
+    target_sbatch_latency : float
+        If sbatch takes longer than this number of seconds to submit a job, slurm is taken to be busy and the submission rate is decreased. Default: 5.0
+    additive_increase : float
+        This is the number of jobs per second to increase the submission rate by each time sbatch submits a job quickly. Default: 0.1
+    multiplicative_decrease : float
+        This is the fraction to multiply the submission rate by when slurm is busy. Default: 0.5
+    pending_fraction_to_decrease : float
+        If the fraction of Max_jobs_pending_in_queue_from_ReJig_mass_submit that is pending is above this value, the submission rate is decreased. Default: 0.75
+    time_between_decreases : float
+        The submission rate is only decreased once in this number of seconds, so that many jobs failing at the same time only decrease the rate once. Default: 10.0
+    """
+    def __init__(self, initial_rate=1.0, min_rate=0.02, max_rate=5.0, target_sbatch_latency=5.0, additive_increase=0.1, multiplicative_decrease=0.5, pending_fraction_to_decrease=0.75, time_between_decreases=10.0):
+
+        # First, check the settings for this throttle.
+        if not (0.0 < min_rate <= max_rate):
+            raise Exception(f'Error: min_rate must be greater than 0 and less than or equal to max_rate. min_rate = {min_rate}; max_rate = {max_rate}')
+        if not (0.0 < multiplicative_decrease < 1.0):
+            raise Exception(f'Error: multiplicative_decrease must be between 0 and 1. multiplicative_decrease = {multiplicative_decrease}')
+
+        # Second, record the settings for this throttle.
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.target_sbatch_latency = float(target_sbatch_latency)
+        self.additive_increase = float(additive_increase)
+        self.multiplicative_decrease = float(multiplicative_decrease)
+        self.pending_fraction_to_decrease = float(pending_fraction_to_decrease)
+        self.time_between_decreases = float(time_between_decreases)
+
+        # Third, initialise the token bucket. The bucket can hold one second of tokens, so only a short burst of jobs can be submitted at once.
+        self.rate = min(max(float(initial_rate), self.min_rate), self.max_rate)
+        self.tokens = 1.0
+        self.time_of_last_refill = time.monotonic()
+        self.time_of_last_decrease = None
+        self.last_reported_rate = self.rate
+
+    def refill(self):
+        """
+        This method will add the tokens made since the tokens were last added.
+        """
+        current_time = time.monotonic()
+        self.tokens = min(self.tokens + (current_time - self.time_of_last_refill) * self.rate, max(1.0, self.rate))
+        self.time_of_last_refill = current_time
+
+    async def wait_for_token(self):
+        """
+        This method will wait until a token is available, and then use it. Call this before each sbatch call.
+        """
+        while True:
+            self.refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    def record_submission(self, sbatch_latency):
+        """
+        This method will change the submission rate after sbatch has submitted a job.
+
+        Parameters
+        ----------
+        sbatch_latency : float
+            This is the number of seconds sbatch took to submit the job.
+        """
+        if sbatch_latency > self.target_sbatch_latency:
+            self.decrease_rate('sbatch took '+str(round(sbatch_latency, 1))+' s to submit a job')
+        else:
+            self.increase_rate()
+
+    def record_error(self):
+        """
+        This method will decrease the submission rate after sbatch did not work.
+        """
+        self.decrease_rate('sbatch did not work')
+
+    def record_pending_jobs(self, number_of_pending_jobs, Max_jobs_pending_in_queue_from_ReJig_mass_submit):
+        """
+        This method will decrease the submission rate if the pending queue is filling up.
+
+        Parameters
+        ----------
+        number_of_pending_jobs : int
+            This is the number of jobs submitted by this program that are pending (including those being submitted).
+        Max_jobs_pending_in_queue_from_ReJig_mass_submit : int
+            This is the maximum number of jobs that we want in the pending queue that were submitted by this program.
+        """
+        if number_of_pending_jobs >= self.pending_fraction_to_decrease * Max_jobs_pending_in_queue_from_ReJig_mass_submit:
+            self.decrease_rate('the pending queue is filling up ('+str(number_of_pending_jobs)+' jobs pending)')
+
+    def increase_rate(self):
+        """
+        This method will increase the submission rate by additive_increase. The new rate is reported if it has increased by more than 20% since it was last reported.
+        """
+        self.refill()
+        self.rate = min(self.rate + self.additive_increase, self.max_rate)
+        if self.rate >= 1.2 * self.last_reported_rate:
+            self.report_rate('slurm is submitting jobs quickly')
+
+    def decrease_rate(self, reason):
+        """
+        This method will multiply the submission rate by multiplicative_decrease, unless it was decreased less than time_between_decreases seconds ago.
+
+        Parameters
+        ----------
+        reason : str.
+            This is why the submission rate is being decreased.
+        """
+        current_time = time.monotonic()
+        if (self.time_of_last_decrease is not None) and ((current_time - self.time_of_last_decrease) < self.time_between_decreases):
+            return
+        self.refill()
+        self.time_of_last_decrease = current_time
+        self.rate = max(self.rate * self.multiplicative_decrease, self.min_rate)
+        self.tokens = min(self.tokens, 1.0)
+        self.report_rate(reason)
+
+    def report_rate(self, reason):
+        """
+        This method will print the current submission rate.
+
+        Parameters
+        ----------
+        reason : str.
+            This is why the submission rate has changed.
+        """
+        print('Submission rate is now '+str(round(self.rate * 60.0, 1))+' jobs per minute, as '+str(reason)+'.')
+        self.last_reported_rate = self.rate
+
+# ------------------------------------------------------------------------------------------------
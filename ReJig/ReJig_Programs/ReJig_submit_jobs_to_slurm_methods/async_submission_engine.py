@@ -0,0 +1,403 @@
+"""
+async_submission_engine.py, Geoffrey Weal, 18/10/26
+
+This class is designed to submit jobs to slurm using asyncio, so that many sbatch calls can be waiting on slurm at the same time.
+
+Each job is submitted from its own folder by giving that folder to sbatch as its working directory, so this program never changes directory.
+Jobs are only submitted if they would not go over the limits given in the submit_settings.txt file, and no faster than allowed by the AdaptiveSubmissionThrottle.
+"""
+import os, time, shlex, random, asyncio
+
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.adaptive_submission_throttle import AdaptiveSubmissionThrottle
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.slurm_queue_watcher          import SlurmQueueWatcher
+
+def get_sbatch_command():
+    """
+    This method will obtain the sbatch executable to use.
+
+    This can be changed to a fake sbatch for testing by setting the REJIG_SBATCH environment variable, or by placing a fake sbatch script on your PATH.
+
+    Returns
+    -------
+    sbatch_command : list of str.
+        This is the sbatch command to run.
+    """
+    return shlex.split(os.environ.get('REJIG_SBATCH', 'sbatch'))
+
+def get_job_number_from_sbatch_output(stdout):
+    """
+    This method will obtain the job number from the output of sbatch, given as either "Submitted batch job 1234", "Submitted batch job 1234 on cluster name" 
+    (if --clusters is used) or "1234;cluster" (if --parsable is used).
+
+    Parameters
+    ----------
+    stdout : str.
+        This is the output from sbatch.
+
+    Returns
+    -------
+    job_number : int
+        This is the job number of the submitted job. A ValueError is raised if no job number is found.
+    """
+    for word in stdout.split():
+        job_number = word.split(';')[0]
+        if job_number.isdigit():
+            return int(job_number)
+    raise ValueError('No job number found in the output of sbatch: '+str(stdout))
+
+# ------------------------------------------------------------------------------------------------
+
+class SubmissionJob:
+    """
+    This class holds the state of a job that is being submitted to slurm.
+
+    Parameters
+    ----------
+    dirpath : str.
+        This is the folder containing the submit script.
+    submission_filename : str.
+        This is the name of the submit script.
+    name : str.
+        This is the name of the job to report to the user.
+    """
+    def __init__(self, dirpath, submission_filename, name):
+        self.dirpath = dirpath
+        self.submission_filename = submission_filename
+        self.name = name
+
+        # state is one of "waiting", "submitting", "submitted", or "failed".
+        self.state = 'waiting'
+        self.job_number = None
+        self.number_of_attempts = 0
+        self.error_message = None
+        self.time_submitted = None
+
+# ------------------------------------------------------------------------------------------------
+
+class AsyncSubmissionEngine:
+    """
+    This class is designed to submit jobs to slurm using asyncio, with at most max_concurrent_submissions sbatch calls running at any one time.
+
+    Before each job is submitted, this class waits until submitting the job would not go over Max_jobs_in_queue_at_any_one_time,
+    Max_jobs_pending_in_queue_from_ReJig_mass_submit, or Max_jobs_running_in_queue_from_ReJig_mass_submit. Jobs that are currently
+    being submitted are counted towards these limits.
+
+    If sbatch fails or does not finish within sbatch_timeout seconds, the job is resubmitted after an exponentially increasing wait,
+    starting at time_to_wait_before_next_submission_due_to_temp_submission_issue seconds, up to max_submission_attempts_per_job times.
+    If sbatch fails number_of_consecutive_error_before_exitting times in a row (for any jobs), no more jobs are submitted.
+
+    How quickly jobs are submitted is controlled by submission_throttle, which slows down submissions when sbatch is slow or fails, 
+    or when the pending queue is filling up, and speeds them up again when slurm is submitting jobs quickly.
+
+    Parameters
+    ----------
+    Max_jobs_in_queue_at_any_one_time : int
+        This is the maximum limit of jobs that can be in the user queue.
+    Max_jobs_pending_in_queue_from_ReJig_mass_submit : int
+        This is the maximum number of jobs that we want in the pending queue that were submitted by this program.
+    Max_jobs_running_in_queue_from_ReJig_mass_submit : int
+        This is the maximum number of jobs that we want in the running queue that were submitted by this program.
+    time_to_wait_before_next_submission : float
+        This is the time to wait before checking the slurm queue again if there is no room in the queue for the next job.
+    time_to_wait_before_next_submission_due_to_temp_submission_issue : float
+        This is the time to wait before resubmitting a job the first time sbatch does not work. This wait is doubled after each failed attempt.
+    number_of_consecutive_error_before_exitting : int
+        This is the number of times sbatch can fail in a row (for any jobs) before no more jobs are submitted.
+    slurm_queue_snapshot : SlurmQueueSnapshot
+        This is the snapshot of the slurm queue.
+    max_concurrent_submissions : int
+        This is the maximum number of sbatch calls to run at any one time. Default: 4
+    sbatch_timeout : float
+        This is the number of seconds to wait for sbatch to finish before trying again. Default: 120.0
+    max_submission_backoff : float
+        This is the longest time to wait before resubmitting a job after sbatch did not work. Default: 300.0
+    max_submission_attempts_per_job : int
+        This is the number of times sbatch is run for a job before giving up on that job. Default: 3
+    submission_journal : SubmissionJournal or None
+        If given, each job is recorded in this journal as soon as it has been submitted. Default: None
+    submission_throttle : AdaptiveSubmissionThrottle or None
+        This controls how quickly jobs are submitted. If None, an AdaptiveSubmissionThrottle with its default settings is used. Default: None
+    queue_watcher : SlurmQueueWatcher or None
+        This keeps track of which of the jobs submitted by this program are pending or running. If None, a SlurmQueueWatcher with its default settings is used. Default: None
+    """
+    def __init__(self, Max_jobs_in_queue_at_any_one_time, Max_jobs_pending_in_queue_from_ReJig_mass_submit, Max_jobs_running_in_queue_from_ReJig_mass_submit, time_to_wait_before_next_submission, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting, slurm_queue_snapshot, max_concurrent_submissions=4, sbatch_timeout=120.0, max_submission_backoff=300.0, max_submission_attempts_per_job=3, submission_journal=None, submission_throttle=None, queue_watcher=None):
+
+        # First, check that the number of concurrent submissions is a positive integer.
+        if not (isinstance(max_concurrent_submissions, int) and (max_concurrent_submissions >= 1)):
+            raise Exception(f'Error: max_concurrent_submissions must be an integer greater than or equal to 1. max_concurrent_submissions = {max_concurrent_submissions}')
+        if not (isinstance(max_submission_attempts_per_job, int) and (max_submission_attempts_per_job >= 1)):
+            raise Exception(f'Error: max_submission_attempts_per_job must be an integer greater than or equal to 1. max_submission_attempts_per_job = {max_submission_attempts_per_job}')
+
+        # Second, record the limits from the settings file.
+        self.Max_jobs_in_queue_at_any_one_time = Max_jobs_in_queue_at_any_one_time
+        self.Max_jobs_pending_in_queue_from_ReJig_mass_submit = Max_jobs_pending_in_queue_from_ReJig_mass_submit
+        self.Max_jobs_running_in_queue_from_ReJig_mass_submit = Max_jobs_running_in_queue_from_ReJig_mass_submit
+        self.time_to_wait_before_next_submission = time_to_wait_before_next_submission
+        self.time_to_wait_before_next_submission_due_to_temp_submission_issue = time_to_wait_before_next_submission_due_to_temp_submission_issue
+        self.number_of_consecutive_error_before_exitting = number_of_consecutive_error_before_exitting
+
+        # Third, record the settings for how jobs are submitted.
+        self.slurm_queue_snapshot = slurm_queue_snapshot
+        self.max_concurrent_submissions = max_concurrent_submissions
+        self.sbatch_timeout = float(sbatch_timeout)
+        self.max_submission_backoff = float(max_submission_backoff)
+        self.max_submission_attempts_per_job = max_submission_attempts_per_job
+        self.sbatch_command = get_sbatch_command()
+        self.submission_journal = submission_journal
+        self.submission_throttle = AdaptiveSubmissionThrottle() if (submission_throttle is None) else submission_throttle
+
+        # Fourth, initialise the watcher that keeps track of the jobs submitted by this program that are pending or running in the slurm queue.
+        self.queue_watcher = SlurmQueueWatcher() if (queue_watcher is None) else queue_watcher
+
+        # Fifth, initialise the state of every job given to this engine.
+        self.jobs = []
+        self.number_of_jobs_being_submitted = 0
+        self.number_of_consecutive_errors = 0
+        self.stopped = False
+
+    def run(self, folders_to_submit, path):
+        """
+        This method will submit all the jobs in folders_to_submit to slurm.
+
+        Parameters
+        ----------
+        folders_to_submit : iterable of (str., list of str.)
+            These are the (dirpath, submission_filenames) of each folder containing jobs to submit, such as given by get_folders_to_submit.
+        path : str.
+            This is the folder that the jobs are in. This is used to give the name of each job.
+
+        Returns
+        -------
+        errors_list : list of str.
+            These are the folders of any jobs that were not submitted to slurm.
+        """
+        asyncio.run(self.watch_queue_and_submit_jobs(folders_to_submit, path))
+        return [job.dirpath for job in self.jobs if not (job.state == 'submitted')]
+
+    async def watch_queue_and_submit_jobs(self, folders_to_submit, path):
+        """
+        This method will start watching the slurm queue, submit all the jobs in folders_to_submit to slurm, and then stop watching the slurm queue.
+
+        Parameters
+        ----------
+        folders_to_submit : iterable of (str., list of str.)
+            These are the (dirpath, submission_filenames) of each folder containing jobs to submit.
+        path : str.
+            This is the folder that the jobs are in.
+        """
+        await self.queue_watcher.start()
+        try:
+            await self.submit_jobs(folders_to_submit, path)
+        finally:
+            await self.queue_watcher.stop()
+
+    async def submit_jobs(self, folders_to_submit, path):
+        """
+        This method will submit all the jobs in folders_to_submit to slurm, in order, with at most max_concurrent_submissions sbatch calls running at any one time.
+
+        Parameters
+        ----------
+        folders_to_submit : iterable of (str., list of str.)
+            These are the (dirpath, submission_filenames) of each folder containing jobs to submit.
+        path : str.
+            This is the folder that the jobs are in.
+        """
+
+        # First, initialise the semaphore that limits the number of sbatch calls running at any one time.
+        self.submission_semaphore = asyncio.Semaphore(self.max_concurrent_submissions)
+        submission_tasks = set()
+
+        # Second, go through each job in order.
+        for dirpath, submission_filenames in folders_to_submit:
+            for submission_filename in submission_filenames:
+
+                # 2.1: Record the job.
+                name = os.path.relpath(dirpath, path).replace(os.sep, '_')
+                job = SubmissionJob(dirpath, submission_filename, name)
+                self.jobs.append(job)
+
+                # 2.2: If sbatch has failed too many times in a row, do not submit any more jobs.
+                if self.stopped:
+                    job.state = 'failed'
+                    continue
+
+                # 2.3: Wait until an sbatch call can be made, and until there is room in the slurm queue for this job.
+                await self.submission_semaphore.acquire()
+                await self.wait_for_room_in_queue()
+                if self.stopped:
+                    job.state = 'failed'
+                    self.submission_semaphore.release()
+                    continue
+
+                # 2.4: Submit this job in the background, so that the next job can be prepared while sbatch is running.
+                self.number_of_jobs_being_submitted += 1
+                submission_task = asyncio.create_task(self.submit_job(job))
+                submission_tasks.add(submission_task)
+                submission_task.add_done_callback(submission_tasks.discard)
+
+        # Third, wait for all the jobs being submitted to finish.
+        if len(submission_tasks) > 0:
+            await asyncio.gather(*submission_tasks)
+
+    async def submit_job(self, job):
+        """
+        This method will submit a job to slurm, retrying with an exponentially increasing wait if sbatch does not work.
+
+        Parameters
+        ----------
+        job : SubmissionJob
+            This is the job to submit.
+        """
+        try:
+            job.state = 'submitting'
+            print('Submitting '+str(job.name)+' to slurm ('+str(job.dirpath)+'/'+str(job.submission_filename)+').')
+            while True:
+
+                # First, wait until the throttle allows another sbatch call, and then run sbatch for this job (unless sbatch has failed too many times in a row while waiting).
+                await self.submission_throttle.wait_for_token()
+                if self.stopped:
+                    job.state = 'failed'
+                    return
+                job.number_of_attempts += 1
+                start_time = time.monotonic()
+                job_number, error_message = await self.run_sbatch(job)
+
+                # Second, if the job was submitted, record it and move on.
+                if job_number is not None:
+                    self.submission_throttle.record_submission(time.monotonic() - start_time)
+                    job.state = 'submitted'
+                    job.job_number = job_number
+                    job.time_submitted = time.time()
+                    self.queue_watcher.add_submitted_job(job_number)
+                    self.slurm_queue_snapshot.add_submitted_job(job_number)
+                    self.number_of_consecutive_errors = 0
+                    if self.submission_journal is not None:
+                        self.submission_journal.record_submission(job.dirpath, job.submission_filename, job_number)
+                    print('Submitted '+str(job.name)+' to slurm: '+str(job_number))
+                    return
+
+                # Third, record the error. If sbatch has failed too many times in a row, stop submitting jobs, as in the original ReJig submit loop.
+                self.submission_throttle.record_error()
+                job.error_message = error_message
+                self.number_of_consecutive_errors += 1
+                print('----------------------------------------------')
+                print('Error in submitting '+str(job.name)+' to slurm. This error was:')
+                print(error_message)
+                print('Number of consecutive errors: '+str(self.number_of_consecutive_errors))
+                if (self.number_of_consecutive_errors >= self.number_of_consecutive_error_before_exitting) and (not self.stopped):
+                    self.stopped = True
+                    print('I got '+str(self.number_of_consecutive_error_before_exitting)+" consecutive errors. Something must not be working right somewhere. I'm going to stop here just in case something is not working.")
+                if self.stopped:
+                    job.state = 'failed'
+                    print('----------------------------------------------')
+                    return
+
+                # Fourth, if sbatch has failed too many times for this job, give up on it.
+                if job.number_of_attempts >= self.max_submission_attempts_per_job:
+                    job.state = 'failed'
+                    print('sbatch failed '+str(job.number_of_attempts)+' times for this job. Will not submit this job.')
+                    print('----------------------------------------------')
+                    return
+
+                # Fifth, wait before trying again, doubling the wait after each failed attempt.
+                time_to_wait = self.get_backoff_time(job.number_of_attempts)
+                print('Will retry submitting this job to slurm after '+str(round(time_to_wait, 1))+' seconds of wait time')
+                print('----------------------------------------------')
+                await asyncio.sleep(time_to_wait)
+
+        finally:
+            self.number_of_jobs_being_submitted -= 1
+            self.submission_semaphore.release()
+            await self.queue_watcher.notify()
+
+    async def run_sbatch(self, job):
+        """
+        This method will run sbatch once for a job, from the folder of the job.
+
+        Parameters
+        ----------
+        job : SubmissionJob
+            This is the job to submit.
+
+        Returns
+        -------
+        job_number : int or None
+            This is the job number of the submitted job. None if sbatch did not work.
+        error_message : str. or None
+            This is the reason sbatch did not work. None if the job was submitted.
+        """
+        try:
+            proc = await asyncio.create_subprocess_exec(*self.sbatch_command, str(job.submission_filename), cwd=job.dirpath, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except OSError as error:
+            return None, str(error)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=self.sbatch_timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return None, 'sbatch timed-out after '+str(self.sbatch_timeout)+' seconds.'
+        if not (proc.returncode == 0):
+            return None, stderr.decode('utf-8').strip()
+        try:
+            return get_job_number_from_sbatch_output(stdout.decode('utf-8')), None
+        except (ValueError, IndexError):
+            return None, 'Could not obtain the job number from the output of sbatch: '+stdout.decode('utf-8').strip()
+
+    def get_backoff_time(self, number_of_attempts):
+        """
+        This method will obtain the time to wait before resubmitting a job after sbatch did not work.
+
+        Parameters
+        ----------
+        number_of_attempts : int
+            This is the number of times sbatch has been run for this job.
+
+        Returns
+        -------
+        The time to wait in seconds. This is given a small random variation so that jobs that failed at the same time are not all resubmitted at the same time.
+        """
+        time_to_wait = self.time_to_wait_before_next_submission_due_to_temp_submission_issue * (2 ** (number_of_attempts - 1))
+        return min(time_to_wait, self.max_submission_backoff) * random.uniform(0.75, 1.25)
+
+    async def wait_for_room_in_queue(self):
+        """
+        This method will wait until the next job can be submitted without going over any of the limits given in the submit_settings.txt file.
+
+        While waiting, this method is woken up as soon as the queue watcher sees a job submitted by this program start running or finish.
+        """
+        force_refresh = False
+        waiting_message = None
+        while not self.stopped:
+
+            # First, obtain the number of jobs submitted by this program that are pending or running from the queue watcher. 
+            #        Jobs that are currently being submitted are not in the slurm queue yet, so add them on.
+            number_of_pending_jobs = len(self.queue_watcher.pending_job_numbers) + self.number_of_jobs_being_submitted
+            number_of_running_jobs = len(self.queue_watcher.running_job_numbers)
+            self.submission_throttle.record_pending_jobs(number_of_pending_jobs, self.Max_jobs_pending_in_queue_from_ReJig_mass_submit)
+
+            # Second, determine if the next job can be submitted. 
+            if number_of_pending_jobs >= self.Max_jobs_pending_in_queue_from_ReJig_mass_submit:
+                message, time_to_wait = 'The Pending Slurm Queue is full. Will wait to submit more job until other jobs have turned from pending to running.', self.queue_watcher.poll_interval
+            elif number_of_running_jobs >= self.Max_jobs_running_in_queue_from_ReJig_mass_submit:
+                message, time_to_wait = 'The Running Slurm Queue is full. Will wait to submit this job until jobs have finished running.', self.queue_watcher.poll_interval
+            else:
+                # 2.1: Check that there is room in your slurm queue, which includes jobs not submitted by this program. squeue is run in a thread, so jobs being submitted are not held up.
+                job_states = await asyncio.get_running_loop().run_in_executor(None, self.slurm_queue_snapshot.get_job_states, force_refresh)
+                number_in_queue = len(job_states) + self.number_of_jobs_being_submitted
+                if number_in_queue > self.Max_jobs_in_queue_at_any_one_time - 1:
+                    message, time_to_wait = 'You can not have any more jobs in the queue. Will wait a bit of time for some of them to complete. Number of Jobs in the queue = '+str(number_in_queue), self.time_to_wait_before_next_submission
+                    force_refresh = True
+                else:
+                    if waiting_message is not None:
+                        print('There is now room in the slurm queue. Will continue submitting jobs.')
+                        print('-----------------------------------------------------------------------------')
+                    return
+
+            # Third, wait until the queue watcher sees a change in the slurm queue, or until time_to_wait seconds have passed.
+            if not (message == waiting_message):
+                print('-----------------------------------------------------------------------------')
+                print(message)
+                waiting_message = message
+            await self.queue_watcher.wait_for_change(timeout=time_to_wait)
+
+# ------------------------------------------------------------------------------------------------
@@ -3,12 +3,8 @@ check_max_jobs_in_queue_after_next_submission.py, Geoffrey Weal, 4/1/2023
 
 This method will check to make sure that the next job can be submitted and not go over the allocated number of maximum jobs.
 """
-import getpass
-import subprocess
 
-username = getpass.getuser()
-command = "squeue -r -u "+str(username)
-def check_max_jobs_in_queue_after_next_submission(dirpath, Max_jobs_in_queue_at_any_one_time):
+def check_max_jobs_in_queue_after_next_submission(dirpath, Max_jobs_in_queue_at_any_one_time, slurm_queue_snapshot, force_refresh=False, number_of_jobs_to_submit=None):
     """
     This method will check to make sure that the next job can be submitted and not go over the allocated number of maximum jobs.
 
@@ -18,19 +14,22 @@ def check_max_jobs_in_queue_after_next_submission(dirpath, Max_jobs_in_queue_at_
         This is the settings? not needed to be programmed yet.
     Max_jobs_in_queue_at_any_one_time : int
         This is the maximum limit of jobs that can be in the user queue
+    slurm_queue_snapshot : SlurmQueueSnapshot
+        This is the snapshot of the slurm queue. squeue is only called if this snapshot is older than its time to live.
+    force_refresh : bool.
+        If True, a new snapshot of the slurm queue will be taken. Default: False
+    number_of_jobs_to_submit : int or None
+        This is the number of jobs that will be submitted next, such as the number of tasks in a job array. If None, this is obtained from the submit.sl file in dirpath. Default: None
 
     Returns
     -------
-
+    reached_max_jobs : bool.
+        This indicates if submitting the next job would go over Max_jobs_in_queue_at_any_one_time.
+    nlines : int
+        This is the number of jobs currently in the slurm queue.
     """
-    while True:
-        text = myrun(command)
-        nlines = len(text.splitlines())-1
-        if not (nlines == -1):
-            break
-        else:
-            print('Could not get the number of jobs in the slurm queue. Retrying to get this value.')
-    number_of_trials_to_be_submitted = get_number_to_trials_that_will_be_submitted_by_submitSL(dirpath)
+    nlines = slurm_queue_snapshot.number_of_jobs_in_queue(force_refresh=force_refresh)
+    number_of_trials_to_be_submitted = get_number_to_trials_that_will_be_submitted_by_submitSL(dirpath) if (number_of_jobs_to_submit is None) else number_of_jobs_to_submit
     if nlines > Max_jobs_in_queue_at_any_one_time - number_of_trials_to_be_submitted:
         return True, nlines
     else:
@@ -38,18 +37,3 @@ def check_max_jobs_in_queue_after_next_submission(dirpath, Max_jobs_in_queue_at_
 
 def get_number_to_trials_that_will_be_submitted_by_submitSL(dirpath):
     return 1
-
-def myrun(cmd):
-    """
-    This method will run a task in the terminal/bash.
-
-    Parameters
-    ----------
-    cmd : str. 
-        This is the command you would like to run in the terminal/bash.
-    """
-    proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout_lines = list(iter(proc.stdout.readline,b''))
-    stdout_lines = [line.decode() for line in stdout_lines]
-    return ''.join(stdout_lines)
-
@@ -0,0 +1,75 @@
+"""
+fake_sbatch.py, Geoffrey Weal, 18/10/26
+
+This is a stand-in for sbatch, used to test the ReJig submission methods on computers without slurm. Use this with fake_squeue.py.
+
+Each submitted job is added to the file given by the REJIG_FAKE_SQUEUE_FILE environment variable as a pending job, so that fake_squeue.py will show it. To use this, set:
+
+    export REJIG_SBATCH="python /path/to/fake_sbatch.py"
+    export REJIG_SQUEUE="python /path/to/fake_squeue.py"
+    export REJIG_FAKE_SQUEUE_FILE=/path/to/fake_queue.txt
+
+You can also make scripts called "sbatch" and "squeue" that run these files, and place them on your PATH.
+
+The following optional environment variables can be set to test how ReJig handles a slow or unreliable sbatch:
+
+* REJIG_FAKE_SBATCH_DELAY     : The number of seconds each sbatch call takes (Default: 0).
+* REJIG_FAKE_SBATCH_FAIL_RATE : The fraction of sbatch calls that fail (Default: 0).
+"""
+import os, sys, time, random, fcntl
+
+def fake_sbatch(arguments):
+    """
+    This method will add a job to the fake queue, and print its job number in the same way as sbatch.
+
+    Parameters
+    ----------
+    arguments : list of str.
+        These are the arguments given to sbatch. The last argument is the submit script, which must exist in the current folder.
+
+    Returns
+    -------
+    The exit code for this fake sbatch call.
+    """
+
+    # First, take as long as a real sbatch call, and fail as often as asked.
+    time.sleep(float(os.environ.get('REJIG_FAKE_SBATCH_DELAY', 0.0)))
+    if random.random() < float(os.environ.get('REJIG_FAKE_SBATCH_FAIL_RATE', 0.0)):
+        print('sbatch: error: Batch job submission failed: Socket timed out on send/recv operation', file=sys.stderr)
+        return 1
+
+    # Second, check that the submit script exists.
+    if (len(arguments) == 0) or (not os.path.exists(arguments[-1])):
+        print('sbatch: error: Unable to open file '+(arguments[-1] if (len(arguments) > 0) else ''), file=sys.stderr)
+        return 1
+
+    # Third, add the job to the fake queue, giving it the next job number. The fake queue is locked so that many fake sbatch calls can run at once.
+    fake_queue_filepath = os.environ.get('REJIG_FAKE_SQUEUE_FILE', None)
+    if fake_queue_filepath is None:
+        print('sbatch: error: REJIG_FAKE_SQUEUE_FILE has not been set', file=sys.stderr)
+        return 1
+    #        Like slurm, job numbers are never reused, so the last job number given is kept in a file next to the fake queue.
+    with open(fake_queue_filepath, 'a+') as fake_queueTXT:
+        fcntl.flock(fake_queueTXT, fcntl.LOCK_EX)
+        fake_queueTXT.seek(0)
+        job_numbers = [int(line.split()[0].split('_')[0]) for line in fake_queueTXT if (len(line.split()) >= 2)]
+        last_job_number_filepath = fake_queue_filepath+'.last_job_number'
+        if os.path.exists(last_job_number_filepath):
+            with open(last_job_number_filepath, 'r') as last_job_numberTXT:
+                job_numbers.append(int(last_job_numberTXT.read().strip() or 0))
+        job_number = max(job_numbers + [int(os.environ.get('REJIG_FAKE_SBATCH_FIRST_JOB_NUMBER', 1000))-1]) + 1
+        with open(last_job_number_filepath, 'w') as last_job_numberTXT:
+            last_job_numberTXT.write(str(job_number)+'\n')
+        fake_queueTXT.write(str(job_number)+' PD\n')
+        fake_queueTXT.flush()
+        fcntl.flock(fake_queueTXT, fcntl.LOCK_UN)
+
+    # Fourth, print the job number in the same way as sbatch.
+    if '--parsable' in arguments:
+        print(str(job_number))
+    else:
+        print('Submitted batch job '+str(job_number))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(fake_sbatch(sys.argv[1:]))
@@ -0,0 +1,46 @@
+"""
+fake_squeue.py, Geoffrey Weal, 18/10/26
+
+This is a stand-in for squeue, used to test the ReJig submission methods on computers without slurm.
+
+The jobs in the fake queue are read from the file given by the REJIG_FAKE_SQUEUE_FILE environment variable, where each line is given as "job_id state". To use this, set:
+
+    export REJIG_SQUEUE="python /path/to/fake_squeue.py"
+    export REJIG_FAKE_SQUEUE_FILE=/path/to/fake_queue.txt
+"""
+import os, sys
+
+def fake_squeue(arguments):
+    """
+    This method will print the jobs in the fake queue, in the "%i %t" format.
+
+    Parameters
+    ----------
+    arguments : list of str.
+        These are the arguments given to squeue. Only "-h" and "-j" are used, all other arguments are ignored.
+    """
+
+    # First, obtain the jobs to print, if given.
+    job_numbers_to_print = None
+    if '-j' in arguments:
+        job_numbers_to_print = set(arguments[arguments.index('-j')+1].split(','))
+
+    # Second, print the header if "-h" has not been given.
+    if '-h' not in arguments:
+        print('JOBID ST')
+
+    # Third, print the jobs in the fake queue.
+    fake_queue_filepath = os.environ.get('REJIG_FAKE_SQUEUE_FILE', None)
+    if (fake_queue_filepath is None) or (not os.path.exists(fake_queue_filepath)):
+        return
+    with open(fake_queue_filepath, 'r') as fake_queueTXT:
+        for line in fake_queueTXT:
+            line = line.split()
+            if len(line) < 2:
+                continue
+            if (job_numbers_to_print is not None) and (line[0].split('_')[0] not in job_numbers_to_print):
+                continue
+            print(line[0]+' '+line[1])
+
+if __name__ == '__main__':
+    fake_squeue(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""
+get_folders_to_submit.py, Geoffrey Weal, 18/10/26
+
+This method is designed to find all the folders that contain jobs that need to be submitted to slurm.
+"""
+import os
+
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.determine_quantum_computing_software_type import determine_quantum_computing_software_type
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.ReJig_submit_gaussian_jobs_to_slurm       import general_gaussian_submission
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.ReJig_submit_orca_jobs_to_slurm           import general_orca_submission
+
+def get_folders_to_submit(path):
+    """
+    This method is designed to find all the folders that contain jobs that need to be submitted to slurm, in alphabetical order.
+
+    Parameters
+    ----------
+    path : str.
+        This is the folder to look through for jobs to submit to slurm.
+
+    Yields
+    ------
+    dirpath : str.
+        This is the path to a folder containing jobs to submit to slurm.
+    submission_filenames : list of str.
+        These are the names of the submit scripts in dirpath to submit to slurm.
+    """
+    for (dirpath, dirnames, filenames) in os.walk(path):
+        dirnames.sort()
+        filenames.sort()
+
+        # First, determine if the following submit scripts are in this folder
+        is_submitSL_in_filenames = 'submit.sl' in filenames
+
+        # Second, if there is not a submit file in this folder, move on.
+        if not any([is_submitSL_in_filenames]):
+            continue
+
+        # Third, determine what calculations we are looking at.
+        software_type = determine_quantum_computing_software_type(dirpath, filenames)
+
+        # Fourth, figure out which submit files in the folder should be submitted to slurm.
+        submission_filenames = []
+        if is_submitSL_in_filenames:
+            # Submitting either ATC or EET calculation.
+            if software_type == 'Gaussian':
+                submission_filenames += general_gaussian_submission(filenames)
+            elif software_type == 'ORCA':
+                submission_filenames += general_orca_submission(filenames)
+            else:
+                raise Exception('ERROR: Could not determine what software will be used in this submission file.')
+
+        # Fifth, do not look into the subfolders of a folder that contains a submit file.
+        dirnames[:] = []
+
+        # Sixth, if we do not have jobs to submit to slurm, move on.
+        if len(submission_filenames) == 0:
+            continue
+
+        # Seventh, yield the folder and the submit files to submit.
+        yield dirpath, submission_filenames
+
+# =========================================================================================================================================
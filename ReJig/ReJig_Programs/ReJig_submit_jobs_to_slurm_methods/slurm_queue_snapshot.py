@@ -0,0 +1,204 @@
+"""
+slurm_queue_snapshot.py, Geoffrey Weal, 18/10/26
+
+This class is designed to take a snapshot of the slurm queue using one squeue call, which is then shared by all the checks made while submitting jobs.
+
+This prevents squeue from being called many times for each job that is submitted to slurm.
+"""
+import os, time, shlex, getpass
+from subprocess import Popen, PIPE, TimeoutExpired
+
+class SlurmQueueSnapshot:
+    """
+    This class is designed to take a snapshot of the slurm queue using one squeue call, which is then shared by all the checks made while submitting jobs.
+
+    The snapshot is only retaken if it is older than time_to_live seconds, or if it is refreshed manually.
+
+    Parameters
+    ----------
+    time_to_live : float
+        This is the number of seconds that a snapshot of the slurm queue is used for before squeue is called again. Default: 10.0
+    squeue_command : str. or None
+        This is the squeue executable to use. This can be changed to a fake squeue for testing. If None, the REJIG_SQUEUE environment variable is used if it has been set, otherwise "squeue" is used. Default: None
+    squeue_timeout : float
+        This is the number of seconds to wait for squeue to finish before trying again. Default: 120.0
+    """
+    def __init__(self, time_to_live=10.0, squeue_command=None, squeue_timeout=120.0):
+
+        # First, obtain the squeue executable to use.
+        if squeue_command is None:
+            squeue_command = os.environ.get('REJIG_SQUEUE', 'squeue')
+
+        # Second, obtain the command for obtaining the job id and state of all your jobs, with array jobs given as one line per array task.
+        self.squeue_command = shlex.split(squeue_command) + ['-r', '-h', '-u', getpass.getuser(), '-o', '%i %t']
+
+        # Third, record the settings for this snapshot.
+        self.time_to_live = float(time_to_live)
+        self.squeue_timeout = squeue_timeout
+
+        # Fourth, initialise the snapshot of the slurm queue.
+        self.job_states = {}
+        self.time_of_snapshot = None
+
+        # Fifth, record the number of times squeue has been called.
+        self.number_of_squeue_calls = 0
+
+    def refresh(self):
+        """
+        This method will take a new snapshot of the slurm queue, retrying until squeue runs successfully.
+        """
+        while True:
+            output = self.run_squeue()
+            if output is not None:
+                break
+            print('Could not get the jobs in the slurm queue. Retrying to get the jobs in the slurm queue.')
+            time.sleep(5)
+        self.job_states = self.parse_squeue_output(output)
+        self.time_of_snapshot = time.monotonic()
+
+    def run_squeue(self):
+        """
+        This method will run squeue once.
+
+        Returns
+        -------
+        output : str. or None
+            This is the output from squeue. None if squeue did not run successfully.
+        """
+        self.number_of_squeue_calls += 1
+        proc = Popen(self.squeue_command, stdout=PIPE, stderr=PIPE)
+        try:
+            stdout, stderr = proc.communicate(timeout=self.squeue_timeout)
+        except TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            return None
+        if not (proc.returncode == 0):
+            return None
+        return stdout.decode()
+
+    def parse_squeue_output(self, output):
+        """
+        This method will obtain the state of each job from the output of squeue.
+
+        Parameters
+        ----------
+        output : str.
+            This is the output from squeue, where each line is given as "job_id state".
+
+        Returns
+        -------
+        job_states : dict.
+            This dictionary contains the state of each job in the slurm queue, as {job_id: state}. Array tasks are given as "job_id_task_id".
+        """
+        job_states = {}
+        for line in output.splitlines():
+            line = line.split()
+            if len(line) < 2:
+                continue
+            job_states[line[0]] = line[1]
+        return job_states
+
+    def is_stale(self):
+        """
+        This method will determine if the snapshot needs to be retaken.
+
+        Returns
+        -------
+        True if a snapshot has not been taken yet, or if the snapshot is older than time_to_live seconds.
+        """
+        if self.time_of_snapshot is None:
+            return True
+        return (time.monotonic() - self.time_of_snapshot) >= self.time_to_live
+
+    def get_job_states(self, force_refresh=False):
+        """
+        This method will return the state of each job in the slurm queue, retaking the snapshot if needed.
+
+        Parameters
+        ----------
+        force_refresh : bool.
+            If True, a new snapshot of the slurm queue will be taken, even if the current snapshot is younger than time_to_live. Default: False
+
+        Returns
+        -------
+        job_states : dict.
+            This dictionary contains the state of each job in the slurm queue, as {job_id: state}.
+        """
+        if force_refresh or self.is_stale():
+            self.refresh()
+        return self.job_states
+
+    def number_of_jobs_in_queue(self, force_refresh=False):
+        """
+        This method will return the number of jobs (including each array task) in the slurm queue.
+
+        Parameters
+        ----------
+        force_refresh : bool.
+            If True, a new snapshot of the slurm queue will be taken. Default: False
+
+        Returns
+        -------
+        The number of jobs in the slurm queue.
+        """
+        return len(self.get_job_states(force_refresh=force_refresh))
+
+    def get_job_numbers_with_state(self, state, force_refresh=False):
+        """
+        This method will return the job numbers of the jobs with the given state. Array tasks are given by the job number of their array job.
+
+        Parameters
+        ----------
+        state : str.
+            This is the slurm state to look for, such as "PD" (pending) or "R" (running).
+        force_refresh : bool.
+            If True, a new snapshot of the slurm queue will be taken. Default: False
+
+        Returns
+        -------
+        job_numbers : set of int.
+            These are the job numbers of the jobs with this state.
+        """
+        job_numbers = set()
+        for job_id, job_state in self.get_job_states(force_refresh=force_refresh).items():
+            if job_state == state:
+                job_numbers.add(get_job_number(job_id))
+        return job_numbers
+
+    def add_submitted_job(self, job_number, number_of_tasks=1):
+        """
+        This method will add a job that has just been submitted to the snapshot as a pending job, so that squeue does not need to be called again to see it.
+
+        Parameters
+        ----------
+        job_number : int
+            This is the job number of the job that has just been submitted.
+        number_of_tasks : int
+            This is the number of array tasks in this job. Default: 1
+        """
+        if number_of_tasks == 1:
+            self.job_states[str(job_number)] = 'PD'
+        else:
+            for task_id in range(1, number_of_tasks+1):
+                self.job_states[str(job_number)+'_'+str(task_id)] = 'PD'
+
+# ------------------------------------------------------------------------------------------------
+
+def get_job_number(job_id):
+    """
+    This method will return the job number from a slurm job id. For array tasks (given as "job_number_task_id"), this is the job number of the array job.
+
+    Parameters
+    ----------
+    job_id : str.
+        This is the slurm job id.
+
+    Returns
+    -------
+    job_number : int
+        This is the job number of the job.
+    """
+    return int(job_id.split('_')[0])
+
+# ------------------------------------------------------------------------------------------------
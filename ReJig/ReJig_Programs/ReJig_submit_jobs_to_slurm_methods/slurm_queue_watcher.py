@@ -0,0 +1,287 @@
+"""
+slurm_queue_watcher.py, Geoffrey Weal, 18/10/26
+
+This class is designed to keep track of which of the jobs submitted by ReJig submit are pending or running in the slurm queue.
+
+Only the jobs submitted by this program are asked about (using "squeue -j job_id_1,job_id_2,..."), rather than reading every job in your slurm queue.
+Anything waiting for room in the pending or running queue is woken up as soon as a change is seen, rather than waiting for a fixed amount of time.
+"""
+import os, time, shlex, asyncio
+from subprocess import Popen, PIPE, TimeoutExpired
+
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.slurm_queue_snapshot import get_job_number
+
+# This is the largest number of job ids to give to one squeue call.
+max_job_ids_per_squeue_call = 1000
+
+# Jobs that were submitted less than this number of seconds ago, and that squeue has not shown yet, are taken to be pending.
+time_for_submitted_job_to_appear_in_queue = 10.0
+
+class SlurmQueueWatcher:
+    """
+    This class is designed to keep track of which of the jobs submitted by this program are pending or running in the slurm queue.
+
+    The jobs submitted by this program are held in sets, and squeue is only asked about these jobs. squeue is called every poll_interval seconds
+    while there are jobs to watch, or sooner if something starts waiting for room in the queue.
+
+    Parameters
+    ----------
+    poll_interval : float
+        This is the longest time to wait between squeue calls while there are jobs to watch. Default: 15.0
+    min_time_between_polls : float
+        This is the shortest time to wait between squeue calls. Default: 2.0
+    squeue_command : str. or None
+        This is the squeue executable to use. If None, the REJIG_SQUEUE environment variable is used if it has been set, otherwise "squeue" is used. Default: None
+    squeue_timeout : float
+        This is the number of seconds to wait for squeue to finish. Default: 120.0
+    """
+    def __init__(self, poll_interval=15.0, min_time_between_polls=2.0, squeue_command=None, squeue_timeout=120.0):
+
+        # First, obtain the squeue executable to use.
+        if squeue_command is None:
+            squeue_command = os.environ.get('REJIG_SQUEUE', 'squeue')
+        self.squeue_command = shlex.split(squeue_command) + ['-h', '-o', '%i %t', '-j']
+
+        # Second, record the settings for this watcher.
+        self.poll_interval = float(poll_interval)
+        self.min_time_between_polls = float(min_time_between_polls)
+        self.squeue_timeout = squeue_timeout
+
+        # Third, initialise the jobs submitted by this program that are pending or running, and when each job that squeue has not shown yet was submitted.
+        self.pending_job_numbers = set()
+        self.running_job_numbers = set()
+        self.time_submitted = {}
+
+        # Fourth, initialise when squeue was last called, and the number of times squeue has been called.
+        self.time_of_last_poll = None
+        self.number_of_squeue_calls = 0
+
+        # Fifth, the asyncio objects used by this watcher are made when the watcher is started.
+        self.watching_task = None
+
+    # ----------------------------------------------------------------------------------------
+
+    async def start(self):
+        """
+        This method will start watching the slurm queue in the background.
+        """
+        self.queue_changed = asyncio.Condition()
+        self.poll_requested = asyncio.Event()
+        self.watching_task = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        """
+        This method will stop watching the slurm queue.
+        """
+        if self.watching_task is None:
+            return
+        self.watching_task.cancel()
+        try:
+            await self.watching_task
+        except asyncio.CancelledError:
+            pass
+        self.watching_task = None
+
+    async def watch(self):
+        """
+        This method will check the state of the jobs submitted by this program every poll_interval seconds (or sooner if asked), and wake up
+        anything waiting for room in the queue if the state of any of these jobs has changed.
+        """
+        while True:
+
+            # First, wait for poll_interval seconds, or until a poll is asked for.
+            try:
+                await asyncio.wait_for(self.poll_requested.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.poll_requested.clear()
+
+            # Second, do not call squeue more often than min_time_between_polls.
+            if self.time_of_last_poll is not None:
+                time_since_last_poll = time.monotonic() - self.time_of_last_poll
+                if time_since_last_poll < self.min_time_between_polls:
+                    await asyncio.sleep(self.min_time_between_polls - time_since_last_poll)
+
+            # Third, check the state of the jobs submitted by this program.
+            if (len(self.pending_job_numbers) + len(self.running_job_numbers)) == 0:
+                continue
+            # Jobs submitted while squeue is running are not in queried_job_numbers, so they are left as they are until the next poll.
+            queried_job_numbers = self.pending_job_numbers | self.running_job_numbers
+            job_states = await asyncio.get_running_loop().run_in_executor(None, self.get_job_states, queried_job_numbers)
+            if job_states is None:
+                continue
+
+            # Fourth, if any of these jobs have started running or finished, wake up anything waiting for room in the queue.
+            if self.update_job_states(job_states, queried_job_numbers):
+                await self.notify()
+
+    async def notify(self):
+        """
+        This method will wake up anything waiting for room in the queue, such as when a job has finished, or a job failed to be submitted.
+        """
+        async with self.queue_changed:
+            self.queue_changed.notify_all()
+
+    async def wait_for_change(self, timeout=None):
+        """
+        This method will wait until the state of the jobs submitted by this program has changed, or until timeout seconds have passed.
+
+        Parameters
+        ----------
+        timeout : float or None
+            This is the longest time to wait. If None, this will wait until something changes. Default: None
+        """
+        self.poll_requested.set()
+        async with self.queue_changed:
+            try:
+                await asyncio.wait_for(self.queue_changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # ----------------------------------------------------------------------------------------
+
+    def add_submitted_job(self, job_number):
+        """
+        This method will add a job that has just been submitted by this program as a pending job.
+
+        Parameters
+        ----------
+        job_number : int
+            This is the job number of the job that has just been submitted.
+        """
+        self.pending_job_numbers.add(job_number)
+        self.time_submitted[job_number] = time.monotonic()
+
+    def add_jobs_in_queue(self, job_states):
+        """
+        This method will add jobs that are already in the slurm queue, such as jobs submitted by a previous run of this program that are still pending or running.
+
+        Unlike add_submitted_job, these jobs are added as pending or running depending on their state in the slurm queue.
+
+        Parameters
+        ----------
+        job_states : dict.
+            This dictionary contains the state of each of these jobs in the slurm queue, as {job_id: state}. Array tasks can be given as "job_number_task_id".
+        """
+        for job_id, job_state in job_states.items():
+            job_number = get_job_number(job_id)
+            # An array job can have tasks that are pending and tasks that are running. Count the array job as running if any of its tasks are not pending.
+            if (job_state == 'PD') and (job_number not in self.running_job_numbers):
+                self.pending_job_numbers.add(job_number)
+            else:
+                self.pending_job_numbers.discard(job_number)
+                self.running_job_numbers.add(job_number)
+
+    def get_job_states(self, job_numbers):
+        """
+        This method will obtain the state of the given jobs using squeue.
+
+        Parameters
+        ----------
+        job_numbers : set of int.
+            These are the jobs to obtain the state of.
+
+        Returns
+        -------
+        job_states : dict. or None
+            This dictionary contains the state of each of these jobs that are still in the slurm queue, as {job_number: state}. None if squeue did not work.
+        """
+        self.time_of_last_poll = time.monotonic()
+        job_numbers = sorted(job_numbers)
+        job_states = {}
+        for index in range(0, len(job_numbers), max_job_ids_per_squeue_call):
+            output = self.run_squeue(job_numbers[index:index+max_job_ids_per_squeue_call])
+            if output is None:
+                return None
+            for line in output.splitlines():
+                line = line.split()
+                if len(line) < 2:
+                    continue
+                job_number = get_job_number(line[0])
+                # An array job can have tasks that are pending and tasks that are running. Count the array job as running if any of its tasks are not pending.
+                if job_states.get(job_number, 'PD') == 'PD':
+                    job_states[job_number] = line[1]
+        return job_states
+
+    def run_squeue(self, job_numbers):
+        """
+        This method will run squeue once for the given jobs.
+
+        Parameters
+        ----------
+        job_numbers : list of int.
+            These are the jobs to obtain the state of.
+
+        Returns
+        -------
+        output : str. or None
+            This is the output from squeue. None if squeue did not run successfully.
+        """
+        self.number_of_squeue_calls += 1
+        proc = Popen(self.squeue_command + [','.join(str(job_number) for job_number in job_numbers)], stdout=PIPE, stderr=PIPE)
+        try:
+            stdout, stderr = proc.communicate(timeout=self.squeue_timeout)
+        except TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            return None
+        if not (proc.returncode == 0):
+            # squeue gives an error if none of the jobs are known to slurm any more, which means all of these jobs have finished.
+            if 'Invalid job id' in stderr.decode():
+                return ''
+            return None
+        return stdout.decode()
+
+    def update_job_states(self, job_states, queried_job_numbers):
+        """
+        This method will update which of the jobs submitted by this program are pending or running.
+
+        Only the jobs in queried_job_numbers are updated. Any other jobs (such as jobs submitted while squeue was running) are left as they are.
+
+        Parameters
+        ----------
+        job_states : dict.
+            This dictionary contains the state of each of the queried jobs that are still in the slurm queue, as {job_number: state}.
+        queried_job_numbers : set of int.
+            These are the jobs that squeue was asked about.
+
+        Returns
+        -------
+        has_changed : bool.
+            True if any jobs have stopped pending or stopped running.
+        """
+        current_time = time.monotonic()
+        old_number_of_pending_jobs, old_number_of_running_jobs = len(self.pending_job_numbers), len(self.running_job_numbers)
+
+        # First, jobs that were not asked about stay as they are.
+        pending_job_numbers = self.pending_job_numbers - queried_job_numbers
+        running_job_numbers = self.running_job_numbers - queried_job_numbers
+
+        # Second, jobs that are still pending stay pending. Jobs that have only just been submitted and have not been shown by squeue yet also stay pending.
+        #         Jobs in the slurm queue that are not pending (such as running, configuring, or completing jobs) are taken to be running.
+        for job_number in self.pending_job_numbers & queried_job_numbers:
+            job_state = job_states.get(job_number, None)
+            if job_state is not None:
+                self.time_submitted.pop(job_number, None)
+            if job_state == 'PD':
+                pending_job_numbers.add(job_number)
+            elif job_state is not None:
+                running_job_numbers.add(job_number)
+            elif (job_number in self.time_submitted) and ((current_time - self.time_submitted[job_number]) < time_for_submitted_job_to_appear_in_queue):
+                pending_job_numbers.add(job_number)
+
+        # Third, jobs that are still in the slurm queue stay running.
+        for job_number in self.running_job_numbers & queried_job_numbers:
+            if job_number in job_states:
+                running_job_numbers.add(job_number)
+
+        # Fourth, forget about jobs that have finished.
+        for job_number in (self.pending_job_numbers | self.running_job_numbers) - (pending_job_numbers | running_job_numbers):
+            self.time_submitted.pop(job_number, None)
+        self.pending_job_numbers = pending_job_numbers
+        self.running_job_numbers = running_job_numbers
+
+        # Fifth, return if any jobs have stopped pending or stopped running.
+        return (len(self.pending_job_numbers) < old_number_of_pending_jobs) or (len(self.running_job_numbers) < old_number_of_running_jobs)
+
+# ------------------------------------------------------------------------------------------------
@@ -0,0 +1,162 @@
+"""
+submission_journal.py, Geoffrey Weal, 18/10/26
+
+This class is designed to record every job that is submitted to slurm in an append-only journal file, so that if ReJig submit stops partway through, it can be rerun without submitting jobs that are still in the slurm queue again.
+
+Each line in the journal file is a json dictionary giving the folder of the job, its submit script, its slurm job id, and when it was submitted.
+"""
+import os, json
+from datetime import datetime
+
+# This is the name of the journal file, placed in the folder that ReJig submit is run from.
+submission_journal_filename = 'ReJig_submission_journal.jsonl'
+
+class SubmissionJournal:
+    """
+    This class is designed to record every job that is submitted to slurm in an append-only journal file.
+
+    Folders are recorded relative to path, so the journal still works if the folder containing your jobs is moved.
+
+    Parameters
+    ----------
+    path : str.
+        This is the folder that the jobs are in. The journal file is placed in this folder.
+    resume : bool.
+        If True, the jobs already in the journal file are read, so that they are not submitted again if they are still in the slurm queue. 
+        If False, the jobs already in the journal file are not used (they are still kept in the journal file). Default: True
+    """
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.filepath = os.path.join(path, submission_journal_filename)
+        self.submitted_job_ids = self.read_journal() if resume else {}
+        self.number_of_skipped_jobs = 0
+        self.journalJSONL = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_journal(self):
+        """
+        This method will read the jobs that have been submitted from the journal file.
+
+        Returns
+        -------
+        submitted_job_ids : dict.
+            This dictionary contains the slurm job id that each job was last submitted as, as {(dirpath, submission_filename): job_id}.
+        """
+        submitted_job_ids = {}
+        if not os.path.exists(self.filepath):
+            return submitted_job_ids
+        with open(self.filepath, 'r') as journalJSONL:
+            for line in journalJSONL:
+                # A line may be incomplete if ReJig submit was stopped while writing it, so skip any lines that can not be read.
+                try:
+                    entry = json.loads(line)
+                    submitted_job_ids[(entry['dirpath'], entry['submission_filename'])] = str(entry['job_id'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return submitted_job_ids
+
+    def record_submission(self, dirpath, submission_filename, job_id):
+        """
+        This method will add a submitted job to the journal file.
+
+        The journal file is flushed to disk straight away, so the job is recorded even if ReJig submit is stopped straight after.
+
+        Parameters
+        ----------
+        dirpath : str.
+            This is the folder containing the submit script.
+        submission_filename : str.
+            This is the name of the submit script.
+        job_id : int or str.
+            This is the slurm job id of the job. Array tasks are given as "job_number_task_id".
+        """
+        dirpath = os.path.relpath(dirpath, self.path)
+        if self.journalJSONL is None:
+            self.journalJSONL = open(self.filepath, 'a')
+        entry = {'dirpath': dirpath, 'submission_filename': submission_filename, 'job_id': str(job_id), 'time': datetime.now().isoformat(timespec='seconds')}
+        self.journalJSONL.write(json.dumps(entry)+'\n')
+        self.journalJSONL.flush()
+        os.fsync(self.journalJSONL.fileno())
+        self.submitted_job_ids[(dirpath, submission_filename)] = str(job_id)
+
+    def get_job_id(self, dirpath, submission_filename):
+        """
+        This method will give the slurm job id that a job was last submitted as.
+
+        Parameters
+        ----------
+        dirpath : str.
+            This is the folder containing the submit script.
+        submission_filename : str.
+            This is the name of the submit script.
+
+        Returns
+        -------
+        job_id : str. or None
+            This is the slurm job id of the job. None if this job is not in the journal.
+        """
+        return self.submitted_job_ids.get((os.path.relpath(dirpath, self.path), submission_filename), None)
+
+    def get_jobs_in_queue(self, job_states):
+        """
+        This method will give the jobs in the journal that are still in the slurm queue.
+
+        Parameters
+        ----------
+        job_states : dict.
+            This dictionary contains the state of each job in the slurm queue, as {job_id: state}. This should be taken once, before any jobs are submitted.
+
+        Returns
+        -------
+        journal_job_states : dict.
+            This dictionary contains the state of each job in the journal that is still in the slurm queue, as {job_id: state}.
+        """
+        return {job_id: job_states[job_id] for job_id in set(self.submitted_job_ids.values()) if (job_id in job_states)}
+
+    def skip_jobs_in_queue(self, folders_to_submit, job_states):
+        """
+        This method will remove any jobs in the journal that are still in the slurm queue from the jobs to submit.
+
+        Jobs in the journal that are no longer in the slurm queue have finished (or were cancelled) without writing an output file, so these are submitted again.
+
+        Parameters
+        ----------
+        folders_to_submit : iterable of (str., list of str.)
+            These are the (dirpath, submission_filenames) of each folder containing jobs to submit, such as given by get_folders_to_submit.
+        job_states : dict.
+            This dictionary contains the state of each job in the slurm queue, as {job_id: state}. This should be taken once, before any jobs are submitted.
+
+        Yields
+        ------
+        dirpath : str.
+            This is the path to a folder containing jobs to submit to slurm.
+        submission_filenames : list of str.
+            These are the names of the submit scripts in dirpath to submit to slurm.
+        """
+        job_ids_in_queue = set(job_states.keys())
+        for dirpath, submission_filenames in folders_to_submit:
+            submission_filenames_to_submit = []
+            for submission_filename in submission_filenames:
+                job_id = self.get_job_id(dirpath, submission_filename)
+                if (job_id is not None) and (job_id in job_ids_in_queue):
+                    self.number_of_skipped_jobs += 1
+                else:
+                    submission_filenames_to_submit.append(submission_filename)
+            if len(submission_filenames_to_submit) > 0:
+                yield dirpath, submission_filenames_to_submit
+
+    def close(self):
+        """
+        This method will close the journal file.
+        """
+        if self.journalJSONL is None:
+            return
+        self.journalJSONL.close()
+        self.journalJSONL = None
+
+# ------------------------------------------------------------------------------------------------
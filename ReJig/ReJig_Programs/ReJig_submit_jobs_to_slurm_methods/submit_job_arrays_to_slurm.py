@@ -0,0 +1,276 @@
+"""
+submit_job_arrays_to_slurm.py, Geoffrey Weal, 18/10/26
+
+This method is designed to submit all the jobs that need to be submitted to slurm as a few slurm job arrays, rather than submitting each job one at a time.
+
+The folders of the jobs in each job array are written to a manifest file. Each array task reads its folder from the manifest file, and runs the submit script in that folder.
+"""
+import os
+from subprocess import Popen, PIPE, TimeoutExpired
+
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.get_folders_to_submit                         import get_folders_to_submit
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.check_max_jobs_in_queue_after_next_submission import check_max_jobs_in_queue_after_next_submission
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.countdown                                     import countdown
+from ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_methods.async_submission_engine                       import get_sbatch_command, get_job_number_from_sbatch_output
+
+# These are the sbatch options in each submit script that are set by the job array rather than the submit script.
+sbatch_options_set_by_job_array = ['--job-name', '--output', '--error', '--array']
+
+def submit_job_arrays_to_slurm(path, Max_jobs_in_queue_at_any_one_time, array_throttle, max_array_size, time_to_wait_before_next_submission, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting, slurm_queue_snapshot, submission_journal=None):
+    """
+    This method is designed to submit all the jobs that need to be submitted to slurm as a few slurm job arrays.
+
+    Jobs are grouped into the same job array if their submit scripts ask slurm for the same resources.
+
+    Parameters
+    ----------
+    path : str.
+        This is the folder to look through for jobs to submit to slurm.
+    Max_jobs_in_queue_at_any_one_time : int
+        This is the maximum limit of jobs that can be in the user queue. Each array task counts as one job.
+    array_throttle : int
+        This is the maximum number of array tasks in each job array that slurm will run at any one time (given to slurm as --array=1-N%array_throttle).
+    max_array_size : int
+        This is the maximum number of tasks to include in one job array.
+    time_to_wait_before_next_submission : float
+        This is the time to wait before checking the slurm queue again if there is no room in the queue for the next job array.
+    time_to_wait_before_next_submission_due_to_temp_submission_issue : float
+        This is the time to wait before resubmitting a job array if sbatch did not work.
+    number_of_consecutive_error_before_exitting : int
+        This is the number of times sbatch can fail for a job array before giving up on it.
+    slurm_queue_snapshot : SlurmQueueSnapshot
+        This is the snapshot of the slurm queue.
+    submission_journal : SubmissionJournal or None
+        If given, jobs in this journal that are still in the slurm queue are not submitted again, and each array task is recorded in this journal once its job array has been submitted. Default: None
+
+    Returns
+    -------
+    errors_list : list of str.
+        These are the folders of any jobs that were not submitted to slurm.
+    """
+
+    # First, obtain all the jobs that need to be submitted to slurm.
+    folders_to_submit = get_folders_to_submit(path)
+    if submission_journal is not None:
+        folders_to_submit = submission_journal.skip_jobs_in_queue(folders_to_submit, slurm_queue_snapshot.get_job_states(force_refresh=True))
+    jobs_to_submit = [(dirpath, submission_filename) for dirpath, submission_filenames in folders_to_submit for submission_filename in submission_filenames]
+    print('Number of jobs to submit to slurm: '+str(len(jobs_to_submit)))
+    if len(jobs_to_submit) == 0:
+        return []
+
+    # Second, group the jobs by the resources they ask slurm for.
+    job_groups = {}
+    for dirpath, submission_filename in jobs_to_submit:
+        sbatch_lines = get_sbatch_lines(dirpath+'/'+submission_filename)
+        job_groups.setdefault(sbatch_lines, []).append((dirpath, submission_filename))
+
+    # Third, split each group into job arrays that are no bigger than max_array_size.
+    job_arrays = []
+    for sbatch_lines, jobs in job_groups.items():
+        for index in range(0, len(jobs), max_array_size):
+            job_arrays.append((sbatch_lines, jobs[index:index+max_array_size]))
+
+    # Fourth, make the folder to place the manifest and job array scripts in.
+    job_arrays_dirpath = path.rstrip('/')+'_job_arrays'
+    job_arrays_logs_dirpath = job_arrays_dirpath+'/logs'
+    os.makedirs(job_arrays_logs_dirpath, exist_ok=True)
+    array_counter_start = get_next_array_number(job_arrays_dirpath)
+
+    # Fifth, write and submit each job array.
+    errors_list = []
+    for array_number, (sbatch_lines, jobs) in enumerate(job_arrays, start=array_counter_start):
+
+        # 5.1: Write the manifest and the job array script.
+        manifest_filepath = job_arrays_dirpath+'/array_'+str(array_number)+'_manifest.txt'
+        array_script_filepath = job_arrays_dirpath+'/array_'+str(array_number)+'.sl'
+        write_manifest(manifest_filepath, jobs)
+        write_array_script(array_script_filepath, manifest_filepath, job_arrays_logs_dirpath, sbatch_lines, len(jobs), array_throttle, 'ReJig-array-'+str(array_number))
+
+        # 5.2: Wait until there is room in the slurm queue for all the tasks in this job array.
+        print('*****************************************************************************')
+        force_refresh = False
+        while True:
+            reached_max_jobs, number_in_queue = check_max_jobs_in_queue_after_next_submission(path, Max_jobs_in_queue_at_any_one_time, slurm_queue_snapshot, force_refresh=force_refresh, number_of_jobs_to_submit=len(jobs))
+            if not reached_max_jobs:
+                print('The number of jobs in the queue currently is: '+str(number_in_queue))
+                break
+            if len(jobs) > Max_jobs_in_queue_at_any_one_time:
+                raise Exception('Error: The job array has more tasks ('+str(len(jobs))+') than the maximum number of jobs allowed in the queue ('+str(Max_jobs_in_queue_at_any_one_time)+'). Set max_array_size in the submit settings to a value less than Max_jobs_in_queue_at_any_one_time.')
+            print('-----------------------------------------------------------------------------')
+            print('There is not enough room in the queue to submit the next job array ('+str(len(jobs))+' tasks). Will wait a bit of time for some jobs to complete')
+            print('Number of Jobs in the queue = '+str(number_in_queue))
+            countdown(time_to_wait_before_next_submission)
+            print('-----------------------------------------------------------------------------')
+            force_refresh = True
+
+        # 5.3: Submit the job array to slurm.
+        print('Submitting job array '+str(array_number)+' ('+str(len(jobs))+' tasks, at most '+str(array_throttle)+' running at once) to slurm.')
+        job_number = sbatch_job_array(array_script_filepath, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting)
+
+        # 5.4: Record the submitted job array, or the jobs that were not submitted.
+        if job_number is None:
+            errors_list += [dirpath for dirpath, _ in jobs]
+        else:
+            print('Submitted job array '+str(array_number)+' to slurm: '+str(job_number))
+            slurm_queue_snapshot.add_submitted_job(job_number, number_of_tasks=len(jobs))
+            if submission_journal is not None:
+                for task_id, (dirpath, submission_filename) in enumerate(jobs, start=1):
+                    submission_journal.record_submission(dirpath, submission_filename, str(job_number)+'_'+str(task_id))
+
+    # Sixth, return the folders of any jobs that were not submitted.
+    return errors_list
+
+# ------------------------------------------------------------------------------------------------
+
+def get_sbatch_lines(submission_filepath):
+    """
+    This method will obtain the "#SBATCH" lines from a submit script that give the resources to ask slurm for.
+
+    Parameters
+    ----------
+    submission_filepath : str.
+        This is the path to the submit script.
+
+    Returns
+    -------
+    sbatch_lines : tuple of str.
+        These are the "#SBATCH" lines from the submit script, excluding those set by the job array.
+    """
+    sbatch_lines = []
+    with open(submission_filepath, 'r') as submissionSL:
+        for line in submissionSL:
+            if not line.startswith('#SBATCH'):
+                continue
+            sbatch_option = line.replace('#SBATCH', '', 1).strip().split('=')[0].split()[0]
+            if sbatch_option in sbatch_options_set_by_job_array:
+                continue
+            sbatch_lines.append(line.rstrip())
+    return tuple(sbatch_lines)
+
+def get_next_array_number(job_arrays_dirpath):
+    """
+    This method will obtain the number to give the next job array, so that previous job arrays are not overwritten.
+
+    Parameters
+    ----------
+    job_arrays_dirpath : str.
+        This is the folder containing the manifest and job array scripts.
+
+    Returns
+    -------
+    The number to give the next job array.
+    """
+    array_numbers = [0]
+    for filename in os.listdir(job_arrays_dirpath):
+        if filename.startswith('array_') and filename.endswith('.sl'):
+            array_number = filename.replace('array_', '').replace('.sl', '')
+            if array_number.isdigit():
+                array_numbers.append(int(array_number))
+    return max(array_numbers) + 1
+
+def write_manifest(manifest_filepath, jobs):
+    """
+    This method will write the manifest file for a job array. Line N of the manifest gives the folder and submit script for array task N.
+
+    Parameters
+    ----------
+    manifest_filepath : str.
+        This is the path to the manifest file.
+    jobs : list of (str., str.)
+        These are the (dirpath, submission_filename) for each job in the job array.
+    """
+    with open(manifest_filepath, 'w') as manifestTXT:
+        for dirpath, submission_filename in jobs:
+            manifestTXT.write(os.path.abspath(dirpath)+'\t'+str(submission_filename)+'\n')
+
+def write_array_script(array_script_filepath, manifest_filepath, job_arrays_logs_dirpath, sbatch_lines, number_of_tasks, array_throttle, name):
+    """
+    This method will write the slurm script for a job array.
+
+    Parameters
+    ----------
+    array_script_filepath : str.
+        This is the path to write the job array script to.
+    manifest_filepath : str.
+        This is the path to the manifest file for this job array.
+    job_arrays_logs_dirpath : str.
+        This is the folder to write the slurm output files of the job array to.
+    sbatch_lines : tuple of str.
+        These are the "#SBATCH" lines giving the resources for each array task.
+    number_of_tasks : int
+        This is the number of tasks in the job array.
+    array_throttle : int
+        This is the maximum number of array tasks that slurm will run at any one time.
+    name : str.
+        This is the name of the job array.
+    """
+    manifest_filepath = os.path.abspath(manifest_filepath)
+    job_arrays_logs_dirpath = os.path.abspath(job_arrays_logs_dirpath)
+    with open(array_script_filepath, 'w') as arraySL:
+        arraySL.write('#!/bin/bash -e\n')
+        arraySL.write('#SBATCH --job-name=' + str(name) + '\n')
+        for sbatch_line in sbatch_lines:
+            arraySL.write(sbatch_line+'\n')
+        arraySL.write('#SBATCH --array=1-' + str(number_of_tasks) + '%' + str(array_throttle) + '\n')
+        arraySL.write('#SBATCH --output=' + job_arrays_logs_dirpath + '/slurm-%A_%a.out\n')
+        arraySL.write('#SBATCH --error=' + job_arrays_logs_dirpath + '/slurm-%A_%a.err\n')
+        arraySL.write('\n')
+        arraySL.write('# ----------------------------\n')
+        arraySL.write('# Get the folder and submit script for this array task from the manifest.\n')
+        arraySL.write('\n')
+        arraySL.write('IFS=$\'\\t\' read -r job_dirpath submission_filename < <(sed -n "${SLURM_ARRAY_TASK_ID}p" "' + manifest_filepath + '")\n')
+        arraySL.write('cd "${job_dirpath}"\n')
+        arraySL.write('\n')
+        arraySL.write('# ----------------------------\n')
+        arraySL.write('# Run the submit script for this job.\n')
+        arraySL.write('\n')
+        arraySL.write('echo "Running ${submission_filename} in ${job_dirpath}"\n')
+        arraySL.write('bash -e "${submission_filename}" > "slurm-${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}.out" 2> "slurm-${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}.err"\n')
+        arraySL.write('\n')
+
+def sbatch_job_array(array_script_filepath, time_to_wait_before_next_submission_due_to_temp_submission_issue, number_of_consecutive_error_before_exitting):
+    """
+    This method will submit the job array to slurm, retrying if sbatch does not work.
+
+    Parameters
+    ----------
+    array_script_filepath : str.
+        This is the path to the job array script.
+    time_to_wait_before_next_submission_due_to_temp_submission_issue : float
+        This is the time to wait before resubmitting the job array if sbatch did not work.
+    number_of_consecutive_error_before_exitting : int
+        This is the number of times sbatch can fail before giving up.
+
+    Returns
+    -------
+    job_number : int or None
+        This is the job number of the job array. None if the job array could not be submitted.
+    """
+    for error_counter in range(1, number_of_consecutive_error_before_exitting+1):
+        proc = Popen(get_sbatch_command()+[os.path.abspath(array_script_filepath)], stdout=PIPE, stderr=PIPE)
+        try:
+            stdout, stderr = proc.communicate(timeout=(2*60)) # 120 seconds
+            if proc.returncode == 0:
+                try:
+                    return get_job_number_from_sbatch_output(stdout.decode("utf-8"))
+                except ValueError:
+                    # The job array was submitted, so stop here rather than submitting it again.
+                    raise Exception('Error: The job array '+str(array_script_filepath)+' was submitted, but the job number could not be obtained from the output of sbatch: '+stdout.decode("utf-8").strip())
+            error_message = stderr.decode("utf-8")
+        except TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            error_message = 'Job timed-out after 2 minutes.'
+        print('----------------------------------------------')
+        print('Error in submitting job array to slurm. This error was:')
+        print(error_message)
+        print('Number of consecutive errors: '+str(error_counter))
+        if error_counter < number_of_consecutive_error_before_exitting:
+            print('Will retry submitting this job array to slurm after '+str(time_to_wait_before_next_submission_due_to_temp_submission_issue)+' seconds of wait time')
+            print('----------------------------------------------')
+            countdown(time_to_wait_before_next_submission_due_to_temp_submission_issue)
+    print('I got '+str(number_of_consecutive_error_before_exitting)+" consecutive errors. Something must not be working right somewhere. I'm going to stop here just in case something is not working.")
+    print('----------------------------------------------')
+    return None
+
+# ------------------------------------------------------------------------------------------------
@@ -19,6 +19,9 @@ time_to_wait_before_next_submission_due_to_temp_submission_issue_DEFAULT = 10.0
 number_of_consecutive_error_before_exitting_DEFAULT = 20
 
 time_to_wait_before_next_submission_due_to_not_waiting_between_submissions_DEFAULT = 60.0
+
+# These are optional settings. If these are not given in the settings file, the default values below are used.
+optional_settings_DEFAULT = {'squeue_snapshot_time_to_live': 10.0, 'max_array_size': 1000, 'max_concurrent_submissions': 4, 'sbatch_timeout': 120.0, 'max_submission_backoff': 300.0, 'max_submission_attempts_per_job': 3, 'initial_submission_rate': 1.0, 'min_submission_rate': 0.02, 'max_submission_rate': 5.0, 'target_sbatch_latency': 5.0, 'queue_poll_interval': 15.0}
 # =========================================================================================================================================
 
 def check_submit_settingsTXT(path_to_settings_txt_file):
@@ -115,6 +118,31 @@ def write_submit_settingsTXT_file(path_to_settings_txt_file, Max_jobs_in_queue_a
         submit_settingsTXT.write('time_to_wait_before_next_submission_due_to_temp_submission_issue = '+str(time_to_wait_before_next_submission_due_to_temp_submission_issue)+'\n')
         submit_settingsTXT.write('number_of_consecutive_error_before_exitting = '+str(number_of_consecutive_error_before_exitting)+'\n')
         submit_settingsTXT.write('time_to_wait_before_next_submission_due_to_not_waiting_between_submissions = '+str(time_to_wait_before_next_submission_due_to_not_waiting_between_submissions)+'\n')
+        for setting_name, default_value in optional_settings_DEFAULT.items():
+            submit_settingsTXT.write(setting_name+' = '+str(default_value)+'\n')
+
+def read_optional_submit_settingsTXT_file(path_to_settings_txt_file):
+    """
+    This method will read the optional settings from the settings file. Any optional settings not given in the settings file are set to their default values.
+
+    Returns
+    -------
+    optional_settings : dict.
+        This dictionary contains the value for each of the optional settings.
+    """
+
+    # First, initialise the optional settings with their default values.
+    optional_settings = dict(optional_settings_DEFAULT)
+
+    # Second, read in any optional settings given in the settings file.
+    with open(path_to_settings_txt_file,'r') as submit_settingsTXT:
+        for line in submit_settingsTXT:
+            for setting_name, default_value in optional_settings_DEFAULT.items():
+                if line.startswith(setting_name+' = '):
+                    optional_settings[setting_name] = type(default_value)(line.rstrip().replace(setting_name+' = ',''))
+
+    # Third, return the optional settings.
+    return optional_settings
 
 # =========================================================================================================================================
 
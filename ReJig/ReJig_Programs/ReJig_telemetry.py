@@ -0,0 +1,155 @@
+'''
+ReJig_telemetry.py, Geoffrey Weal, 18/10/26
+
+This program will record how each geometric optimisation is converging, and will give the jobs that are converging most slowly.
+'''
+import os, sys, csv, json
+
+from ReJig.ReJig_Programs.ReJig_telemetry_methods.convergence_telemetry import telemetry_filename, collect_convergence_telemetry, read_convergence_telemetry
+from ReJig.ReJig_Programs.ReJig_telemetry_methods.convergence_summary   import summary_fields, rank_slow_converging_jobs
+
+class CLICommand:
+    """Will record how each geometric optimisation is converging, and give the jobs that are converging most slowly.
+    """
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument('--update',            nargs=1, help='This indicates if you want to read the log files of your jobs to update the '+telemetry_filename+' file. If False, the '+telemetry_filename+' file is used as it is.', default=['True'])
+        parser.add_argument('--workers',           nargs=1, help='This is the number of threads to use to read log files at the same time. Using 16 to 32 threads can make this much faster on network filesystems.', default=['1'])
+        parser.add_argument('--top',               nargs=1, help='This is the number of jobs to give. Give 0 to give every job.', default=['20'])
+        parser.add_argument('--include_converged', nargs=1, help='This indicates if you want to include jobs that Gaussian has indicated have converged.', default=['False'])
+        parser.add_argument('--format',            nargs=1, help='This is the format to give the results in. This can be "text", "json" or "csv".', default=['text'])
+
+    @staticmethod
+    def run(args):
+
+        # First, obtain the tag that indicates if you want to update the telemetry file.
+        update = str(args.update[0]).lower()
+        if   update in ['t', 'true']:
+            update = True
+        elif update in ['f', 'false']:
+            update = False
+        else:
+            raise Exception('Error: The value for "--update" must be either "True" or "False".')
+
+        # Second, obtain the number of threads to use.
+        try:
+            workers = int(args.workers[0])
+        except ValueError:
+            raise Exception(f'Error: The value for "--workers" must be an integer. --workers = {args.workers[0]}')
+
+        # Third, obtain the number of jobs to give.
+        try:
+            top = int(args.top[0])
+        except ValueError:
+            raise Exception(f'Error: The value for "--top" must be an integer. --top = {args.top[0]}')
+
+        # Fourth, obtain the tag that indicates if you want to include jobs that have converged.
+        include_converged = str(args.include_converged[0]).lower()
+        if   include_converged in ['t', 'true']:
+            include_converged = True
+        elif include_converged in ['f', 'false']:
+            include_converged = False
+        else:
+            raise Exception('Error: The value for "--include_converged" must be either "True" or "False".')
+
+        # Fifth, obtain the format to give the results in.
+        output_format = str(args.format[0]).lower()
+        if output_format not in ['text', 'json', 'csv']:
+            raise Exception('Error: The value for "--format" must be either "text", "json" or "csv". --format = '+str(args.format[0]))
+
+        # Sixth, run this program.
+        Run_method(update=update, workers=workers, top=top, include_converged=include_converged, output_format=output_format)
+
+def Run_method(update=True, workers=1, top=20, include_converged=False, output_format='text'):
+    """
+    This method will record how each geometric optimisation is converging, and will give the jobs that are converging most slowly.
+
+    Parameters
+    ----------
+    update : bool.
+        This indicates if you want to read the log files of your jobs to update the telemetry file. Default: True
+    workers : int.
+        This is the number of threads to use to read log files at the same time. Default: 1
+    top : int
+        This is the number of jobs to give. If 0, every job is given. Default: 20
+    include_converged : bool.
+        This indicates if you want to include jobs that Gaussian has indicated have converged. Default: False
+    output_format : str.
+        This is the format to give the results in. If "json" or "csv", only the results are printed. Default: 'text'
+    """
+
+    # First, obtain the telemetry of every job.
+    general_path = os.getcwd()
+    telemetry_filepath = general_path+'/'+telemetry_filename
+    if update:
+        job_telemetries = collect_convergence_telemetry(general_path, telemetry_filepath=telemetry_filepath, workers=workers, print_progress=(output_format == 'text'))
+    elif os.path.exists(telemetry_filepath):
+        job_telemetries = read_convergence_telemetry(telemetry_filepath)
+    else:
+        raise Exception('Error: '+str(telemetry_filepath)+' does not exist. Run "ReJig telemetry" with "--update True" to make it.')
+
+    # Second, rank the jobs by how slowly they are converging.
+    job_summaries = rank_slow_converging_jobs(job_telemetries, include_converged=include_converged)
+    if top > 0:
+        job_summaries = job_summaries[:top]
+
+    # Third, give the results.
+    if output_format == 'json':
+        json.dump(job_summaries, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+    elif output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=summary_fields, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(job_summaries)
+    else:
+        print_job_summaries(job_summaries, len(job_telemetries), telemetry_filepath)
+
+def print_job_summaries(job_summaries, number_of_jobs, telemetry_filepath):
+    """
+    This method will print the jobs that are converging most slowly as a table.
+
+    Parameters
+    ----------
+    job_summaries : list of dict.
+        This is the summary of each job to print, with the jobs that are converging most slowly first.
+    number_of_jobs : int
+        This is the number of jobs in the telemetry file.
+    telemetry_filepath : str.
+        This is the path to the telemetry file.
+    """
+    print('########################################################################')
+    print('The convergence of '+str(number_of_jobs)+' jobs has been saved to '+str(telemetry_filepath))
+    print('########################################################################')
+    if len(job_summaries) == 0:
+        print('There are no jobs that are still converging.')
+        return
+    print('Jobs that are converging most slowly:')
+    print()
+    print('Steps'.rjust(6)+'  '+'Max force (thresh)'.rjust(22)+'  '+'Steps left'.rjust(10)+'  '+'Time left (h)'.rjust(13)+'  '+'Path')
+    for job_summary in job_summaries:
+        max_force_string = format_value(job_summary['last_max_force'], '{:.6f}')+' ('+format_value(job_summary['max_force_threshold'], '{:.6f}')+')'
+        steps_left_string = format_value(job_summary['predicted_remaining_steps'], '{}', '?' if job_summary['enough_steps_to_predict'] else '-')
+        time_left_string = format_value(job_summary['predicted_remaining_time'] / 3600.0 if (job_summary['predicted_remaining_time'] is not None) else None, '{:.1f}')
+        print(str(job_summary['number_of_steps']).rjust(6)+'  '+max_force_string.rjust(22)+'  '+steps_left_string.rjust(10)+'  '+time_left_string.rjust(13)+'  '+str(job_summary['path']))
+    print()
+    print('"Steps left" is "?" if the forces of the job are not decreasing, or "-" if there are not enough steps yet to tell. "Time left" needs Gaussian to have been run with "#P" in the route section, or the job to have finished.')
+
+def format_value(value, format_string, none_string='-'):
+    """
+    This method will give a value as a string, or none_string if the value is None.
+
+    Parameters
+    ----------
+    value : object
+        This is the value to give as a string.
+    format_string : str.
+        This is the format to give the value in.
+    none_string : str.
+        This is the string to give if the value is None. Default: '-'
+
+    Returns
+    -------
+    The value as a string.
+    """
+    return none_string if (value is None) else format_string.format(value)
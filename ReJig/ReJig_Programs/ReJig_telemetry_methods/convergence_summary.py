@@ -0,0 +1,176 @@
+'''
+convergence_summary.py, Geoffrey Weal, 18/10/26
+
+These methods are designed to summarise how each Gaussian geometric optimisation is converging, so that jobs that are converging slowly can be found.
+
+The number of steps left for a job is predicted by fitting a straight line to log10(force / threshold) over the last few steps, for both the maximum force and the RMS force.
+The number of steps left is the number of steps until both lines fall below 0 (where the force is below its threshold).
+'''
+import math
+import numpy as np
+
+# This is the number of steps at the end of each optimisation used to predict the number of steps left.
+number_of_steps_to_fit = 10
+
+# This is the fewest number of steps needed to predict the number of steps left.
+min_number_of_steps_to_fit = 3
+
+# These are the fields in the summary of each job, in the order they are given.
+summary_fields = ('path', 'number_of_steps', 'last_max_force', 'max_force_threshold', 'last_rms_force', 'rms_force_threshold', 'predicted_remaining_steps', 'enough_steps_to_predict', 'time_per_step', 'predicted_remaining_time', 'has_fully_converged', 'terminated_normally')
+
+# -----------------------------------------------------------------
+
+def get_log_ratios_to_fit(values, thresholds, number_of_steps_to_fit=number_of_steps_to_fit):
+    """
+    This method will obtain log10(value / threshold) for the last few steps where the value and threshold were given.
+
+    Parameters
+    ----------
+    values : numpy.array
+        These are the values for each step, such as the maximum force. NaN if not found for a step.
+    thresholds : numpy.array
+        These are the thresholds for each step. NaN if not found for a step.
+    number_of_steps_to_fit : int
+        This is the number of steps at the end of the optimisation to give. Default: 10
+
+    Returns
+    -------
+    steps : numpy.array
+        These are the indices of these steps.
+    log_ratios : numpy.array
+        These are log10(value / threshold) for these steps.
+    """
+    steps = np.arange(len(values))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_ratios = np.log10(np.asarray(values, dtype=float) / np.asarray(thresholds, dtype=float))
+    is_finite = np.isfinite(log_ratios)
+    return steps[is_finite][-number_of_steps_to_fit:], log_ratios[is_finite][-number_of_steps_to_fit:]
+
+def predict_remaining_steps(values, thresholds, number_of_steps_to_fit=number_of_steps_to_fit):
+    """
+    This method will predict the number of steps until a value falls below its threshold, by fitting a straight line to log10(value / threshold) over the last few steps.
+
+    Parameters
+    ----------
+    values : numpy.array
+        These are the values for each step, such as the maximum force. NaN if not found for a step.
+    thresholds : numpy.array
+        These are the thresholds for each step. NaN if not found for a step.
+    number_of_steps_to_fit : int
+        This is the number of steps at the end of the optimisation to fit to. Default: 10
+
+    Returns
+    -------
+    predicted_remaining_steps : int or None
+        This is the predicted number of steps left. 0 if the value is already below its threshold. None if this can not be predicted, such as if the value is not decreasing
+        or there are fewer than min_number_of_steps_to_fit steps.
+    """
+
+    # First, obtain log10(value / threshold) for the last few steps where the value and threshold were given.
+    steps, log_ratios = get_log_ratios_to_fit(values, thresholds, number_of_steps_to_fit=number_of_steps_to_fit)
+    if len(log_ratios) == 0:
+        return None
+
+    # Second, if the value is already below its threshold, no more steps are needed.
+    if log_ratios[-1] < 0.0:
+        return 0
+
+    # Third, fit a straight line to log10(value / threshold). If the value is not decreasing, the number of steps left can not be predicted.
+    if len(log_ratios) < min_number_of_steps_to_fit:
+        return None
+    slope, intercept = np.polyfit(steps, log_ratios, 1)
+    if slope >= 0.0:
+        return None
+
+    # Fourth, obtain the number of steps from the last step until the fitted line falls below 0.
+    return max(int(math.ceil(-intercept / slope - steps[-1])), 1)
+
+def get_time_per_step(job_telemetry):
+    """
+    This method will obtain the typical time taken for each step of an optimisation.
+
+    Parameters
+    ----------
+    job_telemetry : dict.
+        This is the telemetry of the job.
+
+    Returns
+    -------
+    time_per_step : float or None
+        This is the median time between steps, in seconds. If the times of the steps were not given, the wall time divided by the number of steps is used. None if neither was given.
+    """
+    step_times = job_telemetry['step_time'][np.isfinite(job_telemetry['step_time'])]
+    if len(step_times) >= 2:
+        return float(np.median(np.diff(step_times)))
+    if np.isfinite(job_telemetry['wall_time']) and (len(job_telemetry['max_force']) > 0):
+        return float(job_telemetry['wall_time']) / len(job_telemetry['max_force'])
+    return None
+
+def summarise_job(job_path, job_telemetry):
+    """
+    This method will summarise how an optimisation is converging.
+
+    Parameters
+    ----------
+    job_path : str.
+        This is the path to the job.
+    job_telemetry : dict.
+        This is the telemetry of the job.
+
+    Returns
+    -------
+    job_summary : dict.
+        This is the summary of the job, containing the fields in summary_fields.
+    """
+
+    # First, obtain the last forces and thresholds of the optimisation.
+    number_of_steps = len(job_telemetry['max_force'])
+    get_last_value = lambda field: float(job_telemetry[field][-1]) if ((number_of_steps > 0) and np.isfinite(job_telemetry[field][-1])) else None
+
+    # Second, predict the number of steps left. Both the maximum force and RMS force need to fall below their thresholds.
+    if job_telemetry['has_fully_converged']:
+        predicted_remaining_steps = 0
+    else:
+        predicted_remaining_steps_for_each_force = [predict_remaining_steps(job_telemetry['max_force'], job_telemetry['max_force_threshold']), predict_remaining_steps(job_telemetry['rms_force'], job_telemetry['rms_force_threshold'])]
+        predicted_remaining_steps = None if (None in predicted_remaining_steps_for_each_force) else max(predicted_remaining_steps_for_each_force)
+
+    # 2.1: Record if there are enough steps to predict the number of steps left, so that jobs that have only just begun are not taken to be converging slowly.
+    if predicted_remaining_steps is not None:
+        enough_steps_to_predict = True
+    else:
+        enough_steps_to_predict = all((len(get_log_ratios_to_fit(job_telemetry[force], job_telemetry[force+'_threshold'])[1]) >= min_number_of_steps_to_fit) for force in ['max_force', 'rms_force'])
+
+    # Third, predict how much more time the optimisation will take.
+    time_per_step = get_time_per_step(job_telemetry)
+    predicted_remaining_time = (predicted_remaining_steps * time_per_step) if ((predicted_remaining_steps is not None) and (time_per_step is not None)) else None
+
+    # Fourth, return the summary of the job.
+    return {'path': job_path, 'number_of_steps': number_of_steps, 'last_max_force': get_last_value('max_force'), 'max_force_threshold': get_last_value('max_force_threshold'), 'last_rms_force': get_last_value('rms_force'), 'rms_force_threshold': get_last_value('rms_force_threshold'), 'predicted_remaining_steps': predicted_remaining_steps, 'enough_steps_to_predict': enough_steps_to_predict, 'time_per_step': time_per_step, 'predicted_remaining_time': predicted_remaining_time, 'has_fully_converged': bool(job_telemetry['has_fully_converged']), 'terminated_normally': bool(job_telemetry['terminated_normally'])}
+
+def rank_slow_converging_jobs(job_telemetries, include_converged=False):
+    """
+    This method will summarise every job, with the jobs that are converging most slowly first.
+
+    Jobs whose remaining steps can not be predicted (because their forces are not decreasing) are given first, followed by the jobs with the most predicted
+    steps left. Jobs with the same number of predicted steps left are ordered by the number of steps they have already taken. Jobs that do not have
+    enough steps yet to predict the number of steps left are given last.
+
+    Parameters
+    ----------
+    job_telemetries : dict.
+        This is the telemetry of each job, as {job_path: job_telemetry}.
+    include_converged : bool.
+        This indicates if you want to include jobs that Gaussian has indicated have converged. Default: False
+
+    Returns
+    -------
+    job_summaries : list of dict.
+        This is the summary of each job, with the jobs that are converging most slowly first.
+    """
+    job_summaries = [summarise_job(job_path, job_telemetry) for job_path, job_telemetry in job_telemetries.items()]
+    if not include_converged:
+        job_summaries = [job_summary for job_summary in job_summaries if not job_summary['has_fully_converged']]
+    job_summaries.sort(key=lambda job_summary: (job_summary['enough_steps_to_predict'], float('inf') if (job_summary['predicted_remaining_steps'] is None) else job_summary['predicted_remaining_steps'], job_summary['number_of_steps'], job_summary['path']), reverse=True)
+    return job_summaries
+
+# -----------------------------------------------------------------
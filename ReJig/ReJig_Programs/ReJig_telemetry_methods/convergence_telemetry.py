@@ -0,0 +1,231 @@
+'''
+convergence_telemetry.py, Geoffrey Weal, 18/10/26
+
+These methods are designed to record how each Gaussian geometric optimisation is converging, and save these for every job in one compressed columnar file.
+
+The telemetry file is a compressed numpy .npz file, where each array is one column:
+
+* job_paths           : The path to each job, relative to the folder containing the telemetry file (shape = (number of jobs,)).
+* step_offsets        : The steps of job i are given by the rows step_offsets[i]:step_offsets[i+1] of each step column (int64, shape = (number of jobs + 1,)).
+* log_size            : The size of the log file of each job when it was read, in bytes (int64, shape = (number of jobs,)).
+* log_mtime_ns        : The modification time of the log file of each job when it was read, in ns (int64, shape = (number of jobs,)).
+* terminated_normally : If Gaussian terminated normally for each job (bool, shape = (number of jobs,)).
+* has_fully_converged : If Gaussian indicated that the optimisation had completed for each job (bool, shape = (number of jobs,)).
+* wall_time           : The wall time of each job in seconds. NaN if not given yet (float64, shape = (number of jobs,)).
+* The step columns given in step_fields, with one row for each step of every job. These are NaN if they were not found for a step.
+
+Jobs whose log files have not changed since the telemetry file was last written are not read again.
+'''
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ReJig.ReJig_Programs.Did_Complete_Main                                import get_jobs_to_check, optimisation_log_filenames
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import analyse_gaussian_opt_log
+
+# This is the name of the telemetry file, placed in the folder containing your ReJig jobs.
+telemetry_filename = 'ReJig_convergence_telemetry.npz'
+
+# These are the values recorded for each step of an optimisation, and the data type each is saved as.
+step_fields = {'max_force':           np.float64,
+               'max_force_threshold': np.float64,
+               'rms_force':           np.float64,
+               'rms_force_threshold': np.float64,
+               'max_displacement':    np.float64,
+               'rms_displacement':    np.float64,
+               'scf_energy':          np.float64,
+               'step_time':           np.float64}
+
+# These are the values recorded for each job, and the data type each is saved as.
+job_fields = {'log_size':            np.int64,
+              'log_mtime_ns':        np.int64,
+              'terminated_normally': bool,
+              'has_fully_converged': bool,
+              'wall_time':           np.float64}
+
+# -----------------------------------------------------------------
+
+def get_job_telemetry(summary, log_stat):
+    """
+    This method will obtain the telemetry of a job from the summary of its log file.
+
+    Parameters
+    ----------
+    summary : GaussianOptimisationSummary
+        This is the summary of the log file, obtained with record_telemetry=True.
+    log_stat : os.stat_result
+        This is the result of os.stat for the log file, taken before the log file was read.
+
+    Returns
+    -------
+    job_telemetry : dict.
+        This contains the values in job_fields, and an array for each of the values in step_fields.
+    """
+    steps = {'max_force':           summary.max_forces,
+             'max_force_threshold': summary.max_force_thresholds,
+             'rms_force':           summary.rms_forces,
+             'rms_force_threshold': summary.rms_force_thresholds,
+             'max_displacement':    summary.max_displacements,
+             'rms_displacement':    summary.rms_displacements,
+             'scf_energy':          summary.scf_energies,
+             'step_time':           summary.step_times}
+    job_telemetry = {field: np.array([(np.nan if (value is None) else value) for value in steps[field]], dtype=dtype) for field, dtype in step_fields.items()}
+    job_telemetry['log_size']            = log_stat.st_size
+    job_telemetry['log_mtime_ns']        = log_stat.st_mtime_ns
+    job_telemetry['terminated_normally'] = summary.terminated_normally
+    job_telemetry['has_fully_converged'] = summary.has_fully_converged
+    job_telemetry['wall_time']           = np.nan if (summary.wall_time is None) else summary.wall_time
+    return job_telemetry
+
+def read_job_telemetry(job_dirpath, previous_job_telemetry=None):
+    """
+    This method will obtain the telemetry of a job by reading its log file, unless the log file has not changed since previous_job_telemetry was obtained.
+
+    Parameters
+    ----------
+    job_dirpath : str.
+        This is the path to the job folder.
+    previous_job_telemetry : dict. or None
+        This is the telemetry of the job from the telemetry file, if the job is in the telemetry file. Default: None
+
+    Returns
+    -------
+    job_telemetry : dict. or None
+        This is the telemetry of the job. None if the job has not begun.
+    """
+
+    # First, obtain the details of the log file. If the log file does not exist, the job has not begun.
+    log_filepath = job_dirpath+'/'+optimisation_log_filenames['Gaussian']
+    try:
+        log_stat = os.stat(log_filepath)
+    except FileNotFoundError:
+        return None
+
+    # Second, if the log file has not changed since the telemetry was last obtained, use the previous telemetry.
+    if (previous_job_telemetry is not None) and (previous_job_telemetry['log_size'] == log_stat.st_size) and (previous_job_telemetry['log_mtime_ns'] == log_stat.st_mtime_ns):
+        return previous_job_telemetry
+
+    # Third, read the log file.
+    summary = analyse_gaussian_opt_log(log_filepath, record_telemetry=True)
+    if summary is None:
+        return None
+    return get_job_telemetry(summary, log_stat)
+
+def collect_convergence_telemetry(general_path, telemetry_filepath=None, workers=1, print_progress=True):
+    """
+    This method will obtain the telemetry of every Gaussian job in general_path, and save it to the telemetry file.
+
+    Parameters
+    ----------
+    general_path : str.
+        This is the overall directory to search through for jobs.
+    telemetry_filepath : str. or None
+        This is the path to the telemetry file. If None, the telemetry file is placed in general_path. Default: None
+    workers : int.
+        This is the number of threads to use to read log files at the same time. Default: 1
+    print_progress : bool.
+        This indicates if you want to show a progress bar. Default: True
+
+    Returns
+    -------
+    job_telemetries : dict.
+        This is the telemetry of each job that has begun, as {job_path: job_telemetry}, where job_path is relative to the folder containing the telemetry file.
+    """
+
+    # First, check that workers is a positive integer.
+    if not (isinstance(workers, int) and (workers >= 1)):
+        raise Exception(f'Error: workers must be an integer greater than or equal to 1. workers = {workers}')
+
+    # Second, obtain the telemetry that was previously saved.
+    if telemetry_filepath is None:
+        telemetry_filepath = general_path+'/'+telemetry_filename
+    root_dirpath = os.path.dirname(os.path.abspath(telemetry_filepath))
+    previous_job_telemetries = read_convergence_telemetry(telemetry_filepath) if os.path.exists(telemetry_filepath) else {}
+
+    # Third, obtain the Gaussian jobs to check. ORCA jobs are not included, as their log files are not analysed.
+    jobs_to_check = [os.path.relpath(os.path.abspath(root), root_dirpath) for root, software_type in get_jobs_to_check(general_path) if (software_type == 'Gaussian')]
+
+    # Fourth, obtain the telemetry of each job.
+    if print_progress:
+        from tqdm import tqdm
+    pbar = tqdm(total=len(jobs_to_check), unit='Jobs') if print_progress else None
+    job_telemetries = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(read_job_telemetry, root_dirpath+'/'+job_path, previous_job_telemetries.get(job_path, None)): job_path for job_path in jobs_to_check}
+        for future in as_completed(futures):
+            job_telemetry = future.result()
+            if job_telemetry is not None:
+                job_telemetries[futures[future]] = job_telemetry
+            if print_progress:
+                pbar.update(1)
+    if print_progress:
+        pbar.close()
+
+    # Fifth, save the telemetry of every job.
+    write_convergence_telemetry(telemetry_filepath, job_telemetries)
+
+    # Sixth, return the telemetry of every job.
+    return job_telemetries
+
+# -----------------------------------------------------------------
+
+def write_convergence_telemetry(telemetry_filepath, job_telemetries):
+    """
+    This method will save the telemetry of every job to the telemetry file.
+
+    The telemetry file is written to a temporary file first, so the previous telemetry file is kept if this program is stopped while writing.
+
+    Parameters
+    ----------
+    telemetry_filepath : str.
+        This is the path to the telemetry file.
+    job_telemetries : dict.
+        This is the telemetry of each job, as {job_path: job_telemetry}.
+    """
+
+    # First, place the jobs in alphabetical order.
+    job_paths = sorted(job_telemetries.keys())
+
+    # Second, obtain the arrays for each job.
+    arrays = {'job_paths': np.array(job_paths, dtype=str)}
+    for field, dtype in job_fields.items():
+        arrays[field] = np.array([job_telemetries[job_path][field] for job_path in job_paths], dtype=dtype)
+
+    # Third, join the steps of every job together into one array for each step field.
+    number_of_steps = [len(job_telemetries[job_path]['max_force']) for job_path in job_paths]
+    arrays['step_offsets'] = np.concatenate(([0], np.cumsum(number_of_steps, dtype=np.int64))).astype(np.int64)
+    for field, dtype in step_fields.items():
+        arrays[field] = np.concatenate([job_telemetries[job_path][field] for job_path in job_paths]).astype(dtype) if (len(job_paths) > 0) else np.zeros(0, dtype=dtype)
+
+    # Fourth, write the telemetry file.
+    temporary_filepath = telemetry_filepath+'.tmp'
+    with open(temporary_filepath, 'wb') as telemetryNPZ:
+        np.savez_compressed(telemetryNPZ, **arrays)
+    os.replace(temporary_filepath, telemetry_filepath)
+
+def read_convergence_telemetry(telemetry_filepath):
+    """
+    This method will read the telemetry of every job from the telemetry file.
+
+    Parameters
+    ----------
+    telemetry_filepath : str.
+        This is the path to the telemetry file.
+
+    Returns
+    -------
+    job_telemetries : dict.
+        This is the telemetry of each job, as {job_path: job_telemetry}, where job_path is relative to the folder containing the telemetry file.
+    """
+    job_telemetries = {}
+    with np.load(telemetry_filepath, allow_pickle=False) as arrays:
+        arrays = {name: arrays[name] for name in arrays.files}
+    step_offsets = arrays['step_offsets']
+    for index, job_path in enumerate(arrays['job_paths']):
+        job_telemetry = {field: arrays[field][index].item() for field in job_fields}
+        for field in step_fields:
+            job_telemetry[field] = arrays[field][step_offsets[index]:step_offsets[index+1]]
+        job_telemetries[str(job_path)] = job_telemetry
+    return job_telemetries
+
+# -----------------------------------------------------------------
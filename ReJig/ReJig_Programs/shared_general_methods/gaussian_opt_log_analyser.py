@@ -0,0 +1,665 @@
+'''
+Geoffrey Weal, gaussian_opt_log_analyser.py, 18/10/26
+
+This script contains methods for obtaining everything needed about a Gaussian geometric optimisation from its log file, by reading through the log file once.
+
+'''
+import os, io, re, mmap
+from datetime import datetime
+
+from ReJig import check_ase_version
+
+# This is the number of lines from the end of the log file that "Normal termination of Gaussian" must be in for the job to have terminated normally.
+number_of_lines_to_check_for_normal_termination = 20
+
+# -----------------------------------------------------------------
+
+class GaussianOptimisationSummary:
+    """
+    This class contains everything needed about a Gaussian geometric optimisation, as obtained from its log file.
+
+    Images are the geometric steps of the optimisation. Each image is found by its "Maximum Force" line in the log file.
+    Image indices are given from the end of the log file, where -1 is the last image in the log file.
+
+    Attributes
+    ----------
+    log_filepath : str.
+        This is the path to the Gaussian log file.
+    log_size : int
+        This is the size of the log file in bytes.
+    terminated_normally : bool.
+        This indicates if "Normal termination of Gaussian" was found at the end of the log file.
+    stationary_point_found : bool.
+        This indicates if Gaussian reported that the optimisation had completed.
+    wall_time : float or None
+        This is the total wall time of the job in seconds, from the "Elapsed time" lines in the log file. None if Gaussian has not written an "Elapsed time" line.
+    max_forces : list of float
+        These are the maximum forces for each image.
+    max_force_thresholds : list of float
+        These are the thresholds for the maximum force for each image.
+    rms_forces : list of float or None
+        These are the RMS forces for each image. None if not found for an image.
+    rms_force_thresholds : list of float or None
+        These are the thresholds for the RMS force for each image. None if not found for an image.
+    max_displacements : list of float or None
+        These are the maximum displacements for each image. None if not found for an image.
+    rms_displacements : list of float or None
+        These are the RMS displacements for each image. None if not found for an image.
+    record_telemetry : bool.
+        This indicates if the SCF energy and the time of each image are also recorded.
+    scf_energies : list of float or None
+        These are the SCF energies for each image, in Hartree. None if not found for an image. Only recorded if record_telemetry is True.
+    step_times : list of float or None
+        These are the times that each image was finished, in seconds since the epoch. These are only given by Gaussian if "#P" is used in the route section. 
+        None if not found for an image. Only recorded if record_telemetry is True.
+    trajectory : list of ase.Atoms or None
+        These are the structures in the log file, as given by ase.io.read(log_filepath, index=':'). None if the trajectory was not kept.
+    final_image : ase.Atoms or None
+        This is the last structure in the log file, as given by ase.io.read(log_filepath, index=-1). None if the structures were not read or there are no structures.
+    number_of_frames : int
+        This is the number of structures read from the log file.
+    """
+    def __init__(self, log_filepath, record_telemetry=False):
+        self.log_filepath = log_filepath
+        self.log_size = None
+        self.terminated_normally = False
+        self.stationary_point_found = False
+        self.wall_time = None
+        self.max_forces = []
+        self.max_force_thresholds = []
+        self.rms_forces = []
+        self.rms_force_thresholds = []
+        self.max_displacements = []
+        self.rms_displacements = []
+        self.record_telemetry = record_telemetry
+        self.scf_energies = []
+        self.step_times = []
+        self.trajectory = None
+        self.final_image = None
+        self.number_of_frames = 0
+
+        # These are used while reading the log file.
+        self._number_of_images_before_last_completion_line = None
+        self._line_number = 0
+        self._line_number_of_last_normal_termination = None
+        self._last_scf_energy = None
+
+    # -----------------------------------------------------------------
+    # Methods for reading lines from the log file.
+
+    def read_line(self, line):
+        """
+        This method will record any information from a line in the log file.
+
+        Parameters
+        ----------
+        line : str.
+            This is a line from the log file.
+        """
+        if line.rstrip('\n'):
+            self._line_number += 1
+        if 'Normal termination of Gaussian' in line:
+            self._line_number_of_last_normal_termination = self._line_number
+            self._number_of_images_before_last_completion_line = len(self.max_forces)
+        elif ('Stationary point found' in line) or ('Optimization completed' in line):
+            self.stationary_point_found = True
+            self._number_of_images_before_last_completion_line = len(self.max_forces)
+        elif 'Elapsed time:' in line:
+            self.wall_time = (0.0 if (self.wall_time is None) else self.wall_time) + get_elapsed_time(line)
+        elif 'Maximum Force' in line:
+            value, threshold = get_value_and_threshold(line)
+            self.max_forces.append(value)
+            self.max_force_thresholds.append(threshold)
+            self.rms_forces.append(None)
+            self.rms_force_thresholds.append(None)
+            self.max_displacements.append(None)
+            self.rms_displacements.append(None)
+            if self.record_telemetry:
+                self.scf_energies.append(self._last_scf_energy)
+                self.step_times.append(None)
+                self._last_scf_energy = None
+        elif self.record_telemetry and ('SCF Done:' in line):
+            self._last_scf_energy = get_scf_energy(line)
+        elif self.record_telemetry and line.startswith(' Leave Link') and (len(self.step_times) > 0) and (self.step_times[-1] is None):
+            self.step_times[-1] = get_leave_link_time(line)
+        elif len(self.max_forces) > 0:
+            if 'RMS     Force' in line:
+                self.rms_forces[-1], self.rms_force_thresholds[-1] = get_value_and_threshold(line)
+            elif 'Maximum Displacement' in line:
+                self.max_displacements[-1], _ = get_value_and_threshold(line)
+            elif 'RMS     Displacement' in line:
+                self.rms_displacements[-1], _ = get_value_and_threshold(line)
+
+    def read_frame(self, frame):
+        """
+        This method will record a structure from the log file.
+
+        Parameters
+        ----------
+        frame : ase.Atoms
+            This is a structure from the log file.
+        """
+        self.final_image = frame
+        self.number_of_frames += 1
+
+    def finish_reading(self):
+        """
+        This method will finish recording information once all the lines of the log file have been read.
+        """
+        if self._line_number_of_last_normal_termination is not None:
+            self.terminated_normally = (self._line_number - self._line_number_of_last_normal_termination) <= number_of_lines_to_check_for_normal_termination
+
+    # -----------------------------------------------------------------
+    # Methods for obtaining results.
+
+    @property
+    def number_of_images(self):
+        """
+        This is the number of images made during the optimisation.
+        """
+        return len(self.max_forces)
+
+    @property
+    def has_fully_converged(self):
+        """
+        This indicates if Gaussian indicated that the optimisation had completed (either by normal termination, or by finding a stationary point).
+        """
+        return self._number_of_images_before_last_completion_line is not None
+
+    def is_image_converged(self, image_index):
+        """
+        This method will determine if the maximum force and RMS force of an image are both below their thresholds.
+
+        Parameters
+        ----------
+        image_index : int
+            This is the index of the image, from the end of the log file.
+
+        Returns
+        -------
+        True if the maximum force and RMS force of this image are both below their thresholds.
+        """
+        max_force, max_force_threshold = self.max_forces[image_index], self.max_force_thresholds[image_index]
+        rms_force, rms_force_threshold = self.rms_forces[image_index], self.rms_force_thresholds[image_index]
+        if (max_force is None) or (max_force_threshold is None) or (rms_force is None) or (rms_force_threshold is None):
+            return False
+        return (max_force < max_force_threshold) and (rms_force < rms_force_threshold)
+
+    @property
+    def most_recently_converged_image_index(self):
+        """
+        This is the index (from the end of the log file) of the last image that converged. None if no image converged.
+        If the optimisation fully converged, this is the image where the optimisation completed.
+        """
+        if self.has_fully_converged:
+            return self._number_of_images_before_last_completion_line - self.number_of_images - 1
+        return self.get_last_converged_image_index()
+
+    def get_last_converged_image_index(self, number_of_images_to_check=None):
+        """
+        This method will obtain the index (from the end of the log file) of the last image where the maximum force and RMS force are both below their thresholds.
+
+        Parameters
+        ----------
+        number_of_images_to_check : int or None
+            This is the number of images from the end of the log file to check. If None, all images are checked. Default: None
+
+        Returns
+        -------
+        The index of the last converged image. None if none of the images checked converged.
+        """
+        if number_of_images_to_check is None:
+            number_of_images_to_check = self.number_of_images
+        for image_index in range(-1, -number_of_images_to_check-1, -1):
+            if self.is_image_converged(image_index):
+                return image_index
+        return None
+
+    @property
+    def most_converged_image_index(self):
+        """
+        This is the index (from the end of the log file) of the converged image with the lowest maximum force. None if no image converged.
+        If the optimisation fully converged, this is the image where the optimisation completed.
+        """
+        if self.has_fully_converged:
+            return self.most_recently_converged_image_index
+        most_converged_image_index = None
+        lowest_maximum_force = float('inf')
+        for image_index in range(-1, -self.number_of_images-1, -1):
+            if self.is_image_converged(image_index) and (self.max_forces[image_index] < lowest_maximum_force):
+                lowest_maximum_force = self.max_forces[image_index]
+                most_converged_image_index = image_index
+        return most_converged_image_index
+
+    @property
+    def last_max_force(self):
+        """
+        This is the maximum force of the last image in the log file. None if there are no images.
+        """
+        return self.max_forces[-1] if (self.number_of_images > 0) else None
+
+    def get_opt_job_completion(self, get_most_converged_image=False, get_total_no_of_images=False):
+        """
+        This method will give the same results as did_gaussian_opt_job_complete.
+
+        Parameters
+        ----------
+        get_most_converged_image : bool
+            This tag indicates if you want to get the most converged image. If True, Yes. If False, just the most recently converged image.
+        get_total_no_of_images : bool
+            This tag will indicate if you want to obtain the total number of images that have been created during this optimisation
+
+        Returns
+        -------
+        did_finish_successfully : bool.
+            Did the optimisation finish successfully
+        has_fully_converged : bool.
+            This tag indicates if the Gaussian job converged properly.
+        last_converged_image_index/most_converged_image_index
+            This is the index of the image from the Gaussian output file to use for further calculations and analysis
+        total_no_of_images
+        """
+        # First, if only the most recently converged image is wanted, an image that converged after Gaussian indicated the optimisation 
+        #        had completed is given (this is the first converged image found when reading the log file backwards).
+        if self.has_fully_converged and not (get_most_converged_image or get_total_no_of_images):
+            image_index = self.get_last_converged_image_index(self.number_of_images - self._number_of_images_before_last_completion_line)
+            if image_index is not None:
+                return (True, False, image_index)
+
+        # Second, obtain the index of the image to use.
+        image_index = self.most_converged_image_index if get_most_converged_image else self.most_recently_converged_image_index
+
+        # Third, return the results.
+        if image_index is None:
+            to_return = [False, False, None]
+        else:
+            to_return = [True, self.has_fully_converged, image_index]
+        if get_total_no_of_images:
+            to_return.append(self.number_of_images)
+        return tuple(to_return)
+
+    def to_record(self):
+        """
+        This method will give a summary of this optimisation that can be saved as json.
+
+        Returns
+        -------
+        record : dict.
+            This is the summary of this optimisation.
+        """
+        did_finish_successfully, has_fully_converged, converged_image_index, number_of_images = self.get_opt_job_completion(get_most_converged_image=True, get_total_no_of_images=True)
+        return {'did_finish_successfully': did_finish_successfully, 'has_fully_converged': has_fully_converged, 'converged_image_index': converged_image_index, 'number_of_images': number_of_images, 'terminated_normally': self.terminated_normally, 'last_max_force': self.last_max_force, 'log_size': self.log_size, 'wall_time': self.wall_time}
+
+# -----------------------------------------------------------------
+
+def analyse_gaussian_opt_log(log_filepath, read_trajectory=False, on_frame=None, record_telemetry=False):
+    """
+    This method will obtain everything needed about a Gaussian geometric optimisation from its log file, by reading through the log file once.
+
+    Parameters
+    ----------
+    log_filepath : str.
+        This is the path to the Gaussian log file.
+    read_trajectory : bool.
+        If True, the structures in the log file will also be read and kept (in the same way as ase.io.read(log_filepath, index=':')). Default: False
+    on_frame : method or None
+        If given, the structures in the log file will be read, and each structure will be given to this method as soon as it has been read. 
+        This allows the structures to be written to disk without keeping them all in memory. Default: None
+    record_telemetry : bool.
+        If True, the SCF energy and the time of each image are also recorded. Default: False
+
+    Returns
+    -------
+    summary : GaussianOptimisationSummary or None
+        This is the summary of the optimisation. None if the log file does not exist.
+    """
+
+    # First, if the log file does not exist, return None.
+    if not os.path.exists(log_filepath):
+        return None
+
+    # Second, initialise the summary.
+    summary = GaussianOptimisationSummary(log_filepath, record_telemetry=record_telemetry)
+    summary.log_size = os.path.getsize(log_filepath)
+    if read_trajectory:
+        summary.trajectory = []
+
+    # Third, read through the log file once.
+    with open(log_filepath, 'r') as logFILE:
+        if read_trajectory or (on_frame is not None):
+            # 3.1: Read the structures using ASE, while recording the information in each line.
+            for frame in iread_gaussian_out(ObservedLines(logFILE, summary.read_line)):
+                summary.read_frame(frame)
+                if read_trajectory:
+                    summary.trajectory.append(frame)
+                if on_frame is not None:
+                    on_frame(frame)
+        else:
+            # 3.2: Only record the information in each line.
+            for line in logFILE:
+                summary.read_line(line)
+
+    # Fourth, finish recording information.
+    summary.finish_reading()
+
+    # Fifth, return the summary.
+    return summary
+
+# -----------------------------------------------------------------
+
+# These are the lines that begin a new structure in a Gaussian log file.
+orientation_lines = ('Input orientation:', 'Z-Matrix orientation:', 'Standard orientation:')
+
+def iread_gaussian_out(lines):
+    """
+    This generator will give each structure in a Gaussian log file as soon as it has been read, giving the same structures as ase.io.read(log_filepath, index=':').
+
+    The log file is split into sections, where each section contains one structure along with its energy and forces. 
+    Each section is read by ASE's Gaussian reader, so only one section is held in memory at a time. 
+
+    Parameters
+    ----------
+    lines : iterable of str.
+        These are the lines of the Gaussian log file. All the lines are read, even those after the structures.
+
+    Returns
+    -------
+    Returns each structure in the log file, in order.
+    """
+    check_ase_version()
+    from ase.io.gaussian import read_gaussian_out
+
+    # First, initialise the section being read and the structures that may still be merged with the next structure.
+    section = []
+    configs = []
+    reached_archive_block = False
+
+    for line in lines:
+
+        # Second, ASE stops at the archive block at the end of the log file, so only look through the rest of the lines.
+        if reached_archive_block:
+            continue
+        stripped_line = line.strip()
+        if stripped_line.startswith('1\\1\\GINC'):
+            reached_archive_block = True
+            continue
+
+        # Third, a new section begins at an orientation line, but only if the current section contains an energy. 
+        #        ASE ignores orientation lines found before an energy has been given for the current structure.
+        if (stripped_line in orientation_lines) and (len(section) > 0):
+            section_configs = read_gaussian_out(io.StringIO(''.join(section)), index=slice(None))
+            if (len(section_configs) == 0) or ('energy' in section_configs[-1].calc.results):
+                for config in section_configs:
+                    merge_configs(configs, config)
+                while len(configs) > 1:
+                    yield configs.pop(0)
+                section = []
+
+        # Fourth, add this line to the current section.
+        section.append(line)
+
+    # Fifth, read the last section and give the remaining structures.
+    if len(section) > 0:
+        for config in read_gaussian_out(io.StringIO(''.join(section)), index=slice(None)):
+            merge_configs(configs, config)
+    for config in configs:
+        yield config
+
+def merge_configs(configs, new):
+    """
+    This method will add a structure to configs in the same way as ASE's Gaussian reader.
+
+    Gaussian sometimes repeats a structure, such as at the end of an optimisation. In this case, the results of the repeated 
+    structure are merged into the previous structure if they do not change any previous results. 
+
+    Parameters
+    ----------
+    configs : list of ase.Atoms
+        These are the structures read so far.
+    new : ase.Atoms
+        This is the structure to add.
+    """
+    import numpy as np
+    if (len(configs) == 0) or (configs[-1] != new):
+        configs.append(new)
+        return
+    old_results = configs[-1].calc.results
+    new_results = new.calc.results
+    for key in set(old_results).intersection(new_results):
+        if np.any(old_results[key] != new_results[key]):
+            configs.append(new)
+            return
+    old_results.update(new_results)
+
+# -----------------------------------------------------------------
+
+# These are the lines that begin a structure, in the order they are looked for when only reading the end of a Gaussian log file.
+# "Input orientation:" is looked for first, as this is the structure given by ase.io.read(log_filepath, index=-1).
+last_orientation_lines = ('Input orientation:', 'Z-Matrix orientation:', 'Standard orientation:')
+
+# This is the format of each atom line in an orientation block: "Center Number, Atomic Number, Atomic Type, X, Y, Z".
+atom_line_format = re.compile(r'^\s*\S+\s+(\S+)\s+(?:\S+\s+)?(\S+)\s+(\S+)\s+(\S+)\s*$')
+
+def read_last_input_orientation(log_filepath):
+    """
+    This method will obtain the last structure in a Gaussian log file by only reading the end of the log file.
+
+    The log file is searched backwards from the end for the last "Input orientation:" block, so only the end of the log file is read
+    rather than the whole log file (as ase.io.read(log_filepath, index=-1) does). If there are no "Input orientation:" blocks, the
+    last "Z-Matrix orientation:" block, and then the last "Standard orientation:" block, is used instead.
+
+    If the last block was not completely written (such as if the job was stopped while Gaussian was writing it), the block before it is used.
+
+    Parameters
+    ----------
+    log_filepath : str.
+        This is the path to the Gaussian log file.
+
+    Returns
+    -------
+    atoms : ase.Atoms or None
+        This is the last structure in the log file. None if the log file does not contain a structure.
+    """
+    check_ase_version()
+    from ase import Atoms
+
+    with open(log_filepath, 'rb') as logFILE:
+
+        # First, an empty file can not be memory-mapped, and does not contain a structure.
+        if os.fstat(logFILE.fileno()).st_size == 0:
+            return None
+
+        with mmap.mmap(logFILE.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for orientation_line in last_orientation_lines:
+
+                # Second, search backwards for the last complete orientation block.
+                end = len(mm)
+                while True:
+                    position = mm.rfind(orientation_line.encode(), 0, end)
+                    if position == -1:
+                        break
+                    orientation_block = read_orientation_block(mm, position, orientation_line)
+                    if orientation_block is not None:
+                        numbers, positions, cell, pbc = orientation_block
+                        return Atoms(numbers, positions, pbc=pbc, cell=cell)
+                    end = position
+
+    # Third, the log file does not contain a structure.
+    return None
+
+def read_orientation_block(mm, position, orientation_line):
+    """
+    This method will read the structure in an orientation block of a Gaussian log file, in the same way as ASE's Gaussian reader.
+
+    Parameters
+    ----------
+    mm : mmap.mmap
+        This is the memory-mapped log file.
+    position : int
+        This is the position of the orientation line in the log file.
+    orientation_line : str.
+        This is the orientation line, such as "Input orientation:".
+
+    Returns
+    -------
+    numbers, positions, cell, pbc : list of int, list of list of float, list of list of float, list of bool
+        This is the structure in the orientation block. None if position is not at an orientation line, or if the block was not completely written or does not contain any atoms.
+    """
+
+    # First, check that position is at an orientation line that has been completely written.
+    line_start, line_end = mm.rfind(b'\n', 0, position) + 1, mm.find(b'\n', position)
+    if (line_end == -1) or (mm[line_start:line_end].decode(errors='replace').strip() != orientation_line):
+        return None
+
+    # Second, obtain each line after the orientation line. None is given if a line was not completely written.
+    def get_lines(start):
+        while True:
+            end = mm.find(b'\n', start)
+            if end == -1:
+                yield None
+                return
+            yield mm[start:end].decode(errors='replace').rstrip('\r')
+            start = end + 1
+    lines = get_lines(line_end + 1)
+
+    # Third, skip the 4 lines of the header of the block.
+    for _ in range(4):
+        if next(lines) is None:
+            return None
+
+    # Fourth, read the atoms in the block. Atoms with an atomic number of -2 are the translation vectors of the cell.
+    numbers, positions = [], []
+    cell, pbc = [[0.0, 0.0, 0.0] for _ in range(3)], [False, False, False]
+    number_of_translation_vectors = 0
+    for line in lines:
+        if line is None:
+            return None
+        match = atom_line_format.match(line)
+        if match is None:
+            break
+        number = int(match.group(1))
+        position_of_atom = [float(value) for value in match.group(2, 3, 4)]
+        if (number == -2) and (number_of_translation_vectors < 3):
+            pbc[number_of_translation_vectors] = True
+            cell[number_of_translation_vectors] = position_of_atom
+            number_of_translation_vectors += 1
+        else:
+            numbers.append(max(number, 0))
+            positions.append(position_of_atom)
+
+    # Fifth, the block is complete if it ends with a line of dashes and contains at least one atom.
+    if (not line.strip().startswith('-')) or (len(numbers) == 0):
+        return None
+
+    # Sixth, return the structure in the block.
+    return numbers, positions, cell, pbc
+
+# -----------------------------------------------------------------
+
+class ObservedLines:
+    """
+    This class will pass each line read from a file to a method, so that the lines read by another reader can also be looked at.
+
+    Parameters
+    ----------
+    fd : file
+        This is the open file.
+    on_line : method
+        This is the method that is given each line that is read.
+    """
+    def __init__(self, fd, on_line):
+        self.fd = fd
+        self.on_line = on_line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.fd)
+        self.on_line(line)
+        return line
+
+# -----------------------------------------------------------------
+
+def get_value_and_threshold(line):
+    """
+    This method will obtain the value and threshold from a convergence line, such as "Maximum Force  0.000123  0.000450  YES".
+
+    Parameters
+    ----------
+    line : str.
+        This is the convergence line from the log file.
+
+    Returns
+    -------
+    value : float or None
+        This is the value. This is infinity if Gaussian could not write the value. None if the line could not be read, such as if Gaussian is still writing it.
+    threshold : float or None
+        This is the threshold. None if the line could not be read.
+    """
+    try:
+        _, _, value, threshold, _ = line.rstrip().split()
+        value = float('inf') if (value == '********') else float(value)
+        return value, float(threshold)
+    except ValueError:
+        return None, None
+
+# These are the number of seconds in each unit of time given in the "Elapsed time" lines of a Gaussian log file.
+seconds_in_time_unit = {'days': 86400.0, 'hours': 3600.0, 'minutes': 60.0, 'seconds': 1.0}
+
+def get_elapsed_time(line):
+    """
+    This method will obtain the wall time from an "Elapsed time" line, such as "Elapsed time:  0 days  1 hours 23 minutes 45.6 seconds.".
+
+    Parameters
+    ----------
+    line : str.
+        This is the "Elapsed time" line from the log file.
+
+    Returns
+    -------
+    elapsed_time : float
+        This is the wall time in seconds.
+    """
+    words = line.split(':', 1)[1].strip().rstrip('.').split()
+    return sum(float(value) * seconds_in_time_unit.get(unit, 0.0) for value, unit in zip(words[0::2], words[1::2]))
+
+def get_scf_energy(line):
+    """
+    This method will obtain the SCF energy from a "SCF Done" line, such as "SCF Done:  E(RwB97XD) =  -1234.56789012     A.U. after   14 cycles".
+
+    Parameters
+    ----------
+    line : str.
+        This is the "SCF Done" line from the log file.
+
+    Returns
+    -------
+    scf_energy : float or None
+        This is the SCF energy in Hartree. None if the SCF energy could not be read.
+    """
+    try:
+        return float(line.split('=', 1)[1].split()[0])
+    except (IndexError, ValueError):
+        return None
+
+def get_leave_link_time(line):
+    """
+    This method will obtain the time from a "Leave Link" line, such as "Leave Link  103 at Wed Jan 10 12:34:56 2024, MaxMem= 536870912 cpu: 0.2 elap: 0.0".
+
+    Parameters
+    ----------
+    line : str.
+        This is the "Leave Link" line from the log file.
+
+    Returns
+    -------
+    step_time : float or None
+        This is the time given in seconds since the epoch. None if the time could not be read.
+    """
+    try:
+        return datetime.strptime(' '.join(line.split(' at ', 1)[1].split(',')[0].split()), '%a %b %d %H:%M:%S %Y').timestamp()
+    except (IndexError, ValueError):
+        return None
+
+# -----------------------------------------------------------------
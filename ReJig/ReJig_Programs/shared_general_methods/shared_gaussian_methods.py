@@ -5,7 +5,8 @@ This script contains methods for processing_OPV_Dimer_data.py
 
 '''
 import os
-from ReJig.ReJig_Programs.shared_general_methods.shared_general_methods import get_lastline, reverse_readline
+from ReJig.ReJig_Programs.shared_general_methods.shared_general_methods    import get_lastline, reverse_readline, is_keyword_in_last_lines
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import analyse_gaussian_opt_log
 
 # -----------------------------------------------------------------
 
@@ -54,30 +55,20 @@ def did_gaussian_job_complete(log_filepath):
     """
     did_gaussian_job_terminate_normally = False
 
+    # If not found the termination signal in the last line and the 20 lines before it, the job probably did not terminate properly
     if os.path.exists(log_filepath):
-        counter = 0
-        for line in reverse_readline(log_filepath):
-            # Check if the gaussian file has terminated normally
-            if 'Normal termination of Gaussian' in line:
-                did_gaussian_job_terminate_normally = True
-            # If not found the termination signal after 20 lines from the end of file, 
-            # the job probably did not terminate properly
-            if counter >= 20 and not did_gaussian_job_terminate_normally:
-                break
-            # If these tags are true, finish
-            if did_gaussian_job_terminate_normally:
-                break
-            counter += 1
+        did_gaussian_job_terminate_normally = is_keyword_in_last_lines(log_filepath, 'Normal termination of Gaussian', 21)
 
     return did_gaussian_job_terminate_normally
 
 # -----------------------------------------------------------------
 
-multiplier = 1.0
 def did_gaussian_opt_job_complete(log_filepath, get_most_converged_image=False, get_total_no_of_images=False):
     """
     This method will check to see if the gaussian optimisation job has completed successfully. 
 
+    This reads through the log file once using analyse_gaussian_opt_log. If you need more information about the optimisation, use analyse_gaussian_opt_log directly.
+
     Parameters
     ----------
     log_filepath : str.
@@ -98,111 +89,18 @@ def did_gaussian_opt_job_complete(log_filepath, get_most_converged_image=False,
     total_no_of_images
     """
 
-    # Preamble, if the log file does not exist, return False.
-    if not os.path.exists(log_filepath):
+    # First, obtain the summary of the optimisation from the log file.
+    summary = analyse_gaussian_opt_log(log_filepath)
+
+    # Second, if the log file does not exist, return False.
+    if summary is None:
         if get_total_no_of_images:
             return False, None, None, None
         else:
             return False, None, None
 
-    # First, create some settings for determining if a image has force converged
-    has_fully_converged                 = False
-    has_max_force_converged             = False
-    has_RMS_force_converged             = False
-    most_recently_converged_image_index = None
-
-    # Second, create variables if you want to find the most converged image in the optimisation.
-    if get_most_converged_image:
-        lowest_maximum_force = float('inf')
-        most_converged_image = None
-
-    # Third, create variables for if you want to obtain the number of images in the optimisation output file. 
-    if get_total_no_of_images:
-        normal_termination = False
-        total_no_of_images = 0
-
-    # Fourth, go through the output file of the gaussian job backward to determine if the job finished or not
-    reverse_image_index = -1
-    for line in reverse_readline(log_filepath):
-        # Check if the gaussian file has terminated normally, or if EET header is found:
-        if ('Normal termination of Gaussian' in line) or (('Stationary point found' in line) or ('Optimization completed' in line)):
-            most_recently_converged_image_index = reverse_image_index
-            most_converged_image = reverse_image_index
-            has_fully_converged = True
-            if get_total_no_of_images:
-                normal_termination = True
-            break
-        # Indicate if the optimisation have force converged to the degree I (Geoff) is happy with.
-        if 'Maximum Force' in line:
-            _, _, value, threshold, congerved = line.rstrip().split()
-            if value == '********':
-                value = float('inf')
-            else:
-                value = float(value)
-            threshold = float(threshold)
-            if value*multiplier < threshold:
-                has_max_force_converged = True
-            # ==============================================================================
-            # If both the max force and RMS force has converged, indicate this
-            if (has_max_force_converged and has_RMS_force_converged):
-                # If most recently converged image index has not been given, give it
-                if most_recently_converged_image_index is None:
-                    most_recently_converged_image_index = reverse_image_index
-                # If you want to get the most converged image index, perform the following
-                if get_most_converged_image:
-                    if value < lowest_maximum_force:
-                        lowest_maximum_force = value
-                        most_converged_image = reverse_image_index
-                # If you are not recording the get_most_converged_image or get_total_no_of_images, we dont need to do anything more, so break out of loop
-                if not (get_most_converged_image or get_total_no_of_images):
-                    break
-            # Reset the convergence booleans
-            has_max_force_converged = False
-            has_RMS_force_converged = False
-            # move down the image index as we are on two the next (previous) image in the optimisation. 
-            reverse_image_index += -1
-            if get_total_no_of_images:
-                total_no_of_images  +=  1
-            # ==============================================================================
-        if 'RMS     Force' in line:
-            _, _, value, threshold, congerved = line.rstrip().split()
-            if value == '********':
-                value = float('inf')
-            else:
-                value = float(value)
-            threshold = float(threshold)
-            if value*multiplier < threshold:
-                has_RMS_force_converged = True
-
-    # Fourth, if you want to get the total no of images but you had a normal termination, use this method to count the number of images you had
-    if get_total_no_of_images and normal_termination:
-        total_no_of_images = 0
-        for line in reverse_readline(log_filepath):
-            if 'Maximum Force' in line:
-                total_no_of_images += 1
-
-    # Fifth, record data to return about the results about either the most converged result, or the most recently converged result
-    if get_most_converged_image:
-        # Return most converged result
-        # If most_converged_image is None, no converged image was found, job has not completed
-        if most_converged_image is None:
-            to_return = [False, False, None]
-        else:
-            to_return = [True, has_fully_converged, most_converged_image]
-    else:
-        # Return most recently converged result
-        # If most_converged_image is None, no converged image was found, job has not completed
-        if most_recently_converged_image_index is None:
-            to_return = [False, False, None]
-        else:
-            to_return = [True, has_fully_converged, most_recently_converged_image_index]
-
-    # Sixth, add info for returning about the total number of images
-    if get_total_no_of_images:
-        to_return.append(total_no_of_images)
-
-    # Seventh, return result as a tuple
-    return tuple(to_return)
+    # Third, return the results about either the most converged result, or the most recently converged result.
+    return summary.get_opt_job_completion(get_most_converged_image=get_most_converged_image, get_total_no_of_images=get_total_no_of_images)
 
 # -----------------------------------------------------------------
 
@@ -261,29 +159,29 @@ def did_freq_gaussian_job_complete(freq_log_filepath):
 
 gaussian_temp_types = ['.d2e','.int','.rwf','.skr']
 other_files_to_remove = ['core.']
-def gaussian_temp_files_to_remove(root, files, remove_chk_file=True, remove_fort7_file=False, print_to_display=True):
+def get_gaussian_temp_files_to_remove(files, remove_chk_file=True, remove_fort7_file=False):
     '''
-    This method is designed to remove temporary gaussian files. 
-
-    These are files that will not need to be used again, and many are very large so removing is very advantagous.
+    This method is designed to obtain the temporary gaussian files that can be removed. 
 
     Parameters
     ----------
-    root : str
-        This is the path to the gaussian temp files
     files : list
         This is a list of all the filenames to look through to see it contains Gaussian temp files.
+    remove_chk_file : bool.
+        If True, include any .chk files. If False, only include the gaussian_freq.chk and gaussian_sp.chk files.
     remove_fort7_file : bool.
-        If True, remove the fort.7 file if found. If False, do not remove this file.
-    print_to_display : bool.
-        Print what is being remove to screen. Default: True
+        If True, include the fort.7 file if found. If False, do not include this file.
+
+    Returns
+    -------
+    temp_files_to_remove : list of str.
+        These are the names of the files that can be removed.
     '''
 
     # For determining if to remove wfn file as multiwfn file has already been processed for ATC calculation
     wfn_file = None
     have_chg_file = False
 
-    # Get files to remove
     temp_files_to_remove = []
     for file in files:
         for gaussian_temp_type in gaussian_temp_types:
@@ -311,6 +209,29 @@ def gaussian_temp_files_to_remove(root, files, remove_chk_file=True, remove_fort
     if have_chg_file and (wfn_file is not None):
         temp_files_to_remove.append(wfn_file)
 
+    return temp_files_to_remove
+
+def gaussian_temp_files_to_remove(root, files, remove_chk_file=True, remove_fort7_file=False, print_to_display=True):
+    '''
+    This method is designed to remove temporary gaussian files. 
+
+    These are files that will not need to be used again, and many are very large so removing is very advantagous.
+
+    Parameters
+    ----------
+    root : str
+        This is the path to the gaussian temp files
+    files : list
+        This is a list of all the filenames to look through to see it contains Gaussian temp files.
+    remove_fort7_file : bool.
+        If True, remove the fort.7 file if found. If False, do not remove this file.
+    print_to_display : bool.
+        Print what is being remove to screen. Default: True
+    '''
+
+    # Get files to remove
+    temp_files_to_remove = get_gaussian_temp_files_to_remove(files, remove_chk_file=remove_chk_file, remove_fort7_file=remove_fort7_file)
+
     # Remove files if they exist
     if len(temp_files_to_remove) > 0:
         if print_to_display:
@@ -333,9 +254,24 @@ def remove_slurm_output_files(root):
     root : str
         This is the path to the gaussian temp files.
     """
-    for file in os.listdir(root):
-        if file.startswith('slurm-') and (file.endswith('.out') or file.endswith('.err')):
-            os.remove(root+'/'+file)
+    for file in get_slurm_output_files(os.listdir(root)):
+        os.remove(root+'/'+file)
+
+def get_slurm_output_files(files):
+    """
+    This method will obtain the slurm output files made, including the slurm-XXX.out and slurm-XXX.err files, where XXX is the job number.
+
+    Parameters
+    ----------
+    files : list
+        This is a list of all the filenames to look through for slurm output files.
+
+    Returns
+    -------
+    slurm_output_files : list of str.
+        These are the names of the slurm output files.
+    """
+    return [file for file in files if file.startswith('slurm-') and (file.endswith('.out') or file.endswith('.err'))]
 
 # -----------------------------------------------------------------
 
@@ -4,7 +4,7 @@ Geoffrey Weal, processing_OPV_Dimer_data.py, 9/3/22
 This script contains methods for processing_OPV_Dimer_data.py
 
 '''
-import os
+import os, mmap
 
 # -----------------------------------------------------------------
 
@@ -33,51 +33,96 @@ def get_lastline(log_filepath):
 
 # -----------------------------------------------------------------
 
-def reverse_readline(filename, buf_size=8192):
+def reverse_readline(filename, buf_size=65536):
     """
     A generator that returns the lines of a file in reverse order
 
+    The file is memory-mapped and split into lines as bytes, working backwards from the end of the file, so only the lines that are returned are decoded. 
+    Blank lines are not returned, and the newline (and carriage return) at the end of each line is removed.
+
     Parameters
     ----------
     filename : str
         This is the path to the file you want to read.
     buf_size : int
-        This is the buffer size to read in.
+        This is the number of bytes to split into lines at a time.
 
     Returns
     -------
     Returns each line in the file in reverse order.
     """
-    
-    with open(filename) as fh:
-        segment = None
-        offset = 0
-        fh.seek(0, os.SEEK_END)
-        file_size = remaining_size = fh.tell()
-        while remaining_size > 0:
-            offset = min(file_size, offset + buf_size)
-            fh.seek(file_size - offset)
-            buffer = fh.read(min(remaining_size, buf_size))
-            remaining_size -= buf_size
-            lines = buffer.split('\n')
-            # The first line of the buffer is probably not a complete line so
-            # we'll save it and append it to the last line of the next buffer
-            # we read
-            if segment is not None:
-                # If the previous chunk starts right from the beginning of line
-                # do not concat the segment to the last line of new chunk.
-                # Instead, yield the segment first 
-                if buffer[-1] != '\n':
-                    lines[-1] += segment
-                else:
-                    yield segment
-            segment = lines[0]
-            for index in range(len(lines) - 1, 0, -1):
-                if lines[index]:
-                    yield lines[index]
-        # Don't yield None if the file was empty
-        if segment is not None:
-            yield segment
+    with open(filename, 'rb') as fh:
+        # An empty file can not be memory-mapped, and does not have any lines.
+        if os.fstat(fh.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            while end > 0:
+                # The first line of each buffer is probably not a complete line, so start the buffer after its first newline.
+                # Splitting only at newlines means multibyte characters are never split between buffers.
+                start = max(0, end - buf_size)
+                if start > 0:
+                    newline_index = mm.rfind(b'\n', 0, start)
+                    start = newline_index + 1
+                lines = mm[start:end].decode(errors='replace').split('\n')
+                for index in range(len(lines) - 1, -1, -1):
+                    line = lines[index].rstrip('\r')
+                    if line:
+                        yield line
+                end = start - 1
+
+def reverse_line_positions(mm):
+    """
+    A generator that returns the start and end positions of each non-blank line in a memory-mapped file, in reverse order.
+
+    Parameters
+    ----------
+    mm : mmap.mmap
+        This is the memory-mapped file.
+
+    Returns
+    -------
+    Returns the start and end positions of each non-blank line, not including the newline (and carriage return) at the end of the line.
+    """
+    end = len(mm)
+    while end > 0:
+        start = mm.rfind(b'\n', 0, end) + 1
+        line_end = end
+        if (line_end > start) and (mm[line_end-1] == ord('\r')):
+            line_end -= 1
+        if line_end > start:
+            yield start, line_end
+        end = start - 1
+
+def is_keyword_in_last_lines(filename, keyword, number_of_lines):
+    """
+    This method is designed to determine if a keyword is found in the last few non-blank lines of a file, without reading the rest of the file. 
+
+    Parameters
+    ----------
+    filename : str
+        This is the path to the file you want to read.
+    keyword : str
+        This is the keyword to look for, such as "Normal termination of Gaussian".
+    number_of_lines : int
+        This is the number of non-blank lines at the end of the file to look through for the keyword.
+
+    Returns
+    -------
+    True if the keyword is found in the last number_of_lines non-blank lines of the file, otherwise False.
+    """
+    with open(filename, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # First, find where the last number_of_lines non-blank lines begin. 
+            start_of_last_lines = len(mm)
+            for line_number, (start, end) in enumerate(reverse_line_positions(mm), 1):
+                start_of_last_lines = start
+                if line_number >= number_of_lines:
+                    break
+            # Second, look for the keyword in these lines.
+            return mm.rfind(keyword.encode(), start_of_last_lines) != -1
 
 # -----------------------------------------------------------------
 
@@ -5,7 +5,7 @@ This script contains methods for processing_OPV_Dimer_data.py
 
 '''
 import os
-from ReJig.ReJig_Programs.shared_general_methods.shared_general_methods import get_lastline, reverse_readline
+from ReJig.ReJig_Programs.shared_general_methods.shared_general_methods import get_lastline, reverse_readline, is_keyword_in_last_lines
 
 # -------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -24,20 +24,9 @@ def did_orca_job_complete(out_filepath):
     """
     did_orca_job_terminate_normally = False
 
+    # If not found the termination signal in the last line and the 100 lines before it, the job probably did not terminate properly
     if os.path.exists(out_filepath):
-        counter = 0
-        for line in reverse_readline(out_filepath):
-            # Check if the ORCA file has terminated normally
-            if 'ORCA TERMINATED NORMALLY' in line:
-                did_orca_job_terminate_normally = True
-            # If not found the termination signal after 20 lines from the end of file, 
-            # the job probably did not terminate properly
-            if counter >= 100 and not did_orca_job_terminate_normally:
-                break
-            # If these tags are true, finish
-            if did_orca_job_terminate_normally:
-                break
-            counter += 1
+        did_orca_job_terminate_normally = is_keyword_in_last_lines(out_filepath, 'ORCA TERMINATED NORMALLY', 101)
 
     return did_orca_job_terminate_normally
 
@@ -3,25 +3,16 @@ Reconstruct.py, Geoffrey Weal, 30/4/24
 
 This module is designed to reconstruct the crystal, where the geometrically relaxed molecules have replaced their non-relaxed counterparts in the crystal.
 """
-import os, sys, shutil, traceback
+import os
 from tqdm import tqdm
-import numpy as np
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from ase.io import read, write
-from ase.visualize import view
-from ase.constraints import FixAtoms
-
-from SUMELF import read_crystal
-from SUMELF import obtain_graph, process_crystal
-from SUMELF import make_crystal
 from SUMELF import remove_folder, make_folder
-from SUMELF import add_graph_to_ASE_Atoms_object
 
-from ReJig.Utilities.make_SolventsList      import make_SolventsList
-from ReJig.Utilities.check_molecules        import check_molecules
-from ReJig.Utilities.utilities              import get__added_or_modified__values
-from ReJig.ReJig_Programs.Did_Complete_Main import Did_Complete_Main
+from ReJig.Reconstruct.reconstruct_crystal  import reconstruct_crystal
+from ReJig.Reconstruct.reconstruct_manifest import reconstruct_manifest_filename, get_crystal_fingerprint, read_reconstruct_manifest, write_reconstruct_manifest
+from ReJig.Reconstruct.reconstruct_manifest import remove_reconstructed_files, remove_temporary_folders
+from ReJig.Reconstruct.trajectory_store     import TrajectoryStoreWriter
 from ReJig.Reconstruct.print_final_message  import print_final_message
 
 class CLICommand:
@@ -32,6 +23,11 @@ class CLICommand:
 	def add_arguments(parser):
 		parser.add_argument('--ReJig_dirpath',        nargs=1, help='This is the folder containing the ReJig files.', default=['rejigged_crystals'])
 		parser.add_argument('--process_all_crystals', nargs=1, help='This indicates if you want to process all crystal data, even for jobs that have not converged. Any jobs that have not begun will not be processed weither this tag is set to True or False.', default=['False'])
+		parser.add_argument('--use_cache',            nargs=1, help='This indicates if you want to reuse the molecules and graphs of crystals from previous runs, saved in the "ReJig_dirpath"_cache folder.', default=['True'])
+		parser.add_argument('--incremental',          nargs=1, help='This indicates if you only want to reconstruct crystals whose jobs have changed since ReJig reconstruct was last run. The files of other crystals are kept as they are.', default=['False'])
+		parser.add_argument('--workers',              nargs=1, help='This is the number of processes to use to reconstruct crystals at the same time.', default=['1'])
+		parser.add_argument('--log_workers',          nargs=1, help='This is the number of threads to use to check the geometric optimisation jobs of each crystal at the same time. Using 16 to 32 threads can make checking jobs much faster on network filesystems.', default=['1'])
+		parser.add_argument('--trajectory_format',    nargs=1, help='This is the format to save the geometric optimisation trajectories of the rejigged molecules in. This is either "xyz" (a _traj.xyz file for each molecule) or "hdf5" (one compressed "ReJig_dirpath"_reconstructed_molecules_trajectory.h5 file for all molecules, which needs h5py).', default=['xyz'])
 
 	@staticmethod
 	def run(arguments):
@@ -54,10 +50,45 @@ class CLICommand:
 		else:
 			raise Exception('Error: The value for "--process_all_crystals" must be either "True" or "False".')
 
-		# Third, run the reconstruct method
-		Run_method(rejig_dirpath=rejig_dirpath, process_all_crystals=process_all_crystals)
+		# Third, obtain the tag that indicates if you want to use the cache of processed crystals. 
+		use_cache = str(arguments.use_cache[0]).lower()
+		if   use_cache in ['t', 'true']:
+			use_cache = True
+		elif use_cache in ['f', 'false']:
+			use_cache = False
+		else:
+			raise Exception('Error: The value for "--use_cache" must be either "True" or "False".')
+
+		# Fourth, obtain the number of threads to use to check the geometric optimisation jobs.
+		try:
+			log_workers = int(arguments.log_workers[0])
+		except ValueError:
+			raise Exception(f'Error: The value for "--log_workers" must be an integer. --log_workers = {arguments.log_workers[0]}')
+
+		# Fifth, obtain the number of processes to use to reconstruct crystals.
+		try:
+			workers = int(arguments.workers[0])
+		except ValueError:
+			raise Exception(f'Error: The value for "--workers" must be an integer. --workers = {arguments.workers[0]}')
+
+		# Sixth, obtain the tag that indicates if you only want to reconstruct crystals whose jobs have changed. 
+		incremental = str(arguments.incremental[0]).lower()
+		if   incremental in ['t', 'true']:
+			incremental = True
+		elif incremental in ['f', 'false']:
+			incremental = False
+		else:
+			raise Exception('Error: The value for "--incremental" must be either "True" or "False".')
+
+		# Seventh, obtain the format to save the geometric optimisation trajectories in.
+		trajectory_format = str(arguments.trajectory_format[0]).lower()
+		if trajectory_format not in ['xyz', 'hdf5']:
+			raise Exception(f'Error: The value for "--trajectory_format" must be either "xyz" or "hdf5". --trajectory_format = {arguments.trajectory_format[0]}')
 
-def Run_method(rejig_dirpath='rejigged_crystals', process_all_crystals=False):
+		# Eighth, run the reconstruct method
+		Run_method(rejig_dirpath=rejig_dirpath, process_all_crystals=process_all_crystals, use_cache=use_cache, log_workers=log_workers, workers=workers, incremental=incremental, trajectory_format=trajectory_format)
+
+def Run_method(rejig_dirpath='rejigged_crystals', process_all_crystals=False, use_cache=True, log_workers=1, workers=1, incremental=False, trajectory_format='xyz'):
 	"""
 	This module is designed to reconstruct the crystal, where the geometrically relaxed molecules have replaced their non-relaxed counterparts in the crystal.
 
@@ -67,193 +98,197 @@ def Run_method(rejig_dirpath='rejigged_crystals', process_all_crystals=False):
 		This is the folder that contains the crystals that have been rejigged using Gaussian/ORCA. 
 	process_all_crystals : bool.
 		This boolean indicates if you want to process all crystals, even if they have not converged yet. Any crystals that have not begun being processed by Gaussian/ORCA will not be processed if this tag is True or False. 
+	use_cache : bool.
+		This boolean indicates if you want to reuse the molecules and graphs of crystals from previous runs. These are saved in the rejig_dirpath+'_cache' folder. Default: True
+	log_workers : int.
+		This is the number of threads to use to check the geometric optimisation jobs of each crystal at the same time. Default: 1
+	workers : int.
+		This is the number of processes to use to reconstruct crystals at the same time. If 1, each crystal will be reconstructed one after the other in this process. Default: 1
+	incremental : bool.
+		This boolean indicates if you only want to reconstruct crystals whose jobs have changed since ``ReJig reconstruct`` was last run. If False, all crystals are reconstructed from scratch. Default: False
+	trajectory_format : str.
+		This is the format to save the geometric optimisation trajectories of the rejigged molecules in. If 'xyz', a _traj.xyz file is saved for each rejigged molecule in the rejig_dirpath+'_reconstructed_molecules_trajectory' folder. If 'hdf5', the trajectories of all rejigged molecules are saved in the rejig_dirpath+'_reconstructed_molecules_trajectory.h5' file, which can be read with ReJig.TrajectoryStore. Default: 'xyz'
 	"""
 
 	# First, check that rejig_folder exists
 	if not os.path.exists(rejig_dirpath):
 		raise Exception(f'Error: Could not find {rejig_dirpath}')
 
-	# Second, get the path to the folder to save reconstructed crystals to.
+	# Second, check that workers is a positive integer.
+	if not (isinstance(workers, int) and (workers >= 1)):
+		raise Exception(f'Error: workers must be an integer greater than or equal to 1. workers = {workers}')
+
+	# Third, check that trajectory_format is a format that trajectories can be saved in.
+	if trajectory_format not in ['xyz', 'hdf5']:
+		raise Exception(f'Error: trajectory_format must be either "xyz" or "hdf5". trajectory_format = {trajectory_format}')
+
+	# Fourth, get the path to the folder to save reconstructed crystals to.
 	save_reconstructed_crystals_dirpath = rejig_dirpath + '_reconstructed'
 
-	# Third, get the path to the folder to save reconstructed crystals to.
+	# Fifth, get the path to the folder to save reconstructed crystals to.
 	save_reconstructed_molecules_dirpath = rejig_dirpath + '_reconstructed_molecules'
 
-	# Fourth, get the path to the folder containing all the trajectory files
+	# Sixth, get the path to the folder containing all the trajectory files
 	save_reconstructed_molecules_trajectory_dirpath = rejig_dirpath + '_reconstructed_molecules_trajectory'
 
-	# Fifth, remove all previous runs of the ``ReJig reconstruct`` module.
-	remove_folder(save_reconstructed_crystals_dirpath)
-	remove_folder(save_reconstructed_molecules_dirpath)
-	remove_folder(save_reconstructed_molecules_trajectory_dirpath)
-
-	# Sixth, make the folder to save geoemtric optimisation trajcetory files to. 
-	make_folder(save_reconstructed_molecules_trajectory_dirpath)
-
-	# Seventh, initalise a list to store any crystals have have not been reconstructed yet
-	#         * this is because molecules to be rejigged have not been geometrically optimised completely yet. 
-	crystals_not_reconstructed_yet = []
-
-	# Eighth, initialise a progress bar for reconstructing the crystals that have been rejigged. 
-	pbar = tqdm(sorted(os.listdir(rejig_dirpath)), desc='Reconstructing Crystals', unit='crystal')
-
-	# Ninth, for each crystal in the rejig_dirpath folder:
-	for crystal_name in pbar:
-
-		# Tenth, get the path into the crystal folder.
-		dirpath = rejig_dirpath+'/'+crystal_name
-
-		# Eleventh, check that that you are inspecting is a folder.
-		if not os.path.isdir(dirpath):
-			continue
-
-		# Twelfth, get the filepath to the crystal to rejig.
-		filepath = dirpath+'/'+crystal_name+'.xyz'
-
-		# Thirteenth, get the name of the identifier for this crystal. 
-		crystal_identifier = crystal_name.split()[0]
-
-		# Fourteenth, write the crystal identifier to the progress bar. 
-		pbar.set_description(str(crystal_identifier))
-
-		# Fifteenth, load the ase.Atoms object of the crystal. 
-		crystal = read_crystal(filepath)
-
-		# Sixteenth, make sure that the periodic boundary condition setting for this crystal object is True. 
-		crystal.set_pbc(True)
-
-		# Seventeenth, get the graph of the crystal.
-		crystal, crystal_graph = obtain_graph(crystal,name='crystal')
-
-		# Eighteenth, get the molecules and the graphs associated with each molecule in the crystal.
-		molecules, molecule_graphs, SolventsList, symmetry_operations, cell = process_crystal(crystal,crystal_graph=crystal_graph,take_shortest_distance=True,return_list=False,logger=None,print_progress=False)
-		
-		# Ninteenth, determine the solvents in the crystal
-		solvent_components = list(make_SolventsList(crystal.info['SolventsList'])) if ('SolventsList' in crystal.info) else []
-
-		# Twentieth, check to make sure the molecules are all good.
-		molecules, molecule_graphs, solvent_components = check_molecules(molecules, molecule_graphs, solvent_components)
-
-		# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
-
-		# Twenty-first, get the paths to the molecules that have been rejigged, and get the lists of any molecules
-		#               that have not geometrically relaxed or not begun. 
-		opt_jobs_finished_successfully, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun = Did_Complete_Main(dirpath+'/'+'rejig_molecules', print_progress=False)
-
-		# Twenty-second, determine if there are any crystals that have molecules that have not begun optimisation. 
-		if len(opt_jobs_not_begun) > 0:
-			crystals_not_reconstructed_yet.append((crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun))
-			continue
-
-		# Twenty-third, determine if there are any incomplete geometric optimisations, and if so dont reconstruct this 
-		#               crystal yet as there are more calculations that we are waiting to complete. 
-		#               * If `process_all_crystals` is True, ignore this step.
-		if (not process_all_crystals) and (len(opt_jobs_finished_unsuccessfully) > 0):
-			crystals_not_reconstructed_yet.append((crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun))
-			continue
-
-		# Twenty-fourth, determine if this crystal needs rejigging.
-		if len(opt_jobs_finished_successfully) == 0:
-
-			# 24.1: No rejigging is need, so return False
-			pbar.set_description(f'There are no atoms in crystal {crystal_identifier} that need to be rejigged')
-			continue
-
-		# Twenty-fifth, indicate that this molecule will have file created for rejigging.
-		pbar.set_description(f'There are atoms in crystal {crystal_identifier} to be rejigged')
-		pbar.set_description(f'Will reconstruct the crystal: {crystal_identifier}')
+	# Seventh, get the path to the file containing all the trajectories, if trajectories are being saved in the hdf5 format.
+	trajectory_store_filepath = rejig_dirpath + '_reconstructed_molecules_trajectory.h5'
 
-		# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
+	# Eighth, remove all previous runs of the ``ReJig reconstruct`` module, unless you only want to reconstruct crystals whose jobs have changed.
+	if not incremental:
+		remove_folder(save_reconstructed_crystals_dirpath)
+		remove_folder(save_reconstructed_molecules_dirpath)
+		remove_folder(save_reconstructed_molecules_trajectory_dirpath)
+		if os.path.exists(trajectory_store_filepath):
+			os.remove(trajectory_store_filepath)
 
-		# Twenty-sixth, initialise a list for containing the rejigged molecules.
-		rejigged_molecules_list = []
-
-		# Twenty-seventh, initialise a dictionary for holding information about the optimisation trajectory of the optimised molecules
-		all_molecule_optimisation_trajectories = {}
-
-		# Twenty-eighth, for each rejigged molecule in opt_jobs_finished_successfully.
-		for path_to_rejigged_molecule in opt_jobs_finished_successfully:
-
-			# 28.1: Get the name of the regigged molecule.
-			molecule_name = int(path_to_rejigged_molecule.split('/')[-2].replace('S',''))
-
-			# 28.2: Check that molecule_name is not already in rejigged_molecules_list. 
-			#       * If so, there are two of the same molecule in opt_jobs_finished_successfully.
-			#       * This should not a problem and should be reported. 
-			if molecule_name is rejigged_molecules_list:
-				raise Exception('molecule_name already is rejigged_molecules_list?')
-
-			# 28.3: Obtain the functional and basis set that was being used to optimise the structure. 
-			functional_and_basis_set = path_to_rejigged_molecule.split('/')[-1]
-
-			# 28.4: Obtain the rejigged molecule from Gaussian/ORCA.
-			rejigged_molecule = read(path_to_rejigged_molecule+'/rejig_opt.log', index=-1)
-
-			# 28.5: Update the position of the atoms in molecule_name to the rejigged version.  
-			molecules[molecule_name].set_positions(rejigged_molecule.get_positions())
-
-			# 28.6: Obtain the optimisation trajectory for the molecule. 
-			full_optimisation_trajectory = read(path_to_rejigged_molecule+'/rejig_opt.log', index=':')
-
-			# 28.7: Add the optimisation trajectory for this molecule to the all_molecule_optimisation_trajectories dictionary. 
-			all_molecule_optimisation_trajectories[molecule_name] = full_optimisation_trajectory
-
-			# 28.8: Add name of rejigged molecule to rejigged_molecules_list.
-			rejigged_molecules_list.append(molecule_name)
-
-		# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
-
-		# Twenty-ninth, make the folder for containing the reconstructed crystals. 
-		make_folder(save_reconstructed_crystals_dirpath)
-
-		# Thirtieth, create the updated crystal.
-		crystal, crystal_graph = make_crystal(molecules, symmetry_operations, cell, wrap=False, solvent_components=SolventsList, remove_solvent=False, molecule_graphs=molecule_graphs, return_all_molecules=False)
+	# Ninth, make the folders to save reconstructed crystals, molecules, and geoemtric optimisation trajcetory files to. 
+	make_folder(save_reconstructed_crystals_dirpath)
+	make_folder(save_reconstructed_molecules_dirpath)
+	make_folder(save_reconstructed_molecules_trajectory_dirpath)
 
-		# Thirty-first, add the node and edge information from the molecules graph back to the molecule
-		add_graph_to_ASE_Atoms_object(crystal, crystal_graph)
+	# Tenth, remove any temporary folders left over from a previous run that was stopped part way through.
+	remove_temporary_folders(save_reconstructed_crystals_dirpath)
 
-		# Thirty-second, have the updated crystal as a xyz file to the repaired_crystal_database folder. 
-		write(save_reconstructed_crystals_dirpath+'/'+crystal_name+'.xyz', crystal)
+	# Eleventh, get the path to the folder that caches the molecules and graphs of each crystal.
+	cache_dirpath = (rejig_dirpath + '_cache') if use_cache else None
 
-		# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
+	# Twelfth, initalise a list to store any crystals have have not been reconstructed yet
+	#         * this is because molecules to be rejigged have not been geometrically optimised completely yet. 
+	crystals_not_reconstructed_yet = []
 
-		# Thirty-third, write the path to save the reconstructed (and original) molecules to for this crystal. 
-		path_to_reconstructed_crystal_molecules = save_reconstructed_molecules_dirpath+'/'+crystal_name
+	# Thirteenth, obtain the names of the crystals in the rejig_dirpath folder.
+	crystal_names = [crystal_name for crystal_name in sorted(os.listdir(rejig_dirpath)) if os.path.isdir(rejig_dirpath+'/'+crystal_name)]
+
+	# Fourteenth, obtain the fingerprints of the files that each crystal is reconstructed from.
+	crystal_fingerprints = {crystal_name: get_crystal_fingerprint(rejig_dirpath+'/'+crystal_name, process_all_crystals, trajectory_format) for crystal_name in crystal_names}
+
+	# Fifteenth, obtain the manifest from the last time ``ReJig reconstruct`` was run, if you only want to reconstruct crystals whose jobs have changed.
+	manifest_filepath = save_reconstructed_crystals_dirpath+'/'+reconstruct_manifest_filename
+	previous_manifest = read_reconstruct_manifest(manifest_filepath) if incremental else {}
+
+	# Sixteenth, determine which crystals need to be reconstructed. 
+	#             * Crystals whose files have not changed are kept as they are, and the files of crystals that have changed or been removed are removed.
+	manifest = {}
+	crystal_names_to_reconstruct = []
+	for crystal_name in crystal_names:
+		record = previous_manifest.get(crystal_name, None)
+		if (record is not None) and (record['fingerprint'] == crystal_fingerprints[crystal_name]):
+			manifest[crystal_name] = record
+			if record['not_reconstructed'] is not None:
+				crystals_not_reconstructed_yet.append(record['not_reconstructed'])
+		else:
+			crystal_names_to_reconstruct.append(crystal_name)
+	crystal_names_to_remove = crystal_names_to_reconstruct + sorted(set(previous_manifest.keys()) - set(crystal_names))
+	if incremental:
+		trajectory_filenames = os.listdir(save_reconstructed_molecules_trajectory_dirpath)
+		for crystal_name in crystal_names_to_remove:
+			remove_reconstructed_files(crystal_name, save_reconstructed_crystals_dirpath, save_reconstructed_molecules_dirpath, save_reconstructed_molecules_trajectory_dirpath, trajectory_filenames=trajectory_filenames)
+		print(f'Number of crystals that have not changed since ReJig reconstruct was last run: {len(manifest)}')
+		print(f'Number of crystals to reconstruct: {len(crystal_names_to_reconstruct)}')
+
+	# Seventeenth, obtain the inputs to give to each crystal.
+	tasks = [(crystal_name, rejig_dirpath, save_reconstructed_crystals_dirpath, save_reconstructed_molecules_dirpath, save_reconstructed_molecules_trajectory_dirpath, process_all_crystals, cache_dirpath, log_workers, trajectory_format) for crystal_name in crystal_names_to_reconstruct]
+
+	# Eighteenth, if trajectories are being saved in the hdf5 format, open the file containing all the trajectories, and remove the trajectories
+	#            of any crystals that have changed or been removed.
+	trajectory_store = None
+	if trajectory_format == 'hdf5':
+		trajectory_store = TrajectoryStoreWriter(trajectory_store_filepath, mode='a')
+		for crystal_name in crystal_names_to_remove:
+			trajectory_store.remove_crystal(crystal_name)
+
+	# Ninteenth, initialise a progress bar for reconstructing the crystals that have been rejigged. 
+	pbar = tqdm(total=len(tasks), desc='Reconstructing Crystals', unit='crystal')
+
+	# Twentieth, reconstruct each crystal in the rejig_dirpath folder.
+	#            * The manifest is written even if an error occurs, so that crystals that have been reconstructed do not need to be reconstructed again.
+	try:
+		if workers == 1:
+
+			# 20.1: Reconstruct each crystal one after the other in this process.
+			for task in tasks:
+				pbar.set_description(str(task[0].split()[0]))
+				description, crystal_not_reconstructed_yet = run_reconstruct_crystal_task(task)
+				record_reconstruct_crystal_result(task[0], description, crystal_not_reconstructed_yet, crystals_not_reconstructed_yet, manifest, crystal_fingerprints, pbar, trajectory_store, save_reconstructed_molecules_trajectory_dirpath)
 
-		# Thirty-fourth, make the folder for containing the reconstructed crystals. 
-		make_folder(path_to_reconstructed_crystal_molecules)
+		else:
 
-		# Thirty-fifth, create the original xyz file for the molecules in this crystal. 
-		for molecule_name in sorted(molecules.keys()):
+			# 20.2: Reconstruct the crystals in a pool of processes.
+			with ProcessPoolExecutor(max_workers=workers) as executor:
+				futures = {executor.submit(run_reconstruct_crystal_task, task): task[0] for task in tasks}
+				for future in as_completed(futures):
+					description, crystal_not_reconstructed_yet = future.result()
+					record_reconstruct_crystal_result(futures[future], description, crystal_not_reconstructed_yet, crystals_not_reconstructed_yet, manifest, crystal_fingerprints, pbar, trajectory_store, save_reconstructed_molecules_trajectory_dirpath)
 
-			# 35.1: Obtain the molecule.
-			molecule = molecules[molecule_name].copy()
+	finally:
 
-			# 35.2: Obtain the associated graph for the molecule. 
-			molecule_graph = deepcopy(molecule_graphs[molecule_name])
+		# 20.3: Close the progress bar.
+		pbar.close()
 
-			# 35.3: Add the node and edge information from the molecules graph back to the molecule
-			add_graph_to_ASE_Atoms_object(molecule, deepcopy(molecule_graph))
+		# 20.4: Close the file containing all the trajectories.
+		if trajectory_store is not None:
+			trajectory_store.close()
 
-			# 35.4: Obtain the solvent tag for this molecule (determining if it is a solvent or not). 
-			solvent_tag = 'S' if molecule_name in solvent_components else ''
+		# 20.5: Save the manifest.
+		write_reconstruct_manifest(manifest_filepath, manifest)
 
-			# 35.5: Save molecule to disk.
-			write(path_to_reconstructed_crystal_molecules+'/'+str(molecule_name)+str(solvent_tag)+'.xyz', molecule)
+	# Twenty-first, print all the crystals that were not reconstructed, and the reasons. 
+	print_final_message(crystals_not_reconstructed_yet, rejig_dirpath)
 
-			# 35.6: If this molecule has been rejigged, write the trajectory of the geometric optimisation for this molecule to disk.
-			if molecule_name in rejigged_molecules_list:
+# --------------------------------------------------------------------------------------------------------------
 
-				# 35.6.1: Obtain the trajectory for the optimisation process for this molecule
-				molecule_optimisation_trajectory = all_molecule_optimisation_trajectories[molecule_name]
+def run_reconstruct_crystal_task(task):
+	"""
+	This method will reconstruct one crystal. This is given to each process when reconstructing crystals at the same time.
 
-				# 35.6.2: Save the optimisation trajectory for this molecule to disk.
-				write(save_reconstructed_molecules_trajectory_dirpath+'/'+crystal_name+'_'+str(molecule_name)+str(solvent_tag)+'_traj.xyz', molecule_optimisation_trajectory)
+	Parameters
+	----------
+	task : tuple
+		This contains the inputs for the reconstruct_crystal method for this crystal.
+
+	Returns
+	-------
+	description : str.
+		This is a description of what was done with this crystal, for writing to the progress bar.
+	crystal_not_reconstructed_yet : tuple or None
+		This is the (crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun) of this crystal if it was not reconstructed yet, otherwise None.
+	"""
+	return reconstruct_crystal(*task)
 
-		# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - 
+def record_reconstruct_crystal_result(crystal_name, description, crystal_not_reconstructed_yet, crystals_not_reconstructed_yet, manifest, crystal_fingerprints, pbar, trajectory_store=None, save_reconstructed_molecules_trajectory_dirpath=None):
+	"""
+	This method will record the result of reconstructing a crystal.
 
-	# Thirty-sixth, print all the crystals that were not reconstructed, and the reasons. 
-	print_final_message(crystals_not_reconstructed_yet, rejig_dirpath)
+	Parameters
+	----------
+	crystal_name : str.
+		This is the name of the crystal.
+	description : str.
+		This is a description of what was done with this crystal, for writing to the progress bar.
+	crystal_not_reconstructed_yet : tuple or None
+		This is the (crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun) of this crystal if it was not reconstructed yet, otherwise None.
+	crystals_not_reconstructed_yet : list
+		This is the list of all the crystals that have not been reconstructed yet. 
+	manifest : dict.
+		This is the manifest to record the result of this crystal to.
+	crystal_fingerprints : dict.
+		These are the fingerprints of the files that each crystal is reconstructed from.
+	pbar : tqdm
+		This is the progress bar.
+	trajectory_store : TrajectoryStoreWriter or None
+		This is the file containing all the trajectories, if trajectories are being saved in the hdf5 format. The hdf5 file written for this crystal is merged into it. Default: None
+	save_reconstructed_molecules_trajectory_dirpath : str. or None
+		This is the folder that the hdf5 file for this crystal was saved to. Default: None
+	"""
+	if trajectory_store is not None:
+		shard_filepath = save_reconstructed_molecules_trajectory_dirpath+'/'+crystal_name+'.h5'
+		if os.path.exists(shard_filepath):
+			trajectory_store.merge_shard(shard_filepath)
+	if crystal_not_reconstructed_yet is not None:
+		crystals_not_reconstructed_yet.append(crystal_not_reconstructed_yet)
+	manifest[crystal_name] = {'fingerprint': crystal_fingerprints[crystal_name], 'not_reconstructed': crystal_not_reconstructed_yet}
+	pbar.set_description(description)
+	pbar.update(1)
 
 # --------------------------------------------------------------------------------------------------------------
-
@@ -0,0 +1,234 @@
+"""
+reconstruct_crystal.py, Geoffrey Weal, 18/10/26
+
+This method is designed to reconstruct one crystal, where the geometrically relaxed molecules have replaced their non-relaxed counterparts in the crystal.
+"""
+import os, shutil, tempfile
+
+from ReJig import check_ase_version
+check_ase_version()
+
+from ase.io import write
+
+from SUMELF import make_crystal
+from SUMELF import add_graph_to_ASE_Atoms_object
+
+from ReJig.Utilities.crystal_cache                              import read_and_process_crystal
+from ReJig.Utilities.check_molecules                            import check_molecules
+from ReJig.Utilities.utilities                                  import read_only_graph
+from ReJig.ReJig_Programs.Did_Complete_Main                     import Did_Complete_Main
+from ReJig.ReJig_Programs.Did_Complete_Main_methods.status_index import status_index_filename
+from ReJig.ReJig_Programs.shared_general_methods.gaussian_opt_log_analyser import analyse_gaussian_opt_log
+from ReJig.Reconstruct.trajectory_store                         import TrajectoryStoreWriter
+
+def reconstruct_crystal(crystal_name, rejig_dirpath, save_reconstructed_crystals_dirpath, save_reconstructed_molecules_dirpath, save_reconstructed_molecules_trajectory_dirpath, process_all_crystals=False, cache_dirpath=None, log_workers=1, trajectory_format='xyz'):
+	"""
+	This method is designed to reconstruct one crystal, where the geometrically relaxed molecules have replaced their non-relaxed counterparts in the crystal.
+
+	The files for this crystal are first written to a temporary folder, and are then renamed into place. This means that a
+	crystal's files are never left half written if ``ReJig reconstruct`` is stopped, and that many crystals can be
+	reconstructed at the same time.
+
+	Parameters
+	----------
+	crystal_name : str.
+		This is the name of the crystal folder in rejig_dirpath.
+	rejig_dirpath : str.
+		This is the folder that contains the crystals that have been rejigged using Gaussian/ORCA.
+	save_reconstructed_crystals_dirpath : str.
+		This is the folder to save the reconstructed crystal to.
+	save_reconstructed_molecules_dirpath : str.
+		This is the folder to save the reconstructed molecules of this crystal to.
+	save_reconstructed_molecules_trajectory_dirpath : str.
+		This is the folder to save the geometric optimisation trajectories of the rejigged molecules to.
+	process_all_crystals : bool.
+		This boolean indicates if you want to process this crystal, even if its molecules have not converged yet. Default: False
+	cache_dirpath : str. or None
+		This is the folder that caches the molecules and graphs of each crystal. If None, the cache is not used. Default: None
+	log_workers : int.
+		This is the number of threads to use to check the geometric optimisation jobs of this crystal at the same time. Default: 1
+	trajectory_format : str.
+		This is the format to save the geometric optimisation trajectories in. If 'xyz', a "crystal_name"_"molecule_name"_traj.xyz file is written for each rejigged molecule. If 'hdf5', the trajectories of all the rejigged molecules are written to a "crystal_name".h5 file, to be merged into the trajectory store for all crystals. Default: 'xyz'
+
+	Returns
+	-------
+	description : str.
+		This is a description of what was done with this crystal, for writing to the progress bar.
+	crystal_not_reconstructed_yet : tuple or None
+		This is the (crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun) of this crystal if it was not reconstructed yet, otherwise None.
+	"""
+
+	# First, get the path into the crystal folder.
+	dirpath = rejig_dirpath+'/'+crystal_name
+
+	# Second, get the filepath to the crystal to rejig.
+	filepath = dirpath+'/'+crystal_name+'.xyz'
+
+	# Third, get the name of the identifier for this crystal.
+	crystal_identifier = crystal_name.split()[0]
+
+	# Fourth, obtain the molecules and the graphs associated with each molecule in the crystal, as well as the solvents in the crystal.
+	#         * If cache_dirpath is given, these are reused from previous runs if this crystal file has not changed.
+	molecules, molecule_graphs, SolventsList, symmetry_operations, cell, solvent_components = read_and_process_crystal(filepath, cache_dirpath=cache_dirpath, print_progress=False)
+
+	# Fifth, check to make sure the molecules are all good.
+	molecules, molecule_graphs, solvent_components = check_molecules(molecules, molecule_graphs, solvent_components)
+
+	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+	# Sixth, get the paths to the molecules that have been rejigged, and get the lists of any molecules
+	#        that have not geometrically relaxed or not begun.
+	opt_jobs_finished_successfully, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun = Did_Complete_Main(dirpath+'/'+'rejig_molecules', print_progress=False, status_index_filepath=rejig_dirpath+'/'+status_index_filename, workers=log_workers)
+
+	# Seventh, determine if there are any crystals that have molecules that have not begun optimisation.
+	if len(opt_jobs_not_begun) > 0:
+		return f'Crystal {crystal_identifier} has molecules that have not begun being optimised', (crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun)
+
+	# Eighth, determine if there are any incomplete geometric optimisations, and if so dont reconstruct this
+	#         crystal yet as there are more calculations that we are waiting to complete.
+	#         * If `process_all_crystals` is True, ignore this step.
+	if (not process_all_crystals) and (len(opt_jobs_finished_unsuccessfully) > 0):
+		return f'Crystal {crystal_identifier} has molecules that have not finished being optimised', (crystal_identifier, opt_jobs_finished_unsuccessfully, opt_jobs_not_begun)
+
+	# Ninth, determine if this crystal needs rejigging.
+	if len(opt_jobs_finished_successfully) == 0:
+
+		# 9.1: No rejigging is need, so return.
+		return f'There are no atoms in crystal {crystal_identifier} that need to be rejigged', None
+
+	# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+	# Tenth, make a temporary folder to write the files for this crystal to.
+	#        * This is placed in save_reconstructed_crystals_dirpath so that it is on the same filesystem as the final files,
+	#          which means the files can be renamed into place.
+	temporary_dirpath = tempfile.mkdtemp(prefix='.'+crystal_name+'_', dir=save_reconstructed_crystals_dirpath)
+	temporary_molecules_dirpath    = temporary_dirpath+'/molecules'
+	temporary_trajectories_dirpath = temporary_dirpath+'/trajectories'
+	os.makedirs(temporary_molecules_dirpath)
+	os.makedirs(temporary_trajectories_dirpath)
+
+	# Eleventh, if trajectories are being saved in the hdf5 format, open the hdf5 file to write the trajectories of this crystal to.
+	trajectory_store = TrajectoryStoreWriter(temporary_trajectories_dirpath+'/'+crystal_name+'.h5') if (trajectory_format == 'hdf5') else None
+
+	try:
+
+		# Twelfth, initialise a list for containing the rejigged molecules.
+		rejigged_molecules_list = []
+
+		# Thirteenth, for each rejigged molecule in opt_jobs_finished_successfully.
+		for path_to_rejigged_molecule in opt_jobs_finished_successfully:
+
+			# 13.1: Get the name of the regigged molecule.
+			molecule_name = int(path_to_rejigged_molecule.split('/')[-2].replace('S',''))
+
+			# 13.2: Check that molecule_name is not already in rejigged_molecules_list.
+			#       * If so, there are two of the same molecule in opt_jobs_finished_successfully.
+			#       * This should not a problem and should be reported.
+			if molecule_name is rejigged_molecules_list:
+				raise Exception('molecule_name already is rejigged_molecules_list?')
+
+			# 13.3: Obtain the functional and basis set that was being used to optimise the structure.
+			functional_and_basis_set = path_to_rejigged_molecule.split('/')[-1]
+
+			# 13.4: Obtain the solvent tag for this molecule (determining if it is a solvent or not).
+			solvent_tag = 'S' if molecule_name in solvent_components else ''
+
+			# 13.5: Read through the log file once, writing each structure of the optimisation trajectory to the temporary folder as it is read.
+			#       * This means that the trajectory does not need to be held in memory. 
+			if trajectory_store is not None:
+				summary = analyse_gaussian_opt_log(path_to_rejigged_molecule+'/rejig_opt.log', on_frame=lambda frame: trajectory_store.add_frame(crystal_name, str(molecule_name)+str(solvent_tag), frame))
+			else:
+				with open(temporary_trajectories_dirpath+'/'+crystal_name+'_'+str(molecule_name)+str(solvent_tag)+'_traj.xyz', 'w') as trajectoryXYZ:
+					summary = analyse_gaussian_opt_log(path_to_rejigged_molecule+'/rejig_opt.log', on_frame=lambda frame: write(trajectoryXYZ, frame, format='extxyz'))
+
+			# 13.6: Obtain the rejigged molecule from Gaussian/ORCA.
+			rejigged_molecule = summary.final_image
+
+			# 13.7: Update the position of the atoms in molecule_name to the rejigged version.
+			molecules[molecule_name].set_positions(rejigged_molecule.get_positions())
+
+			# 13.8: Add name of rejigged molecule to rejigged_molecules_list.
+			rejigged_molecules_list.append(molecule_name)
+
+		# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+		# Fourteenth, create the updated crystal.
+		crystal, crystal_graph = make_crystal(molecules, symmetry_operations, cell, wrap=False, solvent_components=SolventsList, remove_solvent=False, molecule_graphs=molecule_graphs, return_all_molecules=False)
+
+		# Fifteenth, add the node and edge information from the molecules graph back to the molecule
+		add_graph_to_ASE_Atoms_object(crystal, crystal_graph)
+
+		# Sixteenth, have the updated crystal as a xyz file to the temporary folder.
+		write(temporary_dirpath+'/'+crystal_name+'.xyz', crystal)
+
+		# Seventeenth, create the original xyz file for the molecules in this crystal.
+		for molecule_name in sorted(molecules.keys()):
+
+			# 17.1: Obtain the molecule.
+			molecule = molecules[molecule_name].copy()
+
+			# 17.2: Obtain a read-only view of the associated graph for the molecule.
+			molecule_graph = read_only_graph(molecule_graphs[molecule_name])
+
+			# 17.3: Add the node and edge information from the molecules graph back to the molecule
+			add_graph_to_ASE_Atoms_object(molecule, molecule_graph)
+
+			# 17.4: Obtain the solvent tag for this molecule (determining if it is a solvent or not).
+			solvent_tag = 'S' if molecule_name in solvent_components else ''
+
+			# 17.5: Save molecule to the temporary folder.
+			write(temporary_molecules_dirpath+'/'+str(molecule_name)+str(solvent_tag)+'.xyz', molecule)
+
+		# Eighteenth, close the hdf5 file of trajectories for this crystal, if trajectories are being saved in the hdf5 format.
+		if trajectory_store is not None:
+			trajectory_store.close()
+
+		# Ninteenth, rename the files for this crystal into place. The crystal file is moved last, so that it is only
+		#            found once all the other files for this crystal are in place.
+		move_reconstructed_files(temporary_dirpath, crystal_name, save_reconstructed_crystals_dirpath, save_reconstructed_molecules_dirpath, save_reconstructed_molecules_trajectory_dirpath)
+
+	finally:
+
+		# Twentieth, remove the temporary folder, making sure that the hdf5 file is closed first.
+		if trajectory_store is not None:
+			trajectory_store.close()
+		shutil.rmtree(temporary_dirpath, ignore_errors=True)
+
+	# Twenty-first, return that this crystal was reconstructed.
+	return f'Reconstructed the crystal: {crystal_identifier}', None
+
+# --------------------------------------------------------------------------------------------------------------
+
+def move_reconstructed_files(temporary_dirpath, crystal_name, save_reconstructed_crystals_dirpath, save_reconstructed_molecules_dirpath, save_reconstructed_molecules_trajectory_dirpath):
+	"""
+	This method will rename the files for a reconstructed crystal from its temporary folder into place.
+
+	Parameters
+	----------
+	temporary_dirpath : str.
+		This is the temporary folder that the files for this crystal were written to.
+	crystal_name : str.
+		This is the name of the crystal.
+	save_reconstructed_crystals_dirpath : str.
+		This is the folder to save the reconstructed crystal to.
+	save_reconstructed_molecules_dirpath : str.
+		This is the folder to save the reconstructed molecules of this crystal to.
+	save_reconstructed_molecules_trajectory_dirpath : str.
+		This is the folder to save the geometric optimisation trajectories of the rejigged molecules to.
+	"""
+
+	# First, move the trajectory files into place.
+	#        * If trajectories are saved in the hdf5 format, this is the "crystal_name".h5 file, which is merged into the trajectory store for all crystals afterwards.
+	for trajectory_filename in sorted(os.listdir(temporary_dirpath+'/trajectories')):
+		os.replace(temporary_dirpath+'/trajectories/'+trajectory_filename, save_reconstructed_molecules_trajectory_dirpath+'/'+trajectory_filename)
+
+	# Second, move the folder of molecules into place, removing any older folder for this crystal.
+	path_to_reconstructed_crystal_molecules = save_reconstructed_molecules_dirpath+'/'+crystal_name
+	if os.path.exists(path_to_reconstructed_crystal_molecules):
+		shutil.rmtree(path_to_reconstructed_crystal_molecules)
+	os.replace(temporary_dirpath+'/molecules', path_to_reconstructed_crystal_molecules)
+
+	# Third, move the crystal file into place.
+	os.replace(temporary_dirpath+'/'+crystal_name+'.xyz', save_reconstructed_crystals_dirpath+'/'+crystal_name+'.xyz')
+
+# --------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,193 @@
+"""
+reconstruct_manifest.py, Geoffrey Weal, 18/10/26
+
+These methods are designed to record which files each crystal was reconstructed from, so that ``ReJig reconstruct`` only needs to reconstruct crystals whose files have changed.
+"""
+import os, re, json, shutil, hashlib, tempfile
+
+from ReJig import __version__ as ReJig_version
+
+# This is the name of the manifest file that is placed in the folder of reconstructed crystals.
+reconstruct_manifest_filename = '.rejig_reconstruct_manifest.json'
+
+# This is the version of the manifest. Increase this if the contents of the manifest change, so that old manifests are not used.
+reconstruct_manifest_version = 1
+
+# These are the files in each crystal folder that determine how the crystal is reconstructed.
+fingerprinted_filenames = ['rejig_opt.gjf', 'rejig_opt.log', 'rejig_opt.inp', 'rejig_opt.out']
+
+def get_crystal_fingerprint(crystal_dirpath, process_all_crystals, trajectory_format='xyz'):
+	"""
+	This method will obtain a fingerprint of the files that a crystal is reconstructed from.
+
+	The fingerprint is made from the size and modification time of the crystal file and the input and output files of
+	each geometric optimisation job, so it changes whenever a job is begun, finishes, or is reset.
+
+	Parameters
+	----------
+	crystal_dirpath : str.
+		This is the path to the crystal folder in the rejig folder.
+	process_all_crystals : bool.
+		This boolean indicates if crystals are being processed even if they have not converged yet. This changes how crystals are reconstructed, so is included in the fingerprint.
+	trajectory_format : str.
+		This is the format that the geometric optimisation trajectories are saved in. This changes which files are written for each crystal, so is included in the fingerprint. Default: 'xyz'
+
+	Returns
+	-------
+	fingerprint : str.
+		This is the fingerprint of the files that this crystal is reconstructed from.
+	"""
+
+	# First, initialise the fingerprint with the settings that change how crystals are reconstructed.
+	fingerprint = hashlib.sha256()
+	fingerprint.update(f'ReJig={ReJig_version};process_all_crystals={process_all_crystals};trajectory_format={trajectory_format}\n'.encode())
+
+	# Second, add the crystal file to the fingerprint.
+	crystal_name = os.path.basename(crystal_dirpath)
+	add_file_to_fingerprint(fingerprint, crystal_dirpath, crystal_name+'.xyz')
+
+	# Third, add the input and output files of each geometric optimisation job to the fingerprint.
+	for root, dirs, files in os.walk(crystal_dirpath+'/rejig_molecules'):
+		dirs.sort()
+		for filename in sorted(files):
+			if filename in fingerprinted_filenames:
+				add_file_to_fingerprint(fingerprint, crystal_dirpath, os.path.relpath(root+'/'+filename, crystal_dirpath))
+
+	# Fourth, return the fingerprint.
+	return fingerprint.hexdigest()
+
+def add_file_to_fingerprint(fingerprint, crystal_dirpath, relative_filepath):
+	"""
+	This method will add the size and modification time of a file to a fingerprint.
+
+	Parameters
+	----------
+	fingerprint : hashlib.sha256
+		This is the fingerprint being made.
+	crystal_dirpath : str.
+		This is the path to the crystal folder.
+	relative_filepath : str.
+		This is the path to the file, relative to crystal_dirpath.
+	"""
+	try:
+		file_stat = os.stat(crystal_dirpath+'/'+relative_filepath)
+	except FileNotFoundError:
+		return
+	fingerprint.update(f'{relative_filepath}:{file_stat.st_size}:{file_stat.st_mtime_ns}\n'.encode())
+
+# --------------------------------------------------------------------------------------------------------------
+
+def read_reconstruct_manifest(manifest_filepath):
+	"""
+	This method will read the manifest.
+
+	Parameters
+	----------
+	manifest_filepath : str.
+		This is the path to the manifest file.
+
+	Returns
+	-------
+	manifest : dict.
+		This is the record for each crystal, given as {crystal_name: {'fingerprint': str., 'not_reconstructed': tuple or None}}. This is empty if there is no manifest, or if the manifest was made by a different version of ReJig.
+	"""
+
+	# First, if the manifest does not exist, return an empty manifest.
+	if not os.path.exists(manifest_filepath):
+		return {}
+
+	# Second, read the manifest.
+	try:
+		with open(manifest_filepath, 'r') as manifestJSON:
+			manifest_contents = json.load(manifestJSON)
+	except (OSError, ValueError):
+		return {}
+
+	# Third, if the manifest was made by a different version of the manifest, do not use it.
+	if manifest_contents.get('version', None) != reconstruct_manifest_version:
+		return {}
+
+	# Fourth, obtain the records for each crystal. json saves tuples as lists, so convert them back to tuples.
+	manifest = {}
+	for crystal_name, record in manifest_contents['crystals'].items():
+		not_reconstructed = tuple(record['not_reconstructed']) if (record['not_reconstructed'] is not None) else None
+		manifest[crystal_name] = {'fingerprint': record['fingerprint'], 'not_reconstructed': not_reconstructed}
+
+	# Fifth, return the manifest.
+	return manifest
+
+def write_reconstruct_manifest(manifest_filepath, manifest):
+	"""
+	This method will write the manifest. The manifest is written to a temporary file first and then renamed, so it is never left half written.
+
+	Parameters
+	----------
+	manifest_filepath : str.
+		This is the path to the manifest file.
+	manifest : dict.
+		This is the record for each crystal, given as {crystal_name: {'fingerprint': str., 'not_reconstructed': tuple or None}}.
+	"""
+	manifest_dirpath = os.path.dirname(manifest_filepath) or '.'
+	temporary_file_descriptor, temporary_filepath = tempfile.mkstemp(dir=manifest_dirpath, suffix='.tmp')
+	try:
+		with os.fdopen(temporary_file_descriptor, 'w') as manifestJSON:
+			json.dump({'version': reconstruct_manifest_version, 'crystals': manifest}, manifestJSON, indent=1, sort_keys=True)
+		os.replace(temporary_filepath, manifest_filepath)
+	except Exception:
+		if os.path.exists(temporary_filepath):
+			os.remove(temporary_filepath)
+		raise
+
+# --------------------------------------------------------------------------------------------------------------
+
+def remove_reconstructed_files(crystal_name, save_reconstructed_crystals_dirpath, save_reconstructed_molecules_dirpath, save_reconstructed_molecules_trajectory_dirpath, trajectory_filenames=None):
+	"""
+	This method will remove the files of a crystal that was previously reconstructed.
+
+	Parameters
+	----------
+	crystal_name : str.
+		This is the name of the crystal.
+	save_reconstructed_crystals_dirpath : str.
+		This is the folder that reconstructed crystals are saved to.
+	save_reconstructed_molecules_dirpath : str.
+		This is the folder that the reconstructed molecules of each crystal are saved to.
+	save_reconstructed_molecules_trajectory_dirpath : str.
+		This is the folder that the geometric optimisation trajectories of the rejigged molecules are saved to.
+	trajectory_filenames : list of str. or None
+		These are the names of the files in save_reconstructed_molecules_trajectory_dirpath, if already known. This saves listing this folder for every crystal. If None, the folder is listed. Default: None
+	"""
+
+	# First, remove the crystal file.
+	crystal_filepath = save_reconstructed_crystals_dirpath+'/'+crystal_name+'.xyz'
+	if os.path.exists(crystal_filepath):
+		os.remove(crystal_filepath)
+
+	# Second, remove the folder of molecules.
+	path_to_reconstructed_crystal_molecules = save_reconstructed_molecules_dirpath+'/'+crystal_name
+	if os.path.exists(path_to_reconstructed_crystal_molecules):
+		shutil.rmtree(path_to_reconstructed_crystal_molecules)
+
+	# Third, remove the trajectory files, which are named as "crystal_name"_"molecule_name"_traj.xyz, or "crystal_name".h5 if
+	#        the trajectory file was not merged into the trajectory store before a previous run was stopped.
+	if trajectory_filenames is None:
+		trajectory_filenames = os.listdir(save_reconstructed_molecules_trajectory_dirpath) if os.path.exists(save_reconstructed_molecules_trajectory_dirpath) else []
+	trajectory_filename_pattern = re.compile(re.escape(crystal_name)+r'(_\d+S?_traj\.xyz|\.h5)')
+	for trajectory_filename in trajectory_filenames:
+		if trajectory_filename_pattern.fullmatch(trajectory_filename) and os.path.exists(save_reconstructed_molecules_trajectory_dirpath+'/'+trajectory_filename):
+			os.remove(save_reconstructed_molecules_trajectory_dirpath+'/'+trajectory_filename)
+
+def remove_temporary_folders(save_reconstructed_crystals_dirpath):
+	"""
+	This method will remove any temporary folders left over from a previous run of ``ReJig reconstruct`` that was stopped part way through.
+
+	Parameters
+	----------
+	save_reconstructed_crystals_dirpath : str.
+		This is the folder that reconstructed crystals are saved to.
+	"""
+	for filename in os.listdir(save_reconstructed_crystals_dirpath):
+		if filename.startswith('.') and os.path.isdir(save_reconstructed_crystals_dirpath+'/'+filename):
+			shutil.rmtree(save_reconstructed_crystals_dirpath+'/'+filename)
+
+# --------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,327 @@
+"""
+trajectory_store.py, Geoffrey Weal, 18/10/26
+
+These classes are designed to write and read the geometric optimisation trajectories of all the reconstructed molecules in one compressed HDF5 file.
+
+The HDF5 file contains a group for each crystal, which contains a group for each rejigged molecule (named as given in the _traj.xyz files, such as "3" or "3S"). Each molecule group contains:
+
+* numbers   : The atomic numbers of the atoms in the molecule (int16, shape = (number of atoms,)).
+* positions : The positions of the atoms in each frame of the trajectory, in Å (float32, shape = (number of frames, number of atoms, 3)).
+* forces    : The forces on the atoms in each frame of the trajectory, in eV/Å (float32, shape = (number of frames, number of atoms, 3)). These are NaN if the forces for a frame were not given.
+* energies  : The energy of each frame of the trajectory, in eV (float64, shape = (number of frames,)). These are NaN if the energy for a frame was not given.
+
+The h5py program is needed to use these classes. This can be installed by typing "pip3 install --user --upgrade h5py" into the terminal.
+"""
+import os
+import numpy as np
+
+from ReJig import check_ase_version
+
+# This is the number of frames in each chunk of the HDF5 file.
+number_of_frames_per_chunk = 16
+
+def import_h5py():
+	"""
+	This method will import h5py, which is only needed if you want to write trajectories to a HDF5 file.
+
+	Returns
+	-------
+	The h5py module.
+	"""
+	try:
+		import h5py
+	except ImportError:
+		raise Exception('Error: The h5py program is needed to write and read trajectories as HDF5 files. Install h5py by typing the following into your terminal: pip3 install --user --upgrade h5py')
+	return h5py
+
+# --------------------------------------------------------------------------------------------------------------
+
+class TrajectoryStoreWriter:
+	"""
+	This class is designed to write geometric optimisation trajectories to a HDF5 file.
+
+	Frames are added one at a time, so trajectories do not need to be held in memory.
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to the HDF5 file.
+	mode : str.
+		This is the mode to open the HDF5 file with. Use 'w' to make a new file, or 'a' to add to an existing file. Default: 'w'
+	"""
+	def __init__(self, filepath, mode='w'):
+		h5py = import_h5py()
+		self.filepath = filepath
+		self.file = h5py.File(filepath, mode)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def add_frame(self, crystal_name, molecule_name, frame):
+		"""
+		This method will add a frame to the end of the trajectory of a molecule.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+		molecule_name : str.
+			This is the name of the molecule, such as "3" or "3S".
+		frame : ase.Atoms
+			This is the frame to add. The energy and forces are obtained from the calculator attached to this frame, if there is one.
+		"""
+
+		# First, obtain the energy and forces of this frame, if they were given.
+		results = frame.calc.results if (frame.calc is not None) else {}
+		energy = results.get('energy', np.nan)
+		forces = results.get('forces', np.full((len(frame), 3), np.nan))
+
+		# Second, make the group for this molecule if it does not exist yet.
+		group_name = crystal_name+'/'+molecule_name
+		if group_name not in self.file:
+			number_of_atoms = len(frame)
+			group = self.file.create_group(group_name)
+			group.create_dataset('numbers', data=frame.get_atomic_numbers().astype(np.int16))
+			for dataset_name in ['positions', 'forces']:
+				group.create_dataset(dataset_name, shape=(0, number_of_atoms, 3), maxshape=(None, number_of_atoms, 3), dtype=np.float32, chunks=(number_of_frames_per_chunk, number_of_atoms, 3), compression='gzip', shuffle=True)
+			group.create_dataset('energies', shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(number_of_frames_per_chunk*64,), compression='gzip')
+		group = self.file[group_name]
+
+		# Third, add this frame to the end of each dataset.
+		frame_index = group['positions'].shape[0]
+		for dataset_name, values in [('positions', frame.get_positions()), ('forces', forces), ('energies', energy)]:
+			dataset = group[dataset_name]
+			dataset.resize(frame_index+1, axis=0)
+			dataset[frame_index] = values
+
+	def remove_crystal(self, crystal_name):
+		"""
+		This method will remove the trajectories of a crystal, if they are in the HDF5 file.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+		"""
+		if crystal_name in self.file:
+			del self.file[crystal_name]
+
+	def merge_shard(self, shard_filepath):
+		"""
+		This method will copy the trajectories of the crystals in another HDF5 file (such as a file written for one crystal) into this HDF5 file, and then remove the other file.
+
+		Any trajectories already in this HDF5 file for those crystals are replaced.
+
+		Parameters
+		----------
+		shard_filepath : str.
+			This is the path to the other HDF5 file.
+		"""
+		h5py = import_h5py()
+		with h5py.File(shard_filepath, 'r') as shard_file:
+			for crystal_name in shard_file:
+				self.remove_crystal(crystal_name)
+				shard_file.copy(shard_file[crystal_name], self.file, name=crystal_name)
+		os.remove(shard_filepath)
+
+	def close(self):
+		"""
+		This method will close the HDF5 file.
+		"""
+		if self.file is None:
+			return
+		self.file.close()
+		self.file = None
+
+# --------------------------------------------------------------------------------------------------------------
+
+class TrajectoryStore:
+	"""
+	This class is designed to read geometric optimisation trajectories from a HDF5 file written by ``ReJig reconstruct --trajectory_format hdf5``.
+
+	Individual frames can be read without reading the rest of the trajectory. For example:
+
+		from ReJig import TrajectoryStore
+		with TrajectoryStore('rejigged_crystals_reconstructed_molecules_trajectory.h5') as store:
+			for crystal_name in store.get_crystal_names():
+				for molecule_name in store.get_molecule_names(crystal_name):
+					final_frame = store.get_frame(crystal_name, molecule_name, -1)
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to the HDF5 file.
+	"""
+	def __init__(self, filepath):
+		h5py = import_h5py()
+		if not os.path.exists(filepath):
+			raise Exception(f'Error: Could not find {filepath}')
+		self.filepath = filepath
+		self.file = h5py.File(filepath, 'r')
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def get_crystal_names(self):
+		"""
+		This method will give the names of the crystals in the HDF5 file.
+
+		Returns
+		-------
+		The names of the crystals, in alphabetical order.
+		"""
+		return sorted(self.file.keys())
+
+	def get_molecule_names(self, crystal_name):
+		"""
+		This method will give the names of the molecules of a crystal in the HDF5 file.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+
+		Returns
+		-------
+		The names of the molecules, in numerical order.
+		"""
+		return sorted(self.file[crystal_name].keys(), key=lambda molecule_name: int(molecule_name.replace('S','')))
+
+	def get_number_of_frames(self, crystal_name, molecule_name):
+		"""
+		This method will give the number of frames in the trajectory of a molecule.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+		molecule_name : str.
+			This is the name of the molecule, such as "3" or "3S".
+
+		Returns
+		-------
+		The number of frames in the trajectory.
+		"""
+		return self.file[crystal_name+'/'+molecule_name+'/positions'].shape[0]
+
+	def get_arrays(self, crystal_name, molecule_name):
+		"""
+		This method will give the arrays of the trajectory of a molecule, without making ase.Atoms objects.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+		molecule_name : str.
+			This is the name of the molecule, such as "3" or "3S".
+
+		Returns
+		-------
+		numbers : numpy.array
+			These are the atomic numbers of the atoms in the molecule.
+		positions : numpy.array
+			These are the positions of the atoms in each frame.
+		energies : numpy.array
+			These are the energies of each frame.
+		forces : numpy.array
+			These are the forces on the atoms in each frame.
+		"""
+		group = self.file[crystal_name+'/'+molecule_name]
+		return group['numbers'][()], group['positions'][()], group['energies'][()], group['forces'][()]
+
+	def get_frame(self, crystal_name, molecule_name, index=-1):
+		"""
+		This method will read one frame of the trajectory of a molecule.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+		molecule_name : str.
+			This is the name of the molecule, such as "3" or "3S".
+		index : int
+			This is the index of the frame to read. Default: -1 (the last frame)
+
+		Returns
+		-------
+		frame : ase.Atoms
+			This is the frame, with the energy and forces attached as a SinglePointCalculator.
+		"""
+
+		# First, obtain the group for this molecule.
+		group = self.file[crystal_name+'/'+molecule_name]
+
+		# Second, obtain the index of the frame from the start of the trajectory.
+		number_of_frames = group['positions'].shape[0]
+		if index < 0:
+			index += number_of_frames
+		if not (0 <= index < number_of_frames):
+			raise Exception(f'Error: The trajectory of molecule {molecule_name} in crystal {crystal_name} has {number_of_frames} frames, so frame {index} can not be read.')
+
+		# Third, read the frame.
+		return make_frame(group['numbers'][()], group['positions'][index], group['energies'][index], group['forces'][index])
+
+	def get_trajectory(self, crystal_name, molecule_name):
+		"""
+		This method will read all the frames of the trajectory of a molecule.
+
+		Parameters
+		----------
+		crystal_name : str.
+			This is the name of the crystal.
+		molecule_name : str.
+			This is the name of the molecule, such as "3" or "3S".
+
+		Returns
+		-------
+		trajectory : list of ase.Atoms
+			These are the frames, each with the energy and forces attached as a SinglePointCalculator.
+		"""
+		numbers, positions, energies, forces = self.get_arrays(crystal_name, molecule_name)
+		return [make_frame(numbers, positions[index], energies[index], forces[index]) for index in range(len(positions))]
+
+	def close(self):
+		"""
+		This method will close the HDF5 file.
+		"""
+		if self.file is None:
+			return
+		self.file.close()
+		self.file = None
+
+def make_frame(numbers, positions, energy, forces):
+	"""
+	This method will make an ase.Atoms object for a frame of a trajectory.
+
+	Parameters
+	----------
+	numbers : numpy.array
+		These are the atomic numbers of the atoms.
+	positions : numpy.array
+		These are the positions of the atoms.
+	energy : float
+		This is the energy of the frame. NaN if not given.
+	forces : numpy.array
+		These are the forces on the atoms. NaN if not given.
+
+	Returns
+	-------
+	frame : ase.Atoms
+		This is the frame, with the energy and forces attached as a SinglePointCalculator.
+	"""
+	check_ase_version()
+	from ase import Atoms
+	from ase.calculators.singlepoint import SinglePointCalculator
+	frame = Atoms(numbers=numbers, positions=positions.astype(float))
+	energy = None if np.isnan(energy) else float(energy)
+	forces = None if np.isnan(forces).all() else forces.astype(float)
+	frame.calc = SinglePointCalculator(frame, energy=energy, forces=forces)
+	return frame
+
+# --------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,173 @@
+"""
+bulk_file_writer.py, Geoffrey Weal, 18/10/26
+
+This script contains a class for holding many small files in memory and writing them to disk all at once.
+
+On parallel filesystems (such as Lustre), making folders and opening files take much longer than writing the contents of small files. This class makes all the folders at once, and writes the files using a pool of threads, or writes all the files into one tar archive.
+"""
+import os, io, tarfile, time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+class BulkFileWriter:
+	"""
+	This class is designed to hold files in memory until they are all written to disk with the flush method.
+
+	Parameters
+	----------
+	workers : int.
+		This is the number of threads to use to write files at the same time. Default: 1
+	archive_filepath : str. or None
+		If given, all the files are written into this tar archive rather than being written as separate files. Default: None
+	archive_dirpath : str. or None
+		This is the folder that the paths of files in the tar archive are given relative to. Unpacking the tar archive in this folder will place all the files where they would have been written without the tar archive. Default: None
+	"""
+	def __init__(self, workers=1, archive_filepath=None, archive_dirpath=None):
+		if not (isinstance(workers, int) and (workers >= 1)):
+			raise Exception(f'Error: workers must be an integer greater than or equal to 1. workers = {workers}')
+		if (archive_filepath is not None) and (archive_dirpath is None):
+			raise Exception('Error: archive_dirpath must be given if archive_filepath is given.')
+		self.workers = workers
+		self.archive_filepath = archive_filepath
+		self.archive_dirpath = archive_dirpath
+		self.folders = set()
+		self.files = {}
+
+	def make_folder(self, dirpath):
+		"""
+		This method will record a folder to make when the files are written.
+
+		Parameters
+		----------
+		dirpath : str.
+			This is the path to the folder.
+		"""
+		self.folders.add(os.path.normpath(dirpath))
+
+	def add_file(self, filepath, contents):
+		"""
+		This method will add a file to write.
+
+		Parameters
+		----------
+		filepath : str.
+			This is the path to write the file to.
+		contents : str.
+			These are the contents of the file.
+		"""
+		self.files[filepath] = contents
+
+	@contextmanager
+	def open_file(self, filepath):
+		"""
+		This method will give an in-memory file to write to, which is added to the files to write once it is closed.
+
+		Parameters
+		----------
+		filepath : str.
+			This is the path to write the file to.
+		"""
+		fileIO = io.StringIO()
+		yield fileIO
+		self.add_file(filepath, fileIO.getvalue())
+
+	def flush(self):
+		"""
+		This method will write all the files to disk, and then forget about them.
+		"""
+		if self.archive_filepath is not None:
+			self.write_archive()
+		else:
+			self.write_files()
+		self.folders = set()
+		self.files = {}
+
+	def write_files(self):
+		"""
+		This method will make all the folders, and then write all the files using a pool of threads.
+		"""
+
+		# First, obtain all the folders that need to be made.
+		folders = set(self.folders)
+		folders.update(os.path.dirname(os.path.normpath(filepath)) for filepath in self.files.keys())
+		folders.discard('')
+
+		# Second, only make the deepest folders, as os.makedirs will make all of the folders above them.
+		parent_folders = set()
+		for folder in folders:
+			parent_folder = os.path.dirname(folder)
+			while parent_folder not in ['', os.sep] and (parent_folder not in parent_folders):
+				parent_folders.add(parent_folder)
+				parent_folder = os.path.dirname(parent_folder)
+		for folder in sorted(folders - parent_folders):
+			os.makedirs(folder, exist_ok=True)
+
+		# Third, write all the files.
+		if (self.workers == 1) or (len(self.files) <= 1):
+			for filepath, contents in self.files.items():
+				write_file(filepath, contents)
+		else:
+			with ThreadPoolExecutor(max_workers=self.workers) as executor:
+				for _ in executor.map(write_file, self.files.keys(), self.files.values()):
+					pass
+
+	def write_archive(self):
+		"""
+		This method will write all the files (and folders) into one tar archive.
+		"""
+
+		# First, make the folder to place the tar archive in.
+		archive_folder = os.path.dirname(self.archive_filepath)
+		if archive_folder != '':
+			os.makedirs(archive_folder, exist_ok=True)
+
+		# Second, write the folders and files into the tar archive, with paths relative to archive_dirpath.
+		modification_time = int(time.time())
+		with tarfile.open(self.archive_filepath, 'w') as archiveTAR:
+			for folder in sorted(self.folders):
+				relative_folder = os.path.relpath(folder, self.archive_dirpath)
+				if (relative_folder == '.') or relative_folder.startswith('..'):
+					continue
+				folder_info = tarfile.TarInfo(relative_folder)
+				folder_info.type = tarfile.DIRTYPE
+				folder_info.mode = 0o755
+				folder_info.mtime = modification_time
+				archiveTAR.addfile(folder_info)
+			for filepath, contents in sorted(self.files.items()):
+				contents = contents.encode()
+				file_info = tarfile.TarInfo(os.path.relpath(filepath, self.archive_dirpath))
+				file_info.size = len(contents)
+				file_info.mode = 0o644
+				file_info.mtime = modification_time
+				archiveTAR.addfile(file_info, io.BytesIO(contents))
+
+def write_file(filepath, contents):
+	"""
+	This method will write a file to disk.
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to write the file to.
+	contents : str.
+		These are the contents of the file.
+	"""
+	with open(filepath, 'w') as FILE:
+		FILE.write(contents)
+
+def open_file(filepath, file_writer=None):
+	"""
+	This method will open a file to write to, either on disk or in a BulkFileWriter.
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to write the file to.
+	file_writer : BulkFileWriter or None
+		If given, the file is written to this BulkFileWriter. If None, the file is written straight to disk. Default: None
+
+	Returns
+	-------
+	A file object to use in a with statement.
+	"""
+	return file_writer.open_file(filepath) if (file_writer is not None) else open(filepath, 'w')
@@ -0,0 +1,160 @@
+"""
+crystal_cache.py, Geoffrey Weal, 18/10/26
+
+This script contains methods for reading a crystal and separating it into its molecules, where the results are saved to an on-disk cache so that repeat runs do not need to rebuild the graph of the crystal.
+"""
+import os, pickle, hashlib, tempfile
+
+import SUMELF
+from SUMELF import read_crystal
+from SUMELF import obtain_graph, process_crystal
+
+from ReJig                              import __version__ as ReJig_version
+from ReJig.Utilities.make_SolventsList import make_SolventsList
+
+# This is the version of the cache format. Increase this if the contents of the cache files change.
+cache_format_version = 1
+
+def read_and_process_crystal(filepath, cache_dirpath=None, print_progress=None):
+	"""
+	This method will read the crystal and obtain the molecules and the graphs associated with each molecule in the crystal.
+
+	If cache_dirpath is given, the results are saved to the cache. The cache is keyed by the contents of the crystal
+	file and the versions of ReJig and SUMELF, so the results are only reused if none of these have changed.
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to the crystal file that you want to process.
+	cache_dirpath : str. or None
+		This is the folder to store cached results in. If None, the cache will not be used. Default: None
+	print_progress : bool. or None
+		This is passed to SUMELF's process_crystal method. If None, SUMELF's default is used. Default: None
+
+	Returns
+	-------
+	molecules : dict. of ase.Atoms
+		This is the dict. of molecules in the crystal
+	molecule_graphs : dict. of networkx.Graph
+		This is the dict that contains the graph of each molecule in the molecules dictionary.
+	SolventsList : list of int.
+		This is the list of solvents as given by SUMELF's process_crystal method.
+	symmetry_operations : list
+		This is the list of symmetry operations needed to reconstruct the crystal from the molecules.
+	cell : numpy.array
+		This is the unit cell of the crystal.
+	solvent_components : list of int.
+		This list contains the names of all the solvents in the crystal, as given in crystal.info['SolventsList'].
+	"""
+
+	# First, obtain the path to the cache file for this crystal.
+	cache_filepath = get_cache_filepath(filepath, cache_dirpath) if (cache_dirpath is not None) else None
+
+	# Second, if the results for this crystal have been cached, return them.
+	if (cache_filepath is not None) and os.path.exists(cache_filepath):
+		try:
+			with open(cache_filepath, 'rb') as cacheFILE:
+				return pickle.load(cacheFILE)
+		except Exception:
+			# The cache file could not be read, so remake it.
+			pass
+
+	# Third, load the ase.Atoms object of the crystal.
+	crystal = read_crystal(filepath)
+
+	# Fourth, make sure that the periodic boundary condition setting for this crystal object is True.
+	crystal.set_pbc(True)
+
+	# Fifth, get the graph of the crystal.
+	crystal, crystal_graph = obtain_graph(crystal,name='crystal')
+
+	# Sixth, get the molecules and the graphs associated with each molecule in the crystal.
+	process_crystal_kwargs = {} if (print_progress is None) else {'print_progress': print_progress}
+	molecules, molecule_graphs, SolventsList, symmetry_operations, cell = process_crystal(crystal,crystal_graph=crystal_graph,take_shortest_distance=True,return_list=False,logger=None,**process_crystal_kwargs)
+
+	# Seventh, determine the solvents in the crystal
+	solvent_components = list(make_SolventsList(crystal.info['SolventsList'])) if ('SolventsList' in crystal.info) else []
+
+	# Eighth, gather the results together.
+	processed_crystal = (molecules, molecule_graphs, SolventsList, symmetry_operations, cell, solvent_components)
+
+	# Ninth, save the results to the cache.
+	if cache_filepath is not None:
+		write_to_cache(cache_filepath, processed_crystal)
+
+	# Tenth, return the results.
+	return processed_crystal
+
+# -----------------------------------------------------------------------------------------------------------------------------
+
+def get_cache_filepath(filepath, cache_dirpath):
+	"""
+	This method will obtain the path to the cache file for a crystal.
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to the crystal file.
+	cache_dirpath : str.
+		This is the folder to store cached results in.
+
+	Returns
+	-------
+	cache_filepath : str.
+		This is the path to the cache file for this crystal.
+	"""
+
+	# First, hash the contents of the crystal file along with the versions of the programs used to process it.
+	hasher = hashlib.sha256()
+	hasher.update(f'ReJig={ReJig_version};SUMELF={get_SUMELF_version()};cache_format={cache_format_version};'.encode())
+	with open(filepath, 'rb') as crystalFILE:
+		for chunk in iter(lambda: crystalFILE.read(1 << 20), b''):
+			hasher.update(chunk)
+	cache_key = hasher.hexdigest()
+
+	# Second, return the path to the cache file. Cache files are sharded into subfolders to keep folders small.
+	return cache_dirpath+'/'+cache_key[:2]+'/'+cache_key+'.pkl'
+
+def get_SUMELF_version():
+	"""
+	This method will obtain the version of SUMELF being used.
+
+	Returns
+	-------
+	The version of SUMELF as a string.
+	"""
+	SUMELF_version = getattr(SUMELF, '__version__', None)
+	if SUMELF_version is None:
+		try:
+			from importlib.metadata import version
+			SUMELF_version = version('SUMELF')
+		except Exception:
+			SUMELF_version = 'unknown'
+	return str(SUMELF_version)
+
+def write_to_cache(cache_filepath, processed_crystal):
+	"""
+	This method will write the processed crystal to the cache file.
+
+	The file is first written to a temporary file and then renamed, so that other processes never read a half written cache file.
+
+	Parameters
+	----------
+	cache_filepath : str.
+		This is the path to the cache file for this crystal.
+	processed_crystal : tuple
+		These are the results to save to the cache.
+	"""
+	cache_shard_dirpath = os.path.dirname(cache_filepath)
+	os.makedirs(cache_shard_dirpath, exist_ok=True)
+	temp_file_descriptor, temp_filepath = tempfile.mkstemp(dir=cache_shard_dirpath, suffix='.tmp')
+	try:
+		with os.fdopen(temp_file_descriptor, 'wb') as cacheFILE:
+			pickle.dump(processed_crystal, cacheFILE, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_filepath, cache_filepath)
+	except Exception:
+		if os.path.exists(temp_filepath):
+			os.remove(temp_filepath)
+		raise
+
+# -----------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,89 @@
+"""
+scan_added_or_modified.py, Geoffrey Weal, 18/10/26
+
+This script contains a method for quickly checking if a crystal has any added or modified atoms, by only reading the "added_or_modified" column of the crystal's extended xyz file.
+
+This is much quicker than reading the crystal and obtaining its molecules and graphs, so is used to skip crystals that do not need to be rejigged.
+"""
+import re
+
+# This is the regex for finding the Properties key in the comment line of an extended xyz file.
+properties_pattern = re.compile(r'(?:^|\s)Properties=(?:"([^"]*)"|(\S+))', re.IGNORECASE)
+
+def scan_crystal_for_added_or_modified_atoms(filepath):
+	"""
+	This method will read the "added_or_modified" column of a crystal's extended xyz file, without reading anything else about the crystal.
+
+	Parameters
+	----------
+	filepath : str.
+		This is the path to the crystal file.
+
+	Returns
+	-------
+	has_added_or_modified_atoms : bool. or None
+		True if any atoms in the crystal have been added or modified, and False if none have. None if this could not be determined from the file
+		(for example, if the file does not have an "added_or_modified" column, or has values that are not booleans). In this case the crystal
+		should be processed as normal, which will report any problems with the crystal.
+	"""
+	with open(filepath, 'r') as crystalXYZ:
+
+		# First, obtain the number of atoms in the crystal.
+		try:
+			number_of_atoms = int(crystalXYZ.readline().strip())
+		except ValueError:
+			return None
+
+		# Second, obtain the column that contains the "added_or_modified" values from the Properties key in the comment line.
+		added_or_modified_column = get__added_or_modified__column(crystalXYZ.readline())
+		if added_or_modified_column is None:
+			return None
+
+		# Third, read through the "added_or_modified" value of each atom, stopping as soon as an added or modified atom is found.
+		for _ in range(number_of_atoms):
+			atom_line = crystalXYZ.readline().split()
+			if len(atom_line) <= added_or_modified_column:
+				return None
+			added_or_modified_value = atom_line[added_or_modified_column].lower()
+			if added_or_modified_value in ['t', 'true']:
+				return True
+			elif added_or_modified_value not in ['f', 'false']:
+				return None
+
+	# Fourth, no atoms have been added or modified in this crystal.
+	return False
+
+def get__added_or_modified__column(comment_line):
+	"""
+	This method will obtain which column the "added_or_modified" values are in, from the comment line of an extended xyz file.
+
+	Parameters
+	----------
+	comment_line : str.
+		This is the comment line (the second line) of the extended xyz file.
+
+	Returns
+	-------
+	added_or_modified_column : int or None
+		This is the column of the "added_or_modified" values in each atom line. None if the file does not have an "added_or_modified" column.
+	"""
+
+	# First, obtain the Properties key, given as name:type:number_of_columns:name:type:number_of_columns:...
+	properties_match = properties_pattern.search(comment_line)
+	if properties_match is None:
+		return None
+	properties = (properties_match.group(1) or properties_match.group(2)).split(':')
+
+	# Second, go through each property, counting the number of columns before the "added_or_modified" property.
+	column = 0
+	for index in range(0, len(properties) - 2, 3):
+		name, number_of_columns = properties[index], properties[index+2]
+		if name == 'added_or_modified':
+			return column if (number_of_columns == '1') else None
+		try:
+			column += int(number_of_columns)
+		except ValueError:
+			return None
+
+	# Third, the "added_or_modified" property was not found.
+	return None
@@ -4,6 +4,7 @@ utilities.py, Geoffrey Weal, 29/4/24
 This script contains a number of methods that are used by the ReJig program. 
 """
 import numpy as np
+import networkx as nx
 
 def get__added_or_modified__values(molecule_graph):
 	"""
@@ -35,7 +36,10 @@ def get__added_or_modified__values(molecule_graph):
 		is_a_numpy_bool   = isinstance(added_or_modified_value, np.bool_)
 
 		# 2.4: Determine if the input from "added_or_modified" is value.
-		if is_a_valid_string or is_a_bool or is_a_numpy_bool:
+		#      * Note that bool('false') is True, so strings are converted by checking their value.
+		if is_a_valid_string:
+			added_or_modified_value = added_or_modified_value.lower() in ['t', 'true']
+		elif is_a_bool or is_a_numpy_bool:
 			added_or_modified_value = bool(added_or_modified_value)
 		else:
 			raise Exception(f'Error: added_or_modified_value is not a boolean. added_or_modified_value = {added_or_modified_value}')
@@ -44,4 +48,107 @@ def get__added_or_modified__values(molecule_graph):
 		added_or_modified_values.append(added_or_modified_value)
 
 	# Third, return added_or_modified_values
-	return added_or_modified_values
\ No newline at end of file
+	return added_or_modified_values
+
+def get__added_or_modified__masks(molecule_graphs):
+	"""
+	This method is designed to obtain the added_or_modified values of the atoms in every molecule of a crystal as numpy boolean arrays.
+
+	The values for all the atoms in the crystal are collected and checked together, rather than one atom at a time.
+
+	Parameters
+	----------
+	molecule_graphs : dict.
+		These are the graphs of each molecule in the crystal, given as {molecule_name: networkx.Graph}
+
+	Returns
+	-------
+	added_or_modified_masks : dict.
+		This is a boolean array for each molecule, given as {molecule_name: numpy.array}, that indicates which atoms have been added or modified.
+	molecules_need_rejigging : dict.
+		This indicates if each molecule has any added or modified atoms, given as {molecule_name: bool}
+	"""
+
+	# First, obtain the added_or_modified values of all the atoms in the crystal, one molecule after the other. 
+	molecule_names = sorted(molecule_graphs.keys())
+	added_or_modified_values = [atom_information.get('added_or_modified', None) for molecule_name in molecule_names for atom_information in molecule_graphs[molecule_name].nodes.values()]
+
+	# Second, convert these values into a boolean array.
+	added_or_modified_mask = convert__added_or_modified__values_to_mask(added_or_modified_values)
+
+	# Third, split the boolean array up into the atoms of each molecule.
+	molecule_sizes = [len(molecule_graphs[molecule_name]) for molecule_name in molecule_names]
+	molecule_masks = np.split(added_or_modified_mask, np.cumsum(molecule_sizes)[:-1]) if (len(molecule_names) > 0) else []
+	added_or_modified_masks = {molecule_name: molecule_mask for molecule_name, molecule_mask in zip(molecule_names, molecule_masks)}
+
+	# Fourth, determine which molecules contain atoms that have been added or modified.
+	molecules_need_rejigging = {molecule_name: bool(molecule_mask.any()) for molecule_name, molecule_mask in added_or_modified_masks.items()}
+
+	# Fifth, return added_or_modified_masks and molecules_need_rejigging
+	return added_or_modified_masks, molecules_need_rejigging
+
+def convert__added_or_modified__values_to_mask(added_or_modified_values):
+	"""
+	This method is designed to check and convert a list of added_or_modified values into a boolean array.
+
+	Values can be booleans, numpy booleans, or the strings 't', 'true', 'f', and 'false' (in any case). 
+
+	Parameters
+	----------
+	added_or_modified_values : list
+		These are the added_or_modified values of each atom. None indicates that an atom is missing its added_or_modified value.
+
+	Returns
+	-------
+	added_or_modified_mask : numpy.array
+		This boolean array indicates which atoms have been added or modified.
+	"""
+
+	# First, convert the values into a numpy array. 
+	#        * If all the values are booleans, this is already a boolean array.
+	#        * If all the values are booleans or strings, numpy converts all the values to strings (such as 'True' and 'False').
+	added_or_modified_array = np.array(added_or_modified_values)
+
+	# Second, if the values are all booleans, return them.
+	if added_or_modified_array.dtype == bool:
+		return added_or_modified_array
+	if len(added_or_modified_array) == 0:
+		return np.zeros(0, dtype=bool)
+
+	# Third, if the values are all strings, check that they are valid strings and convert them to booleans.
+	if added_or_modified_array.dtype.kind == 'U':
+		added_or_modified_array = np.char.lower(added_or_modified_array)
+		is_true  = np.isin(added_or_modified_array, ['t', 'true'])
+		is_false = np.isin(added_or_modified_array, ['f', 'false'])
+		if not np.all(is_true | is_false):
+			invalid_value = added_or_modified_values[int(np.argmin(is_true | is_false))]
+			raise Exception(f'Error: added_or_modified_value is not a boolean. added_or_modified_value = {invalid_value}')
+		return is_true
+
+	# Fourth, if there are any missing values, report this.
+	if any((value is None) for value in added_or_modified_values):
+		raise Exception('Error: There is a missing "added_or_modified" value in the crystal.')
+
+	# Fifth, otherwise, there are values that are not booleans, so report this. 
+	invalid_value = next(value for value in added_or_modified_values if not isinstance(value, (bool, np.bool_, str)))
+	raise Exception(f'Error: added_or_modified_value is not a boolean. added_or_modified_value = {invalid_value}')
+
+def read_only_graph(graph):
+	"""
+	This method will give a read-only view of a graph, so that the graph can be given to other methods without copying it.
+
+	Making this view takes the same short amount of time however large the graph is, where as deepcopy needs to copy every node and edge. 
+
+	Note that the node and edge information in the view is the same as in the original graph, so it should not be changed. Any attempt to add or remove nodes or edges will raise a networkx.NetworkXError.
+
+	Parameters
+	----------
+	graph : networkx.Graph
+		This is the graph of a molecule
+
+	Returns
+	-------
+	read_only_graph : networkx.Graph
+		This is a read-only view of the graph.
+	"""
+	return nx.freeze(graph.copy(as_view=True))
@@ -56,26 +56,49 @@ if not ase_found:
 	toString += '================================================'+'\n'
 	raise ImportError(toString)	
 
-import ase
 ase_version_minimum = '3.19.0'
-from packaging import version
-if version.parse(ase.__version__) < version.parse(ase_version_minimum):
-	toString = ''
-	toString += '\n'
-	toString += '================================================'+'\n'
-	toString += 'This is the ReJig Crystals (ReJig) Program'+'\n'
-	toString += 'Version: '+str(__version__)+'\n'
-	toString += '\n'
-	toString += 'The ReJig Crystals (ReJig) Program requires ASE greater than or equal to '+str(ase_version_minimum)+'.'+'\n'
-	toString += 'The current version of ASE you are using is '+str(ase.__version__)+'.'+'\n'
-	toString += '\n'
-	toString += 'Install ASE through pip by following the instruction in https://github.com/geoffreyweal/ReJig'+'\n'
-	toString += 'These instructions will ask you to install ase by typing the following into your terminal\n'
-	toString += 'pip3 install --user --upgrade ase\n'
-	toString += '\n'
-	toString += 'This program will exit before beginning'+'\n'
-	toString += '================================================'+'\n'
-	raise ImportError(toString)
+
+ase_version_checked = False
+
+def check_ase_version():
+	"""
+	This method will check that the version of ASE is recent enough. This is done before ASE is first needed (rather than when ReJig is imported), as ASE takes a while to import.
+
+	The version is read from the installed package information where possible, so that ASE does not need to be imported to check it. The check is only done once.
+	"""
+	global ase_version_checked
+	if ase_version_checked:
+		return
+	try:
+		from importlib.metadata import version as get_installed_version, PackageNotFoundError
+		try:
+			ase_version = get_installed_version('ase')
+		except PackageNotFoundError:
+			import ase
+			ase_version = ase.__version__
+	except ImportError:
+		# importlib.metadata is only available from Python 3.8.
+		import ase
+		ase_version = ase.__version__
+	from packaging import version
+	if version.parse(ase_version) < version.parse(ase_version_minimum):
+		toString = ''
+		toString += '\n'
+		toString += '================================================'+'\n'
+		toString += 'This is the ReJig Crystals (ReJig) Program'+'\n'
+		toString += 'Version: '+str(__version__)+'\n'
+		toString += '\n'
+		toString += 'The ReJig Crystals (ReJig) Program requires ASE greater than or equal to '+str(ase_version_minimum)+'.'+'\n'
+		toString += 'The current version of ASE you are using is '+str(ase_version)+'.'+'\n'
+		toString += '\n'
+		toString += 'Install ASE through pip by following the instruction in https://github.com/geoffreyweal/ReJig'+'\n'
+		toString += 'These instructions will ask you to install ase by typing the following into your terminal\n'
+		toString += 'pip3 install --user --upgrade ase\n'
+		toString += '\n'
+		toString += 'This program will exit before beginning'+'\n'
+		toString += '================================================'+'\n'
+		raise ImportError(toString)
+	ase_version_checked = True
 
 # ------------------------------------------------------------------------------------------------------------------------
 
@@ -171,9 +194,35 @@ __url__ = 'https://github.com/geoffreyweal/ReJig'
 __doc__ = 'See https://github.com/geoffreyweal/ReJig for the documentation on this program'
 
 # ================================================================================================
-from ReJig.ReJig_Atoms.ReJig_Atoms import ReJig_Atoms
+# These are imported when they are first used, rather than when ReJig is imported, so that programs 
+# such as "ReJig did_complete" do not need to import ASE, NetworkX and SUMELF to start up.
+lazy_imports = {'ReJig_Atoms':       'ReJig.ReJig_Atoms.ReJig_Atoms', 
+                'ReJig_Atoms_batch': 'ReJig.ReJig_Atoms.ReJig_Atoms_batch', 
+                'TrajectoryStore':   'ReJig.Reconstruct.trajectory_store'}
+
+def __getattr__(name):
+	if name not in lazy_imports:
+		raise AttributeError("module 'ReJig' has no attribute '"+str(name)+"'")
+	check_ase_version()
+	from importlib import import_module
+	value = getattr(import_module(lazy_imports[name]), name)
+	globals()[name] = value
+	return value
+
+def __dir__():
+	return sorted(list(globals().keys()) + list(lazy_imports.keys()))
+
+import types
+class ReJigModule(types.ModuleType):
+	def __setattr__(self, name, value):
+		# When a submodule such as ReJig.ReJig_Atoms.ReJig_Atoms is imported, python sets ReJig.ReJig_Atoms to the ReJig_Atoms folder. 
+		# Ignore this, so that "from ReJig import ReJig_Atoms" still gives the ReJig_Atoms class.
+		if (name in lazy_imports) and isinstance(value, types.ModuleType):
+			return
+		super().__setattr__(name, value)
+sys.modules[__name__].__class__ = ReJigModule
 # ================================================================================================
 
-__all__ = [ReJig_Atoms,]
+__all__ = ['ReJig_Atoms', 'ReJig_Atoms_batch', 'TrajectoryStore']
 
 # ------------------------------------------------------------------------------------------------------------------------
@@ -1,7 +1,7 @@
-import argparse, textwrap
+import sys, argparse, textwrap
 from importlib import import_module
 
-from ReJig import __version__
+from ReJig import __version__, check_ase_version
 
 class CLIError(Exception):
     """Error for CLI commands.
@@ -10,15 +10,33 @@ class CLIError(Exception):
 
 # Important: Following any change to command-line parameters, use
 # python3 -m ase.cli.completion to update autocompletion.
+# The short help for each command is given here, so that only the module
+# for the command being run needs to be imported. Keep this the same as
+# the first line of the docstring of each CLICommand.
 commands = [
-    ('submit',          'ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm'),
-    ('submit_settings', 'ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_settings'),
-    ('did_complete',    'ReJig.ReJig_Programs.ReJig_Did_Complete'),
-    ('reset',           'ReJig.ReJig_Programs.ReJig_reset_uncompleted_jobs'), 
-    ('tidy',            'ReJig.ReJig_Programs.ReJig_tidy_data'),
-    ('reconstruct',     'ReJig.Reconstruct.Reconstruct')
+    ('prepare',         'ReJig.ReJig_Programs.ReJig_prepare',                        'Create the Gaussian/ORCA geometric optimisation files for all the crystals in a crystal database.'),
+    ('submit',          'ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm',           'Submit ReJig geometric optimisation jobs to slurm.'),
+    ('submit_settings', 'ReJig.ReJig_Programs.ReJig_submit_jobs_to_slurm_settings',  'Change the settings for how slurm jobs are submitted using the `ReJig submit` module.'),
+    ('did_complete',    'ReJig.ReJig_Programs.ReJig_Did_Complete',                   'Will determine which geometric optimisation jobs have completed and which ones have not.'),
+    ('telemetry',       'ReJig.ReJig_Programs.ReJig_telemetry',                      'Will record how each geometric optimisation is converging, and give the jobs that are converging most slowly.'),
+    ('reset',           'ReJig.ReJig_Programs.ReJig_reset_uncompleted_jobs',         'Will reset jobs that did not complete. Only run this program if you know all your other jobs have finished, as this program will break and also reset any jobs that are still running.'), 
+    ('tidy',            'ReJig.ReJig_Programs.ReJig_tidy_data',                      'Will tidy up your data folder and get rid of unnecessary files, particularly those very large files.'),
+    ('reconstruct',     'ReJig.Reconstruct.Reconstruct',                             'This module is designed to reconstruct the crystal, where the geometrically relaxed molecules have replaced their non-relaxed counterparts in the crystal.')
 ]
 
+def get_commands_to_load(args, commands):
+    """Get the commands whose modules need to be imported.
+
+    Only the command being run (or the command that help is being
+    given for) is imported. The top-level options do not take values,
+    so the command is the first argument that is not an option."""
+    positional_args = [arg for arg in args if not arg.startswith('-')]
+    if len(positional_args) == 0:
+        return []
+    if positional_args[0] == 'help':
+        return positional_args[1:2]
+    return positional_args[:1]
+
 def main(prog='ReJig', description='ReJig command line tool.',version=__version__, commands=commands, hook=None, args=None):
     parser = argparse.ArgumentParser(prog=prog,description=description,formatter_class=Formatter)
     parser.add_argument('--version', action='version',version='%(prog)s-{}'.format(version))
@@ -28,9 +46,20 @@ def main(prog='ReJig', description='ReJig command line tool.',version=__version_
     subparser = subparsers.add_parser('help',description='Help',help='Help for sub-command.')
     subparser.add_argument('helpcommand',nargs='?',metavar='sub-command',help='Provide help for sub-command.')
 
+    if hook:
+        commands_to_load = [command for command, module_name, short in commands]
+    else:
+        commands_to_load = get_commands_to_load(sys.argv[1:] if (args is None) else args, commands)
+
     functions = {}
     parsers = {}
-    for command, module_name in commands:
+    for command, module_name, short in commands:
+        if command not in commands_to_load:
+            subparser = subparsers.add_parser(command,formatter_class=Formatter,help=short,description=short)
+            parsers[command] = subparser
+            continue
+        # Check the version of ASE before importing the module for the command, as many of these modules use ASE.
+        check_ase_version()
         cmd = import_module(module_name).CLICommand
         docstring = cmd.__doc__
         parts = docstring.split('\n', 1)
@@ -54,7 +54,9 @@ setup(name='ReJig',
       license='GNU AFFERO GENERAL PUBLIC LICENSE',
       zip_safe=False,
       keywords = ['victoria-university', 'victoria-university-of-wellington', 'university-of-wellington', 'wellington-university', 'atomic-simulation-environment', 'cambridge-structural-database'],
+      python_requires='>=3.7',
       install_requires=['numpy', 'ase>=3.19.0', 'packaging', 'networkx', 'tqdm'],
+      extras_require={'hdf5': ['h5py']},
       classifiers=[
         'Development Status :: 3 - Alpha',      # Chose either "3 - Alpha", "4 - Beta" or "5 - Production/Stable" as the current state of your package
         'Intended Audience :: Science/Research',      # Define that your audience are developers
@@ -68,7 +70,6 @@ setup(name='ReJig',
         'Natural Language :: English',
         'License :: OSI Approved :: GNU Affero General Public License v3',   # Again, pick a license
         'Programming Language :: Python :: 3 :: Only',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',